@@ -0,0 +1,151 @@
+"""
+Porównanie wydajności analizy kredytów (pandas) z poprzednią implementacją w pętli Pythona
+
+Użycie: python benchmarks/bench_credit_analytics.py [liczba_transakcji ...]
+Domyślnie mierzone są zbiory 10 000 i 1 000 000 transakcji jednego użytkownika
+w tymczasowej bazie SQLite.
+"""
+import os
+import sys
+import time
+import sqlite3
+import datetime
+import tempfile
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.credit_analytics import load_credit_flows, daily_credit_flows, get_credit_usage_breakdown
+
+USER_ID = 1
+DAYS = 30
+DESCRIPTIONS = [
+    "Wiadomość w trybie no_mode", "Generowanie obrazu DALL-E", "Analiza dokumentu: raport.pdf",
+    "Analiza zdjęcia", "Tłumaczenie tekstu ze zdjęcia", "Tłumaczenie pliku PDF: umowa.pdf", None
+]
+
+def create_database(path, rows):
+    """Tworzy bazę z losowo rozłożonymi transakcjami z ostatnich DAYS dni"""
+    import numpy as np
+
+    rng = np.random.default_rng(42)
+    now = datetime.datetime.now(pytz.UTC)
+    offsets = np.sort(rng.uniform(0, DAYS * 86400 - 60, rows))[::-1]
+    types = rng.choice(["deduct", "deduct", "deduct", "add", "purchase"], rows)
+    amounts = rng.integers(1, 20, rows)
+    descriptions = rng.integers(0, len(DESCRIPTIONS), rows)
+
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE credit_transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            transaction_type TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            credits_before INTEGER NOT NULL,
+            credits_after INTEGER NOT NULL,
+            description TEXT,
+            created_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX idx_credit_transactions_user_date ON credit_transactions(user_id, created_at)")
+    conn.executemany(
+        "INSERT INTO credit_transactions (user_id, transaction_type, amount, credits_before, credits_after, description, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (USER_ID, str(types[i]), int(amounts[i]), 1000, 1000 - int(amounts[i]),
+             DESCRIPTIONS[descriptions[i]], (now - datetime.timedelta(seconds=float(offsets[i]))).isoformat())
+            for i in range(rows)
+        )
+    )
+    conn.commit()
+    conn.close()
+
+def legacy_daily_flows(db_path):
+    """Poprzednie przygotowanie danych wykresu (fromisoformat i list.index dla każdego wiersza)"""
+    conn = sqlite3.connect(db_path)
+    start_date = (datetime.datetime.now(pytz.UTC) - datetime.timedelta(days=DAYS)).isoformat()
+    transactions = conn.execute("""
+        SELECT created_at, transaction_type, amount, credits_after
+        FROM credit_transactions
+        WHERE user_id = ? AND created_at >= ?
+        ORDER BY created_at ASC
+    """, (USER_ID, start_date)).fetchall()
+    conn.close()
+
+    dates, usage_amounts, purchase_amounts = [], [], []
+    for created_at, trans_type, amount, credits_after in transactions:
+        dates.append(datetime.datetime.fromisoformat(created_at.replace('Z', '+00:00')))
+        usage_amounts.append(amount if trans_type == 'deduct' else 0)
+        purchase_amounts.append(amount if trans_type in ['add', 'purchase'] else 0)
+
+    unique_dates = sorted(list(set([d.date() for d in dates])))
+    daily_usage = [0] * len(unique_dates)
+    daily_purchases = [0] * len(unique_dates)
+    for dt, usage, purchase in zip(dates, usage_amounts, purchase_amounts):
+        date_idx = unique_dates.index(dt.date())
+        daily_usage[date_idx] += usage
+        daily_purchases[date_idx] += purchase
+    return unique_dates, daily_usage, daily_purchases
+
+def legacy_breakdown(db_path):
+    """Poprzednia klasyfikacja opisów (sprawdzanie podciągów w pętli)"""
+    conn = sqlite3.connect(db_path)
+    start_date = (datetime.datetime.now(pytz.UTC) - datetime.timedelta(days=DAYS)).isoformat()
+    rows = conn.execute("""
+        SELECT description, SUM(amount)
+        FROM credit_transactions
+        WHERE user_id = ? AND created_at >= ? AND transaction_type = 'deduct'
+        GROUP BY description
+        ORDER BY SUM(amount) DESC
+    """, (USER_ID, start_date)).fetchall()
+    conn.close()
+
+    result = {}
+    for description, amount in rows:
+        category = "Inne"
+        if description:
+            if "Wiadomość" in description:
+                category = "Wiadomości"
+            elif "obraz" in description or "DALL-E" in description:
+                category = "Obrazy"
+            elif "dokument" in description:
+                category = "Analiza dokumentów"
+            elif "zdjęci" in description or "zdjęc" in description:
+                category = "Analiza zdjęć"
+        result[category] = result.get(category, 0) + amount
+    return result
+
+def vectorized_daily_flows(db_path):
+    return daily_credit_flows(load_credit_flows(USER_ID, DAYS, db_path=db_path))
+
+def measure(function, *args):
+    started_at = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started_at, result
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 1_000_000]
+    print(f"{'transakcje':>12}{'operacja':>16}{'poprzednio (ms)':>18}{'pandas (ms)':>14}{'przyspieszenie':>16}")
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, "bench.sqlite")
+            create_database(db_path, rows)
+
+            # Pierwsze wywołanie importuje pandas - nie wliczamy go do pomiaru
+            vectorized_daily_flows(db_path)
+
+            legacy_time, (unique_dates, daily_usage, daily_purchases) = measure(legacy_daily_flows, db_path)
+            pandas_time, daily = measure(vectorized_daily_flows, db_path)
+            assert list(daily["usage"]) == daily_usage and list(daily["purchases"]) == daily_purchases
+            assert [day.date() for day in daily.index] == unique_dates
+            print(f"{rows:>12}{'dzienne sumy':>16}{legacy_time * 1000:>18.1f}{pandas_time * 1000:>14.1f}{legacy_time / pandas_time:>15.2f}x")
+
+            legacy_time, legacy_result = measure(legacy_breakdown, db_path)
+            pandas_time, result = measure(get_credit_usage_breakdown, USER_ID, DAYS, db_path)
+            assert result == legacy_result
+            print(f"{rows:>12}{'rozkład zużycia':>16}{legacy_time * 1000:>18.1f}{pandas_time * 1000:>14.1f}{legacy_time / pandas_time:>15.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Porównanie wydajności get_text (skompilowany katalog) z poprzednią implementacją
+
+Użycie: python benchmarks/bench_translations.py [liczba_powtórzeń]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.translations import translations, get_text, catalog
+
+def legacy_get_text(key, language="pl", **kwargs):
+    """Poprzednia implementacja get_text (wyszukiwanie w słowniku i str.format przy każdym wywołaniu)"""
+    if language not in translations:
+        language = "pl"
+    text = translations[language].get(key, kwargs.get('default', key))
+    if kwargs:
+        try:
+            return text.format(**kwargs)
+        except KeyError:
+            return text
+    return text
+
+# Wywołania typowe dla renderowania menu i wiadomości
+CASES = [
+    ("bez argumentów", ("menu_chat_mode", "en"), {}),
+    ("tylko default", ("export_info", "pl"), {"default": "Aby wyeksportować konwersację, użyj komendy /export"}),
+    ("brak klucza z default", ("chat_mode_no_mode", "ru"), {"default": "🔄 Brak trybu"}),
+    ("szablon z polem", ("credits_status", "pl"), {"credits": 125}),
+    ("nieznany język", ("back", "de"), {}),
+]
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    # Sprawdzenie zgodności wyników przed pomiarem
+    for name, args, kwargs in CASES:
+        assert get_text(*args, **kwargs) == legacy_get_text(*args, **kwargs) or "default" in kwargs, name
+
+    print(f"Powtórzeń: {number}")
+    print(f"{'przypadek':<24}{'poprzednio (µs)':>18}{'katalog (µs)':>16}{'przyspieszenie':>16}")
+    for name, args, kwargs in CASES:
+        legacy = min(timeit.repeat(lambda: legacy_get_text(*args, **kwargs), number=number, repeat=3))
+        compiled = min(timeit.repeat(lambda: get_text(*args, **kwargs), number=number, repeat=3))
+        print(f"{name:<24}{legacy / number * 1e6:>18.3f}{compiled / number * 1e6:>16.3f}{legacy / compiled:>15.2f}x")
+
+    print()
+    for language, problems in catalog.validate().items():
+        print(f"{language}: brak {len(problems['missing'])} kluczy, niezgodne pola w {len(problems['placeholders'])}")
+
+if __name__ == "__main__":
+    main()
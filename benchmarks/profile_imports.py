@@ -0,0 +1,56 @@
+"""
+Profil czasu importu modułów przy starcie bota (na podstawie python -X importtime)
+
+Użycie: python benchmarks/profile_imports.py [moduł] [liczba_pozycji]
+Domyślnie profilowany jest moduł main i pokazywanych 25 najwolniejszych importów.
+"""
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def profile(module="main"):
+    """
+    Importuje moduł w osobnym procesie z -X importtime
+
+    Returns:
+        list: Krotki (czas_łączny_us, czas_własny_us, nazwa_modułu, zagłębienie)
+    """
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-profile")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Import {module} nie powiódł się:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(cumulative_us), int(self_us), name.strip(), depth))
+    return entries
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else "main"
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    entries = profile(module)
+
+    total = max(entry[0] for entry in entries)
+    print(f"Import {module}: {total / 1000:.0f} ms, {len(entries)} modułów\n")
+
+    print(f"{'łącznie (ms)':>13}{'własny (ms)':>13}  moduł")
+    for cumulative_us, self_us, name, depth in sorted(entries, reverse=True)[:limit]:
+        print(f"{cumulative_us / 1000:>13.1f}{self_us / 1000:>13.1f}  {'  ' * depth}{name}")
+
+    # Zależności, które powinny być ładowane leniwie
+    heavy = ("matplotlib", "numpy", "pandas", "reportlab", "PyPDF2", "openai")
+    loaded = sorted({name.split(".")[0] for _, _, name, _ in entries if name.split(".")[0] in heavy})
+    print(f"\nCiężkie zależności ładowane przy starcie: {', '.join(loaded) if loaded else 'brak'}")
+
+if __name__ == "__main__":
+    main()
@@ -13,11 +13,126 @@ BOT_VERSION = "1.0.0"
 # Konfiguracja Telegram
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 
+# Sposób odbierania aktualizacji: "polling" lub "webhook"
+BOT_TRANSPORT = os.getenv('BOT_TRANSPORT', 'polling')
+
+# Konfiguracja trybu webhook
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')                      # Publiczny adres bota, np. https://bot.example.com
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')     # Adres nasłuchiwania serwera HTTP
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))       # Port serwera HTTP
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')        # Ścieżka, na którą Telegram wysyła aktualizacje
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN')    # Sekret webhooka (domyślnie wyprowadzany z tokena)
+WEBHOOK_MAX_CONNECTIONS = 40                                # Maksymalna liczba równoległych połączeń od Telegrama
+# Usuwanie webhooka przy zatrzymaniu (wyłącz przy wielu instancjach za load balancerem)
+WEBHOOK_DELETE_ON_SHUTDOWN = os.getenv('WEBHOOK_DELETE_ON_SHUTDOWN', '1') == '1'
+
 # Konfiguracja OpenAI
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 DEFAULT_MODEL = "gpt-4o"  # Domyślny model OpenAI
 DALL_E_MODEL = "dall-e-3"  # Model do generowania obrazów
 
+# Optymalizacja zdjęć przed wysłaniem do modelu wizyjnego
+# (efektywna rozdzielczość modelu: dłuższy bok do 2048 px, krótszy do 768 px)
+VISION_MAX_LONG_SIDE = 2048
+VISION_MAX_SHORT_SIDE = 768
+VISION_LOW_DETAIL_SIDE = 512
+VISION_JPEG_QUALITY = {
+    "analyze": 80,
+    "translate": 90  # Wyższa jakość, aby zachować czytelność tekstu
+}
+# Poziom szczegółowości dla trybów analizy ("auto" - "low" dla małych obrazów)
+VISION_DETAIL = {
+    "analyze": "auto",
+    "translate": "high"
+}
+
+# Maksymalna liczba aktualizacji Telegrama przetwarzanych równolegle
+# (aktualizacje jednego użytkownika są zawsze przetwarzane po kolei)
+MAX_CONCURRENT_UPDATES = 64
+
+# Łączenie szybko wysłanych wiadomości w jedno zapytanie
+MESSAGE_DEBOUNCE_SECONDS = 0.7   # Czas ciszy, po którym seria wiadomości jest zamykana
+MESSAGE_BURST_MAX_WAIT = 3.0     # Maksymalny czas zbierania serii
+
+# Maksymalna liczba równoległych zapytań do OpenAI (poza odpowiedziami strumieniowymi)
+OPENAI_MAX_CONCURRENT_REQUESTS = 8
+
+# Połączenia HTTP z OpenAI
+OPENAI_HTTP2 = os.getenv('OPENAI_HTTP2', '1') == '1'   # HTTP/2, jeśli zainstalowano pakiet h2 (httpx[http2])
+OPENAI_KEEPALIVE_EXPIRY = 120.0                        # Jak długo nieużywane połączenie pozostaje otwarte (sekundy)
+
+# Analiza dużych dokumentów tekstowych metodą map-reduce
+DOCUMENT_SINGLE_PROMPT_MAX_CHARS = 40000     # Do tej długości plik trafia do jednego zapytania
+DOCUMENT_CHUNK_MAX_CHARS = 24000             # Rozmiar fragmentu w trybie analizy
+DOCUMENT_TRANSLATE_CHUNK_MAX_CHARS = 8000    # Rozmiar fragmentu w trybie tłumaczenia
+DOCUMENT_MAX_CHUNKS = 64                     # Maksymalna liczba przetwarzanych fragmentów
+DOCUMENT_CHUNK_SUMMARY_TOKENS = 500          # Limit tokenów podsumowania jednego fragmentu
+DOCUMENT_REDUCE_MAX_CHARS = 40000            # Maksymalna długość podsumowań w jednym zapytaniu reduce
+
+# Pula procesów dla zadań obciążających CPU (parsowanie PDF, wykresy)
+PROCESS_POOL_WORKERS = max(1, min(4, (os.cpu_count() or 1)))
+
+# Wykresy analizy kredytów (rysowane w puli procesów)
+CHART_CACHE_MAX_ENTRIES = 128    # Liczba zestawów wykresów w pamięci podręcznej (klucz: użytkownik, dni, ostatnia transakcja)
+CHART_CACHE_TTL = 3600           # Maksymalny wiek wykresu w sekundach (okno dni przesuwa się z czasem)
+
+# Statystyki administracyjne (/adminstats, python -m utils.admin_analytics)
+ADMIN_STATS_DEFAULT_DAYS = 30    # Domyślny okres raportów w dniach
+ADMIN_STATS_MAX_DAYS = 3650      # Maksymalny okres raportów w dniach
+ADMIN_STATS_TOP_USERS = 10       # Liczba użytkowników w zestawieniu największych wydatków
+ADMIN_STATS_BUSY_TIMEOUT = 5     # Czas oczekiwania na blokadę bazy w sekundach (połączenie tylko do odczytu)
+
+# Ekstrakcja tekstu z PDF
+PDF_PAGES_PER_TASK = 10          # Liczba stron przetwarzanych w jednym zadaniu puli procesów
+PDF_CACHE_MAX_ENTRIES = 32       # Liczba dokumentów w pamięci podręcznej (klucz: file_unique_id)
+PDF_TEXT_TOKEN_BUDGET = 150000   # Maksymalna liczba tokenów tekstu PDF przekazywana do analizy
+
+# Pobieranie plików z Telegrama (strumieniowo, do pliku tymczasowego)
+DOWNLOAD_MAX_BYTES = 25 * 1024 * 1024      # Maksymalny rozmiar pobieranego pliku
+DOWNLOAD_SPOOL_MAX_MEMORY = 1024 * 1024    # Mniejsze pliki pozostają w pamięci, większe trafiają na dysk
+DOWNLOAD_CHUNK_SIZE = 64 * 1024            # Rozmiar porcji odczytywanej z połączenia
+DOWNLOAD_TIMEOUT = 120.0                   # Limit czasu pobierania jednego pliku (sekundy)
+
+# Pamięć podręczna pobranych plików (klucz: file_unique_id)
+FILE_CACHE_MEMORY_MAX_BYTES = 32 * 1024 * 1024   # Łączny rozmiar małych plików trzymanych w pamięci
+FILE_CACHE_DISK_MAX_BYTES = 512 * 1024 * 1024    # Łączny rozmiar plików w katalogu na dysku
+FILE_CACHE_TTL = 1800                            # Czas ważności pliku w pamięci podręcznej (sekundy)
+FILE_CACHE_DIR = os.getenv('FILE_CACHE_DIR')     # Katalog nadrzędny dla prywatnego katalogu plików (domyślnie katalog tymczasowy systemu)
+
+# Tłumaczenie całych dokumentów PDF
+PDF_TRANSLATION_BATCH_CHARS = 6000   # Maksymalna liczba znaków akapitów w jednym zapytaniu
+PDF_TRANSLATION_MAX_PAGES = 100      # Maksymalna liczba tłumaczonych stron
+
+# Planista edycji wiadomości strumieniowanych (limity Telegrama)
+EDIT_SCHEDULER_CHAT_INTERVAL = 1.0   # Bazowy odstęp między edycjami w jednym czacie (sekundy)
+EDIT_SCHEDULER_MAX_INTERVAL = 10.0   # Maksymalny odstęp po błędach RetryAfter (sekundy)
+EDIT_SCHEDULER_GLOBAL_RATE = 25      # Maksymalna liczba edycji na sekundę dla całego bota
+EDIT_SCHEDULER_FINAL_ATTEMPTS = 5    # Liczba prób wysłania końcowej wersji wiadomości
+
+# Długie odpowiedzi strumieniowane
+STREAM_MESSAGE_MAX_CHARS = 4000      # Limit długości jednej wiadomości (Telegram: 4096 znaków)
+STREAM_DOCUMENT_THRESHOLD = 12000    # Powyżej tej długości odpowiedź jest dołączana jako plik .md (0 - wyłączone)
+
+# Magazyn danych przycisków (callback_data przenosi tylko krótki token)
+CALLBACK_STORE_MAX_ENTRIES = 5000           # Liczba wpisów w pamięci - starsze trafiają do SQLite
+CALLBACK_STORE_TTL = 7 * 24 * 3600          # Czas ważności przycisku (sekundy)
+CALLBACK_STORE_FLUSH_INTERVAL = 2           # Co ile sekund nowe wpisy są zapisywane partią do SQLite
+
+# Trwałe sesje użytkowników (tabela user_sessions) w SQLite
+PERSISTENCE_UPDATE_INTERVAL = 30     # Co ile sekund zmienione sesje są zapisywane do bazy
+SESSION_IDLE_TIMEOUT = 1800          # Po tylu sekundach bezczynności sesja jest usuwana z pamięci
+SESSION_REGISTRY_MAX_ENTRIES = 10000 # Maksymalna liczba sesji użytkowników w pamięci
+
+# Pamięć podręczna klawiatur i tekstów menu
+RENDER_CACHE_CHECK_INTERVAL = 60     # Co ile sekund sprawdzana jest zmiana trybów, kosztów i tłumaczeń
+
+# Rozgrzewka po starcie bota (w tle, nie opóźnia obsługi pierwszych aktualizacji).
+# Kroki: menus, database, media, pdf_fonts, charts, process_pool, openai, modules; pusta wartość wyłącza rozgrzewkę
+WARMUP_STEPS = [step.strip() for step in os.getenv(
+    'WARMUP_STEPS', 'menus,database,media,pdf_fonts,charts,process_pool,openai,modules'
+).split(',') if step.strip()]
+WARMUP_OPENAI_TIMEOUT = 10.0         # Limit czasu zapytania nawiązującego połączenie z OpenAI (sekundy)
+
 # Predefiniowane szablony promptów
 DEFAULT_SYSTEM_PROMPT = "Jesteś pomocnym asystentem AI."
 
@@ -103,9 +103,6 @@ def init_database():
         logger.error(f"Błąd inicjalizacji bazy danych SQLite: {e}")
         return False
  
-# Inicjalizacja bazy danych przy imporcie modułu
-init_database()
-
 def update_user_language(user_id, language):
     """Aktualizuje język użytkownika w bazie danych"""
     try:
@@ -6,6 +6,7 @@ from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 from utils.translations import get_text
 from database.credits_client import get_user_credits
+from utils.session_registry import get_session
 
 # Funkcja pomocnicza do pobierania języka użytkownika
 def get_user_language(context, user_id):
@@ -19,9 +20,10 @@ def get_user_language(context, user_id):
     Returns:
         str: Kod języka (pl, en, ru)
     """
-    # Sprawdź, czy język jest zapisany w kontekście
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data'] and 'language' in context.chat_data['user_data'][user_id]:
-        return context.chat_data['user_data'][user_id]['language']
+    # Sprawdź, czy język jest zapisany w sesji
+    session = get_session(context, user_id)
+    if session.language:
+        return session.language
     
     # Jeśli nie, pobierz z bazy danych
     try:
@@ -34,14 +36,8 @@ def get_user_language(context, user_id):
         conn.close()
         
         if result and result[0]:
-            # Zapisz w kontekście na przyszłość
-            if 'user_data' not in context.chat_data:
-                context.chat_data['user_data'] = {}
-            
-            if user_id not in context.chat_data['user_data']:
-                context.chat_data['user_data'][user_id] = {}
-            
-            context.chat_data['user_data'][user_id]['language'] = result[0]
+            # Zapisz w sesji na przyszłość
+            session.language = result[0]
             return result[0]
     except Exception as e:
         print(f"Błąd pobierania języka z bazy: {e}")
@@ -56,14 +52,8 @@ def get_user_language(context, user_id):
             conn.close()
             
             if result and result[0]:
-                # Zapisz w kontekście na przyszłość
-                if 'user_data' not in context.chat_data:
-                    context.chat_data['user_data'] = {}
-                
-                if user_id not in context.chat_data['user_data']:
-                    context.chat_data['user_data'][user_id] = {}
-                
-                context.chat_data['user_data'][user_id]['language'] = result[0]
+                # Zapisz w sesji na przyszłość
+                session.language = result[0]
                 return result[0]
         except Exception as e:
             print(f"Błąd pobierania language_code z bazy: {e}")
@@ -2,6 +2,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 from config import BOT_NAME
+from utils.session_registry import get_session
 from utils.translations import get_text
 from database.credits_client import (
     get_user_credits, add_user_credits, deduct_user_credits, 
@@ -10,11 +11,8 @@ from database.credits_client import (
 )
 # Add imports at the beginning of the file
 from utils.credit_analytics import (
-    generate_credit_usage_chart, generate_usage_breakdown_chart, 
-    get_credit_usage_breakdown, predict_credit_depletion
+    get_credit_charts, get_credit_usage_breakdown, predict_credit_depletion
 )
-import matplotlib
-matplotlib.use('Agg')  # Required for operation without a graphical interface
 
 from database.credits_client import add_stars_payment_option, get_stars_conversion_rate
 
@@ -31,9 +29,10 @@ def get_user_language(context, user_id):
     Returns:
         str: Language code (pl, en, ru)
     """
-    # Check if language is saved in context
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data'] and 'language' in context.chat_data['user_data'][user_id]:
-        return context.chat_data['user_data'][user_id]['language']
+    # Check if language is saved in session
+    session = get_session(context, user_id)
+    if session.language:
+        return session.language
     
     # If not, get from database
     try:
@@ -46,14 +45,8 @@ def get_user_language(context, user_id):
         conn.close()
         
         if result and result[0]:
-            # Save in context for future use
-            if 'user_data' not in context.chat_data:
-                context.chat_data['user_data'] = {}
-            
-            if user_id not in context.chat_data['user_data']:
-                context.chat_data['user_data'][user_id] = {}
-            
-            context.chat_data['user_data'][user_id]['language'] = result[0]
+            # Save in session for future use
+            session.language = result[0]
             return result[0]
     except Exception as e:
         print(f"Error getting language from database: {e}")
@@ -161,7 +154,8 @@ from database.credits_client import (
     get_user_credit_stats, purchase_credits,
     get_stars_conversion_rate, add_stars_payment_option
 )
-from handlers.menu_handler import get_user_language
+from handlers.menu_handler import get_user_language, get_query_message_kind
+from utils.message_editor import edit_message
 
 async def handle_credit_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -308,14 +302,11 @@ async def handle_credit_callback(update: Update, context: ContextTypes.DEFAULT_T
         language = get_user_language(context, user_id)
         
         # Informuj użytkownika że analiza się rozpoczyna
-        if hasattr(query.message, 'caption'):
-            await query.edit_message_caption(
-                caption="⏳ Analizuję dane wykorzystania kredytów..."
-            )
-        else:
-            await query.edit_message_text(
-                text="⏳ Analizuję dane wykorzystania kredytów..."
-            )
+        await edit_message(
+            query,
+            kind=get_query_message_kind(query),
+            text="⏳ Analizuję dane wykorzystania kredytów..."
+        )
         
         # Domyślna liczba dni do analizy
         days = 30
@@ -324,14 +315,11 @@ async def handle_credit_callback(update: Update, context: ContextTypes.DEFAULT_T
         depletion_info = predict_credit_depletion(user_id, days)
         
         if not depletion_info:
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption="Nie masz wystarczającej historii użycia kredytów do przeprowadzenia analizy. Spróbuj ponownie po wykonaniu kilku operacji."
-                )
-            else:
-                await query.edit_message_text(
-                    text="Nie masz wystarczającej historii użycia kredytów do przeprowadzenia analizy. Spróbuj ponownie po wykonaniu kilku operacji."
-                )
+            await edit_message(
+                query,
+                kind=get_query_message_kind(query),
+                text="Nie masz wystarczającej historii użycia kredytów do przeprowadzenia analizy. Spróbuj ponownie po wykonaniu kilku operacji."
+            )
             return True
         
         # Przygotuj wiadomość z analizą
@@ -355,20 +343,17 @@ async def handle_credit_callback(update: Update, context: ContextTypes.DEFAULT_T
                 message += f"- {category}: *{amount}* kredytów ({percentage:.1f}%)\n"
         
         # Zaktualizuj wiadomość z analizą
-        if hasattr(query.message, 'caption'):
-            await query.edit_message_caption(
-                caption=message,
-                parse_mode=ParseMode.MARKDOWN
-            )
-        else:
-            await query.edit_message_text(
-                text=message,
-                parse_mode=ParseMode.MARKDOWN
-            )
+        await edit_message(
+            query,
+            kind=get_query_message_kind(query),
+            text=message,
+            parse_mode=ParseMode.MARKDOWN
+        )
+        
+        # Generuj i wysyłaj wykresy (rysowane w puli procesów lub pobrane z pamięci podręcznej)
+        usage_chart, breakdown_chart = await get_credit_charts(user_id, days)
         
-        # Generuj i wysyłaj wykresy
         # Wykres historii użycia
-        usage_chart = generate_credit_usage_chart(user_id, days)
         if usage_chart:
             await context.bot.send_photo(
                 chat_id=query.message.chat_id,
@@ -377,7 +362,6 @@ async def handle_credit_callback(update: Update, context: ContextTypes.DEFAULT_T
             )
         
         # Wykres rozkładu użycia
-        breakdown_chart = generate_usage_breakdown_chart(user_id, days)
         if breakdown_chart:
             await context.bot.send_photo(
                 chat_id=query.message.chat_id,
@@ -391,10 +375,7 @@ async def handle_credit_callback(update: Update, context: ContextTypes.DEFAULT_T
         
         # Zaktualizuj wiadomość z przyciskiem powrotu
         try:
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_reply_markup(reply_markup=reply_markup)
-            else:
-                await query.message.edit_reply_markup(reply_markup=reply_markup)
+            await query.edit_message_reply_markup(reply_markup=reply_markup)
         except Exception as e:
             print(f"Błąd przy aktualizacji klawiatury: {e}")
         
@@ -576,9 +557,10 @@ async def credit_analytics_command(update: Update, context: ContextTypes.DEFAULT
         parse_mode=ParseMode.MARKDOWN
     )
     
-    # Generate and send usage history chart
-    usage_chart = generate_credit_usage_chart(user_id, days)
+    # Generate charts off the event loop (or take them from the chart cache)
+    usage_chart, breakdown_chart = await get_credit_charts(user_id, days)
     
+    # Send usage history chart
     if usage_chart:
         await context.bot.send_photo(
             chat_id=update.effective_chat.id,
@@ -586,9 +568,7 @@ async def credit_analytics_command(update: Update, context: ContextTypes.DEFAULT
             caption=f"📈 Credit usage history for the last {days} days"
         )
     
-    # Generate and send usage breakdown chart
-    breakdown_chart = generate_usage_breakdown_chart(user_id, days)
-    
+    # Send usage breakdown chart
     if breakdown_chart:
         await context.bot.send_photo(
             chat_id=update.effective_chat.id,
@@ -3,7 +3,6 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode, ChatAction
 from database.sqlite_client import get_active_conversation, get_conversation_history, get_or_create_user
-from utils.pdf_generator import generate_conversation_pdf
 from config import BOT_NAME
 from utils.translations import get_text
 from handlers.menu_handler import get_user_language
@@ -44,6 +43,8 @@ async def export_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     # Generuj PDF
     try:
+        # reportlab jest ładowany dopiero przy pierwszym eksporcie
+        from utils.pdf_generator import generate_conversation_pdf
         pdf_buffer = generate_conversation_pdf(history, user_info, BOT_NAME)
         
         # Przygotuj nazwę pliku
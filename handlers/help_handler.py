@@ -4,8 +4,102 @@ from telegram.constants import ParseMode
 from config import DEFAULT_MODEL, BOT_NAME, SUBSCRIPTION_PLANS, CREDIT_COSTS, AVAILABLE_MODELS, CHAT_MODES
 from utils.translations import get_text
 from handlers.menu_handler import get_user_language
+from utils.session_registry import get_session_async
 from database.credits_client import get_user_credits
 from database.sqlite_client import get_message_status
+from utils.render_cache import cached_render
+from utils.text_template import SplitTemplate
+
+STATUS_TEMPLATE = """
+*{title}*
+
+{available_credits}: *{credits}*
+{current_mode_label}: *{current_mode}* ({cost}: {current_mode_cost} {credits_per_message})
+{current_model_label}: *{model_name}*
+
+{messages_info}:
+- {messages_used_label}: *{messages_used}*
+- {messages_limit_label}: *{messages_limit}*
+- {messages_left_label}: *{messages_left}*
+
+{operation_costs}
+"""
+
+# Krótsza wersja statusu (bez modelu i limitu wiadomości)
+STATUS_SUMMARY_TEMPLATE = """
+*{title}*
+
+{available_credits}: *{credits}*
+{current_mode_label}: *{current_mode}* ({cost}: {current_mode_cost} {credits_per_message})
+
+{operation_costs}
+"""
+
+@cached_render("operation_costs_text")
+def get_operation_costs_text(language):
+    """Zwraca listę kosztów operacji (na podstawie CREDIT_COSTS) z informacją o dokupieniu kredytów"""
+    def unit(cost):
+        return get_text("credit" if cost == 1 else "credits", language)
+
+    message_costs = CREDIT_COSTS["message"]
+    image_costs = CREDIT_COSTS["image"]
+    lines = [
+        f"{get_text('operation_costs', language)}:",
+        f"- {get_text('standard_message', language)} (GPT-3.5): {message_costs['gpt-3.5-turbo']} {unit(message_costs['gpt-3.5-turbo'])}",
+        f"- {get_text('premium_message', language)} (GPT-4o): {message_costs['gpt-4o']} {unit(message_costs['gpt-4o'])}",
+        f"- {get_text('expert_message', language)} (GPT-4): {message_costs['gpt-4']} {unit(message_costs['gpt-4'])}",
+        f"- {get_text('dalle_image', language)}: {image_costs['standard']}-{image_costs['hd']} {get_text('credits', language)}",
+        f"- {get_text('document_analysis', language)}: {CREDIT_COSTS['document']} {unit(CREDIT_COSTS['document'])}",
+        f"- {get_text('photo_analysis', language)}: {CREDIT_COSTS['photo']} {unit(CREDIT_COSTS['photo'])}",
+        "",
+        f"{get_text('buy_more_credits', language)}: /buy"
+    ]
+    return "\n".join(lines)
+
+@cached_render("status_text")
+def create_status_template(language):
+    """Tworzy szablon wiadomości /status - wypełniane są tylko dane użytkownika"""
+    return SplitTemplate(
+        STATUS_TEMPLATE,
+        title=get_text("status_command", language, bot_name=BOT_NAME),
+        available_credits=get_text("available_credits", language),
+        current_mode_label=get_text("current_mode", language),
+        cost=get_text("cost", language),
+        credits_per_message=get_text("credits_per_message", language),
+        current_model_label=get_text("current_model", language),
+        messages_info=get_text("messages_info", language),
+        messages_used_label=get_text("messages_used", language),
+        messages_limit_label=get_text("messages_limit", language),
+        messages_left_label=get_text("messages_left", language),
+        operation_costs=get_operation_costs_text(language)
+    )
+
+@cached_render("status_summary_text")
+def create_status_summary_template(language):
+    """Tworzy szablon skróconej wiadomości o statusie konta"""
+    return SplitTemplate(
+        STATUS_SUMMARY_TEMPLATE,
+        title=get_text("status_command", language, bot_name=BOT_NAME),
+        available_credits=get_text("available_credits", language),
+        current_mode_label=get_text("current_mode", language),
+        cost=get_text("cost", language),
+        credits_per_message=get_text("credits_per_message", language),
+        operation_costs=get_operation_costs_text(language)
+    )
+
+@cached_render("status_keyboard")
+def create_status_markup(language):
+    """Tworzy klawiaturę wiadomości /status"""
+    keyboard = [
+        [InlineKeyboardButton(get_text("buy_credits_btn", language), callback_data="menu_credits_buy")],
+        [InlineKeyboardButton(get_text("menu_chat_mode", language), callback_data="menu_section_chat_modes")]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+@cached_render("help_keyboard")
+def create_help_markup(language):
+    """Tworzy klawiaturę wiadomości /help"""
+    return InlineKeyboardMarkup([[InlineKeyboardButton("Menu", callback_data="menu_back_main")]])
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -19,10 +113,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     help_text = get_text("help_text", language)
     
     # Dodaj tylko przycisk Menu
-    keyboard = [
-        [InlineKeyboardButton("Menu", callback_data="menu_back_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = create_help_markup(language)
     
     try:
         # Próba wysłania z formatowaniem Markdown
@@ -62,55 +153,35 @@ async def check_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Pobranie aktualnego trybu czatu
     current_mode = get_text("no_mode", language)
     current_mode_cost = 1
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data']:
-        user_data = context.chat_data['user_data'][user_id]
-        if 'current_mode' in user_data and user_data['current_mode'] in CHAT_MODES:
-            mode_id = user_data['current_mode']
-            current_mode = get_text(f"chat_mode_{mode_id}", language, default=CHAT_MODES[mode_id]["name"])
-            current_mode_cost = CHAT_MODES[mode_id]["credit_cost"]
+    session = await get_session_async(context, user_id)
+    if session.current_mode in CHAT_MODES:
+        mode_id = session.current_mode
+        current_mode = get_text(f"chat_mode_{mode_id}", language, default=CHAT_MODES[mode_id]["name"])
+        current_mode_cost = CHAT_MODES[mode_id]["credit_cost"]
     
     # Pobierz aktualny model
     current_model = DEFAULT_MODEL
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data']:
-        user_data = context.chat_data['user_data'][user_id]
-        if 'current_model' in user_data and user_data['current_model'] in AVAILABLE_MODELS:
-            current_model = user_data['current_model']
+    if session.current_model in AVAILABLE_MODELS:
+        current_model = session.current_model
     
     model_name = AVAILABLE_MODELS.get(current_model, "Unknown Model")
     
     # Pobierz status wiadomości
     message_status = get_message_status(user_id)
     
-    # Stwórz wiadomość o statusie, używając tłumaczeń
-    message = f"""
-*{get_text("status_command", language, bot_name=BOT_NAME)}*
-
-{get_text("available_credits", language)}: *{credits}*
-{get_text("current_mode", language)}: *{current_mode}* ({get_text("cost", language)}: {current_mode_cost} {get_text("credits_per_message", language)})
-{get_text("current_model", language)}: *{model_name}*
-
-{get_text("messages_info", language)}:
-- {get_text("messages_used", language)}: *{message_status["messages_used"]}*
-- {get_text("messages_limit", language)}: *{message_status["messages_limit"]}*
-- {get_text("messages_left", language)}: *{message_status["messages_left"]}*
-
-{get_text("operation_costs", language)}:
-- {get_text("standard_message", language)} (GPT-3.5): 1 {get_text("credit", language)}
-- {get_text("premium_message", language)} (GPT-4o): 3 {get_text("credits", language)}
-- {get_text("expert_message", language)} (GPT-4): 5 {get_text("credits", language)}
-- {get_text("dalle_image", language)}: 10-15 {get_text("credits", language)}
-- {get_text("document_analysis", language)}: 5 {get_text("credits", language)}
-- {get_text("photo_analysis", language)}: 8 {get_text("credits", language)}
-
-{get_text("buy_more_credits", language)}: /buy
-"""
+    # Stwórz wiadomość o statusie z gotowego szablonu
+    message = create_status_template(language).render(
+        credits=credits,
+        current_mode=current_mode,
+        current_mode_cost=current_mode_cost,
+        model_name=model_name,
+        messages_used=message_status["messages_used"],
+        messages_limit=message_status["messages_limit"],
+        messages_left=message_status["messages_left"]
+    )
     
     # Dodaj przyciski menu dla łatwiejszej nawigacji
-    keyboard = [
-        [InlineKeyboardButton(get_text("buy_credits_btn", language), callback_data="menu_credits_buy")],
-        [InlineKeyboardButton(get_text("menu_chat_mode", language), callback_data="menu_section_chat_modes")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = create_status_markup(language)
     
     try:
         await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN, reply_markup=reply_markup)
@@ -7,14 +7,19 @@ from database.credits_client import get_user_credits
 from database.sqlite_client import update_user_language
 from database.credits_client import get_user_credits, get_credit_packages
 from config import BOT_NAME
+from utils.session_registry import get_session, get_session_async
+from utils.render_cache import cached_render
+from utils.text_template import SplitTemplate
+from utils.media_registry import media_registry
+from utils.message_editor import edit_message, get_message_kind
 
 # ==================== FUNKCJE POMOCNICZE DO ZARZĄDZANIA DANYMI UŻYTKOWNIKA ====================
 
 def get_user_language(context, user_id):
-    """Pobiera język użytkownika z kontekstu lub bazy danych"""
-    # Sprawdź, czy język jest zapisany w kontekście
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data'] and 'language' in context.chat_data['user_data'][user_id]:
-        return context.chat_data['user_data'][user_id]['language']
+    """Pobiera język użytkownika z sesji lub bazy danych"""
+    session = get_session(context, user_id)
+    if session.language:
+        return session.language
     
     # Jeśli nie, pobierz z bazy danych
     try:
@@ -34,14 +39,8 @@ def get_user_language(context, user_id):
         conn.close()
         
         if result and result[0]:
-            # Zapisz w kontekście na przyszłość
-            if 'user_data' not in context.chat_data:
-                context.chat_data['user_data'] = {}
-            
-            if user_id not in context.chat_data['user_data']:
-                context.chat_data['user_data'][user_id] = {}
-            
-            context.chat_data['user_data'][user_id]['language'] = result[0]
+            # Zapisz w sesji na przyszłość
+            session.language = result[0]
             return result[0]
     except Exception as e:
         print(f"Błąd pobierania języka z bazy: {e}")
@@ -51,21 +50,19 @@ def get_user_language(context, user_id):
 
 def get_user_current_mode(context, user_id):
     """Pobiera aktualny tryb czatu użytkownika"""
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data']:
-        user_data = context.chat_data['user_data'][user_id]
-        if 'current_mode' in user_data and user_data['current_mode'] in CHAT_MODES:
-            return user_data['current_mode']
+    current_mode = get_session(context, user_id).current_mode
+    if current_mode in CHAT_MODES:
+        return current_mode
     return "no_mode"
 
 def get_user_current_model(context, user_id):
     """Pobiera aktualny model AI użytkownika"""
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data']:
-        user_data = context.chat_data['user_data'][user_id]
-        if 'current_model' in user_data and user_data['current_model'] in AVAILABLE_MODELS:
-            return user_data['current_model']
+    current_model = get_session(context, user_id).current_model
+    if current_model in AVAILABLE_MODELS:
+        return current_model
     return DEFAULT_MODEL  # Domyślny model
 
-def store_menu_state(context, user_id, state, message_id=None):
+def store_menu_state(context, user_id, state, message_id=None, message_kind=None):
     """
     Zapisuje stan menu dla użytkownika
     
@@ -74,17 +71,14 @@ def store_menu_state(context, user_id, state, message_id=None):
         user_id: ID użytkownika
         state: Stan menu (np. 'main', 'settings', 'chat_modes')
         message_id: ID wiadomości menu (opcjonalnie)
+        message_kind: Rodzaj wiadomości menu - 'media' lub 'text' (opcjonalnie)
     """
-    if 'user_data' not in context.chat_data:
-        context.chat_data['user_data'] = {}
-    
-    if user_id not in context.chat_data['user_data']:
-        context.chat_data['user_data'][user_id] = {}
-    
-    context.chat_data['user_data'][user_id]['menu_state'] = state
+    session = get_session(context, user_id)
+    session.menu_state = state
     
     if message_id:
-        context.chat_data['user_data'][user_id]['menu_message_id'] = message_id
+        session.menu_message_id = message_id
+        session.menu_message_kind = message_kind
 
 def get_menu_state(context, user_id):
     """
@@ -97,9 +91,7 @@ def get_menu_state(context, user_id):
     Returns:
         str: Stan menu lub 'main' jeśli brak
     """
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data'] and 'menu_state' in context.chat_data['user_data'][user_id]:
-        return context.chat_data['user_data'][user_id]['menu_state']
-    return 'main'
+    return get_session(context, user_id).menu_state or 'main'
 
 def get_menu_message_id(context, user_id):
     """
@@ -112,12 +104,48 @@ def get_menu_message_id(context, user_id):
     Returns:
         int: ID wiadomości lub None jeśli brak
     """
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data'] and 'menu_message_id' in context.chat_data['user_data'][user_id]:
-        return context.chat_data['user_data'][user_id]['menu_message_id']
-    return None
+    return get_session(context, user_id).menu_message_id
+
+def get_menu_message_kind(context, user_id, message_id=None):
+    """
+    Pobiera zapamiętany rodzaj wiadomości menu użytkownika
+    
+    Args:
+        context: Kontekst bota
+        user_id: ID użytkownika
+        message_id: ID edytowanej wiadomości - rodzaj jest zwracany tylko
+            dla aktualnej wiadomości menu (opcjonalnie)
+        
+    Returns:
+        str: 'media', 'text' lub None jeśli nieznany
+    """
+    session = get_session(context, user_id)
+    if message_id is not None and message_id != session.menu_message_id:
+        return None
+    return session.menu_message_kind
+
+def get_query_message_kind(query):
+    """
+    Ustala rodzaj wiadomości z przyciskami przed jej edycją
+    
+    Args:
+        query: Obiekt callback_query
+        
+    Returns:
+        str: Zapamiętany rodzaj wiadomości menu, a dla innych wiadomości
+            rodzaj ustalony z ich zawartości (None, jeśli brak wiadomości)
+    """
+    message = query.message
+    if message is None:
+        return None
+    # Sesja nie zależy od kontekstu czatu - wystarczy ID użytkownika
+    kind = get_menu_message_kind(None, query.from_user.id, message.message_id)
+    return kind or get_message_kind(message)
 
 # ==================== FUNKCJE GENERUJĄCE UKŁADY MENU ====================
+# Wyniki są budowane raz dla każdego języka i przechowywane w render_cache
 
+@cached_render("main_menu")
 def create_main_menu_markup(language):
     """Tworzy klawiaturę dla głównego menu"""
     keyboard = [
@@ -137,6 +165,7 @@ def create_main_menu_markup(language):
     
     return InlineKeyboardMarkup(keyboard)
 
+@cached_render("chat_modes_menu")
 def create_chat_modes_markup(language):
     """Tworzy klawiaturę dla menu trybów czatu"""
     keyboard = []
@@ -162,6 +191,7 @@ def create_chat_modes_markup(language):
     
     return InlineKeyboardMarkup(keyboard)
 
+@cached_render("credits_menu")
 def create_credits_menu_markup(language):
     """Tworzy klawiaturę dla menu kredytów"""
     keyboard = [
@@ -171,6 +201,7 @@ def create_credits_menu_markup(language):
     ]
     return InlineKeyboardMarkup(keyboard)
 
+@cached_render("settings_menu")
 def create_settings_menu_markup(language):
     """Tworzy klawiaturę dla menu ustawień"""
     keyboard = [
@@ -182,6 +213,7 @@ def create_settings_menu_markup(language):
     ]
     return InlineKeyboardMarkup(keyboard)
 
+@cached_render("history_menu")
 def create_history_menu_markup(language):
     """Tworzy klawiaturę dla menu historii"""
     keyboard = [
@@ -192,6 +224,7 @@ def create_history_menu_markup(language):
     ]
     return InlineKeyboardMarkup(keyboard)
 
+@cached_render("model_selection_menu")
 def create_model_selection_markup(language):
     """Tworzy klawiaturę dla wyboru modelu AI"""
     keyboard = []
@@ -212,6 +245,7 @@ def create_model_selection_markup(language):
     
     return InlineKeyboardMarkup(keyboard)
 
+@cached_render("language_selection_menu")
 def create_language_selection_markup(language):
     """Tworzy klawiaturę dla wyboru języka"""
     keyboard = []
@@ -230,9 +264,47 @@ def create_language_selection_markup(language):
     
     return InlineKeyboardMarkup(keyboard)
 
+@cached_render("back_to_main")
+def create_back_to_main_markup(language):
+    """Tworzy klawiaturę z przyciskiem powrotu do głównego menu"""
+    return InlineKeyboardMarkup([[InlineKeyboardButton(get_text("back", language), callback_data="menu_back_main")]])
+
+@cached_render("back_to_settings")
+def create_back_to_settings_markup(language):
+    """Tworzy klawiaturę z przyciskiem powrotu do ustawień"""
+    return InlineKeyboardMarkup([[InlineKeyboardButton(get_text("back", language), callback_data="menu_section_settings")]])
+
+@cached_render("back_to_history")
+def create_back_to_history_markup(language):
+    """Tworzy klawiaturę z przyciskiem powrotu do menu historii"""
+    return InlineKeyboardMarkup([[InlineKeyboardButton(get_text("back", language), callback_data="menu_section_history")]])
+
+# ==================== TEKSTY MENU ====================
+
+@cached_render("welcome_text")
+def get_welcome_text(language):
+    """Zwraca tekst powitalny głównego menu"""
+    return get_text("welcome_message", language, bot_name=BOT_NAME)
+
+@cached_render("restart_text")
+def get_restart_text(language):
+    """Zwraca potwierdzenie restartu wraz z tekstem powitalnym"""
+    return get_text("restart_command", language) + "\n\n" + get_welcome_text(language)
+
+@cached_render("history_text")
+def get_history_text(language):
+    """Zwraca tekst menu historii"""
+    return get_text("history_options", language) + "\n\n" + get_text("export_info", language, default="Aby wyeksportować konwersację, użyj komendy /export")
+
+@cached_render("credits_text")
+def create_credits_text_template(language):
+    """Tworzy szablon tekstu menu kredytów z polem {credits}"""
+    return SplitTemplate(get_text("credits_status", language) + "\n\n{credit_options}",
+                         credit_options=get_text("credit_options", language))
+
 # ==================== FUNKCJE POMOCNICZE DO AKTUALIZACJI WIADOMOŚCI ====================
 
-async def update_message(query, caption_or_text, reply_markup, parse_mode=None):
+async def update_message(query, caption_or_text, reply_markup, parse_mode=None, kind=None):
     """
     Aktualizuje wiadomość, obsługując różne typy wiadomości i błędy
     
@@ -241,47 +313,22 @@ async def update_message(query, caption_or_text, reply_markup, parse_mode=None):
         caption_or_text: Treść do aktualizacji
         reply_markup: Klawiatura inline
         parse_mode: Tryb formatowania (opcjonalnie)
+        kind: Rodzaj wiadomości - 'media' lub 'text' (opcjonalnie, domyślnie zapamiętany
+            rodzaj wiadomości menu lub ustalany z query.message)
     
     Returns:
         bool: True jeśli się powiodło, False w przypadku błędu
     """
+    kind = kind or get_query_message_kind(query)
     try:
-        if hasattr(query.message, 'caption'):
-            # Wiadomość ma podpis (jest to zdjęcie lub inny typ mediów)
-            if parse_mode:
-                await query.edit_message_caption(
-                    caption=caption_or_text,
-                    reply_markup=reply_markup,
-                    parse_mode=parse_mode
-                )
-            else:
-                await query.edit_message_caption(
-                    caption=caption_or_text,
-                    reply_markup=reply_markup
-                )
-        else:
-            # Standardowa wiadomość tekstowa
-            if parse_mode:
-                await query.edit_message_text(
-                    text=caption_or_text,
-                    reply_markup=reply_markup,
-                    parse_mode=parse_mode
-                )
-            else:
-                await query.edit_message_text(
-                    text=caption_or_text,
-                    reply_markup=reply_markup
-                )
+        await edit_message(query, caption_or_text, reply_markup=reply_markup, parse_mode=parse_mode, kind=kind)
         return True
     except Exception as e:
         print(f"Błąd aktualizacji wiadomości: {e}")
         
         # Spróbuj bez formatowania, jeśli był ustawiony tryb formatowania
         if parse_mode:
-            try:
-                return await update_message(query, caption_or_text, reply_markup, parse_mode=None)
-            except Exception as e2:
-                print(f"Drugi błąd aktualizacji wiadomości: {e2}")
+            return await update_message(query, caption_or_text, reply_markup, parse_mode=None, kind=kind)
         
         return False
 
@@ -309,7 +356,7 @@ async def handle_credits_section(update, context):
     user_id = query.from_user.id
     language = get_user_language(context, user_id)
     
-    message_text = f"{get_text('credits_status', language, credits=get_user_credits(user_id))}\n\n{get_text('credit_options', language)}"
+    message_text = create_credits_text_template(language).render(credits=get_user_credits(user_id))
     reply_markup = create_credits_menu_markup(language)
     
     result = await update_message(
@@ -327,7 +374,7 @@ async def handle_history_section(update, context):
     user_id = query.from_user.id
     language = get_user_language(context, user_id)
     
-    message_text = get_text("history_options", language) + "\n\n" + get_text("export_info", language, default="Aby wyeksportować konwersację, użyj komendy /export")
+    message_text = get_history_text(language)
     reply_markup = create_history_menu_markup(language)
     
     result = await update_message(
@@ -364,10 +411,7 @@ async def handle_help_section(update, context):
     language = get_user_language(context, user_id)
     
     message_text = get_text("help_text", language)
-    keyboard = [
-        [InlineKeyboardButton(get_text("back", language), callback_data="menu_back_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = create_back_to_main_markup(language)
     
     result = await update_message(
         query,
@@ -385,10 +429,7 @@ async def handle_image_section(update, context):
     language = get_user_language(context, user_id)
     
     message_text = get_text("image_usage", language)
-    keyboard = [
-        [InlineKeyboardButton(get_text("back", language), callback_data="menu_back_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = create_back_to_main_markup(language)
     
     result = await update_message(
         query,
@@ -406,23 +447,24 @@ async def handle_back_to_main(update, context):
     language = get_user_language(context, user_id)
     
     # Pobierz bogaty tekst powitalny
-    welcome_text = get_text("welcome_message", language, bot_name=BOT_NAME)
+    welcome_text = get_welcome_text(language)
     keyboard = create_main_menu_markup(language)
     
     try:
         banner_url = "https://i.imgur.com/OiPImmC.png"  # URL zdjęcia banera
         
         # Wysyłamy bez formatowania Markdown, aby uniknąć błędów parsowania
-        message = await context.bot.send_photo(
-            chat_id=query.message.chat_id,
-            photo=banner_url,
+        message = await media_registry.send_photo(
+            context.bot,
+            query.message.chat_id,
+            banner_url,
             caption=welcome_text,
             reply_markup=keyboard
             # Bez parse_mode aby uniknąć problemów
         )
         
         # Zapisz ID nowej wiadomości menu
-        store_menu_state(context, user_id, 'main', message.message_id)
+        store_menu_state(context, user_id, 'main', message.message_id, get_message_kind(message))
         
         # Usuń starą wiadomość
         try:
@@ -442,7 +484,7 @@ async def handle_back_to_main(update, context):
                 reply_markup=keyboard
             )
             
-            store_menu_state(context, user_id, 'main', message.message_id)
+            store_menu_state(context, user_id, 'main', message.message_id, get_message_kind(message))
             return True
         except Exception as e2:
             print(f"Plan awaryjny nie powiódł się: {e2}")
@@ -487,8 +529,7 @@ async def handle_name_settings(update, context):
     language = get_user_language(context, user_id)
     
     message_text = get_text("settings_change_name", language, default="Aby zmienić swoją nazwę, użyj komendy /setname [twoja_nazwa].\n\nNa przykład: /setname Jan Kowalski")
-    keyboard = [[InlineKeyboardButton(get_text("back", language), callback_data="menu_section_settings")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = create_back_to_settings_markup(language)
     
     result = await update_message(
         query,
@@ -515,8 +556,7 @@ async def handle_history_view(update, context):
         
         # Wyświetl komunikat również w wiadomości
         message_text = get_text("history_no_conversation", language)
-        keyboard = [[InlineKeyboardButton(get_text("back", language), callback_data="menu_section_history")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = create_back_to_history_markup(language)
         
         await update_message(
             query,
@@ -535,8 +575,7 @@ async def handle_history_view(update, context):
         
         # Wyświetl komunikat również w wiadomości
         message_text = get_text("history_empty", language)
-        keyboard = [[InlineKeyboardButton(get_text("back", language), callback_data="menu_section_history")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = create_back_to_history_markup(language)
         
         await update_message(
             query,
@@ -563,8 +602,7 @@ async def handle_history_view(update, context):
         message_text += f"{i+1}. **{sender}**: {content}\n\n"
     
     # Dodaj przycisk do powrotu
-    keyboard = [[InlineKeyboardButton(get_text("back", language), callback_data="menu_section_history")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = create_back_to_history_markup(language)
     
     # Spróbuj wysłać z formatowaniem, a jeśli się nie powiedzie, wyślij bez
     try:
@@ -595,13 +633,8 @@ async def onboarding_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     language = get_user_language(context, user_id)
     
     # Inicjalizacja stanu onboardingu
-    if 'user_data' not in context.chat_data:
-        context.chat_data['user_data'] = {}
-    
-    if user_id not in context.chat_data['user_data']:
-        context.chat_data['user_data'][user_id] = {}
-    
-    context.chat_data['user_data'][user_id]['onboarding_state'] = 0
+    session = await get_session_async(context, user_id)
+    session.onboarding_state = 0
     
     # Lista kroków onboardingu - USUNIĘTE NIEDZIAŁAJĄCE FUNKCJE
     steps = [
@@ -647,17 +680,13 @@ async def handle_onboarding_callback(update: Update, context: ContextTypes.DEFAU
     await query.answer()  # Odpowiedz na callback, aby usunąć oczekiwanie
     
     # Inicjalizacja stanu onboardingu jeśli nie istnieje
-    if 'user_data' not in context.chat_data:
-        context.chat_data['user_data'] = {}
+    session = await get_session_async(context, user_id)
     
-    if user_id not in context.chat_data['user_data']:
-        context.chat_data['user_data'][user_id] = {}
-    
-    if 'onboarding_state' not in context.chat_data['user_data'][user_id]:
-        context.chat_data['user_data'][user_id]['onboarding_state'] = 0
+    if session.onboarding_state is None:
+        session.onboarding_state = 0
     
     # Pobierz aktualny stan onboardingu
-    current_step = context.chat_data['user_data'][user_id]['onboarding_state']
+    current_step = session.onboarding_state
     
     # Lista kroków onboardingu - USUNIĘTE NIEDZIAŁAJĄCE FUNKCJE
     steps = [
@@ -669,40 +698,24 @@ async def handle_onboarding_callback(update: Update, context: ContextTypes.DEFAU
     if query.data == "onboarding_next":
         # Przejdź do następnego kroku
         next_step = min(current_step + 1, len(steps) - 1)
-        context.chat_data['user_data'][user_id]['onboarding_state'] = next_step
+        session.onboarding_state = next_step
         step_name = steps[next_step]
     elif query.data == "onboarding_back":
         # Wróć do poprzedniego kroku
         prev_step = max(0, current_step - 1)
-        context.chat_data['user_data'][user_id]['onboarding_state'] = prev_step
+        session.onboarding_state = prev_step
         step_name = steps[prev_step]
     elif query.data == "onboarding_finish":
         # Usuń stan onboardingu i zakończ bez wysyłania nowej wiadomości
-        if 'onboarding_state' in context.chat_data['user_data'][user_id]:
-            del context.chat_data['user_data'][user_id]['onboarding_state']
+        session.onboarding_state = None
         
         # NAPRAWIONE: Wyślij powitalną wiadomość bez formatowania Markdown
-        welcome_text = get_text("welcome_message", language, bot_name=BOT_NAME)
+        welcome_text = get_welcome_text(language)
         # Usuń potencjalnie problematyczne znaki formatowania
         welcome_text = welcome_text.replace("*", "").replace("_", "").replace("`", "").replace("[", "").replace("]", "")
         
-        # Utwórz klawiaturę menu
-        keyboard = [
-            [
-                InlineKeyboardButton(get_text("menu_chat_mode", language), callback_data="menu_section_chat_modes"),
-                InlineKeyboardButton(get_text("image_generate", language), callback_data="menu_image_generate")
-            ],
-            [
-                InlineKeyboardButton(get_text("menu_credits", language), callback_data="menu_section_credits"),
-                InlineKeyboardButton(get_text("menu_dialog_history", language), callback_data="menu_section_history")
-            ],
-            [
-                InlineKeyboardButton(get_text("menu_settings", language), callback_data="menu_section_settings"),
-                InlineKeyboardButton(get_text("menu_help", language), callback_data="menu_help")
-            ]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        # Klawiatura menu
+        reply_markup = create_main_menu_markup(language)
         
         try:
             # Próba wysłania zwykłej wiadomości tekstowej zamiast zdjęcia
@@ -714,7 +727,7 @@ async def handle_onboarding_callback(update: Update, context: ContextTypes.DEFAU
             
             # Zapisz ID wiadomości menu i stan menu
             from handlers.menu_handler import store_menu_state
-            store_menu_state(context, user_id, 'main', message.message_id)
+            store_menu_state(context, user_id, 'main', message.message_id, get_message_kind(message))
             
             # Usuń poprzednią wiadomość
             await query.message.delete()
@@ -726,7 +739,7 @@ async def handle_onboarding_callback(update: Update, context: ContextTypes.DEFAU
         return
     
     # Pobierz aktualny krok po aktualizacji
-    current_step = context.chat_data['user_data'][user_id]['onboarding_state']
+    current_step = session.onboarding_state
     step_name = steps[current_step]
     
     # Przygotuj tekst dla aktualnego kroku
@@ -797,7 +810,7 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     language = get_user_language(context, user_id)
     
     # Przygotuj tekst powitalny
-    welcome_text = get_text("welcome_message", language, bot_name=BOT_NAME)
+    welcome_text = get_welcome_text(language)
     
     # Utwórz klawiaturę menu
     reply_markup = create_main_menu_markup(language)
@@ -810,7 +823,7 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     
     # Zapisz ID wiadomości menu i stan menu
-    store_menu_state(context, user_id, 'main', message.message_id)
+    store_menu_state(context, user_id, 'main', message.message_id, get_message_kind(message))
 
 async def update_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, menu_state, markup=None):
     """
@@ -829,7 +842,7 @@ async def update_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, menu_s
     # Obsługa różnych stanów menu
     if menu_state == 'main':
         # Używamy welcome_message
-        welcome_text = get_text("welcome_message", language, bot_name=BOT_NAME)
+        welcome_text = get_welcome_text(language)
         menu_text = welcome_text
         
         if not markup:
@@ -846,7 +859,7 @@ async def update_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, menu_s
         await handle_settings_section(update, context)
     else:
         # Domyślnie też używamy welcome_message
-        welcome_text = get_text("welcome_message", language, bot_name=BOT_NAME)
+        welcome_text = get_welcome_text(language)
         menu_text = welcome_text
         
         if not markup:
@@ -1020,13 +1033,8 @@ async def set_user_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
         conn.close()
         
         # Zaktualizuj nazwę w kontekście, jeśli istnieje
-        if 'user_data' not in context.chat_data:
-            context.chat_data['user_data'] = {}
-        
-        if user_id not in context.chat_data['user_data']:
-            context.chat_data['user_data'][user_id] = {}
-        
-        context.chat_data['user_data'][user_id]['name'] = new_name
+        session = await get_session_async(context, user_id)
+        session.name = new_name
         
         # Potwierdź zmianę nazwy
         await update.message.reply_text(
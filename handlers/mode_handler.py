@@ -4,7 +4,9 @@ from telegram.constants import ParseMode
 from config import CHAT_MODES
 from utils.translations import get_text
 from database.credits_client import get_user_credits
-from handlers.menu_handler import get_user_language
+from handlers.menu_handler import get_user_language, get_query_message_kind
+from utils.session_registry import get_session_async
+from utils.message_editor import edit_message
 
 async def show_modes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Pokazuje dostępne tryby czatu"""
@@ -53,32 +55,23 @@ async def handle_mode_selection(update: Update, context: ContextTypes.DEFAULT_TY
     # Sprawdź, czy tryb istnieje
     if mode_id not in CHAT_MODES:
         try:
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption=get_text("mode_not_available", language, default="Wybrany tryb nie jest dostępny."),
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.edit_message_text(
-                    text=get_text("mode_not_available", language, default="Wybrany tryb nie jest dostępny."),
-                    parse_mode=ParseMode.MARKDOWN
-                )
+            await edit_message(
+                query,
+                kind=get_query_message_kind(query),
+                text=get_text("mode_not_available", language, default="Wybrany tryb nie jest dostępny."),
+                parse_mode=ParseMode.MARKDOWN
+            )
         except Exception as e:
             print(f"Błąd przy edycji wiadomości: {e}")
         return
     
     # Zapisz wybrany tryb w kontekście użytkownika
-    if 'user_data' not in context.chat_data:
-        context.chat_data['user_data'] = {}
-    
-    if user_id not in context.chat_data['user_data']:
-        context.chat_data['user_data'][user_id] = {}
-    
-    context.chat_data['user_data'][user_id]['current_mode'] = mode_id
+    session = await get_session_async(context, user_id)
+    session.current_mode = mode_id
     
     # Jeśli tryb ma określony model, ustaw go również
     if "model" in CHAT_MODES[mode_id]:
-        context.chat_data['user_data'][user_id]['current_model'] = CHAT_MODES[mode_id]["model"]
+        session.current_model = CHAT_MODES[mode_id]["model"]
     
     # Pobierz przetłumaczoną nazwę trybu i inne informacje
     mode_name = get_text(f"chat_mode_{mode_id}", language, default=CHAT_MODES[mode_id]["name"])
@@ -105,32 +98,23 @@ async def handle_mode_selection(update: Update, context: ContextTypes.DEFAULT_TY
     
     try:
         # Sprawdź typ wiadomości i użyj odpowiedniej metody
-        if hasattr(query.message, 'caption'):
-            await query.edit_message_caption(
-                caption=message_text,
-                parse_mode=ParseMode.MARKDOWN,
-                reply_markup=reply_markup
-            )
-        else:
-            await query.edit_message_text(
-                text=message_text,
-                parse_mode=ParseMode.MARKDOWN,
-                reply_markup=reply_markup
-            )
+        await edit_message(
+            query,
+            kind=get_query_message_kind(query),
+            text=message_text,
+            parse_mode=ParseMode.MARKDOWN,
+            reply_markup=reply_markup
+        )
     except Exception as e:
         print(f"Błąd przy edycji wiadomości: {e}")
         try:
             # Bez formatowania Markdown
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption=message_text,
-                    reply_markup=reply_markup
-                )
-            else:
-                await query.edit_message_text(
-                    text=message_text,
-                    reply_markup=reply_markup
-                )
+            await edit_message(
+                query,
+                kind=get_query_message_kind(query),
+                text=message_text,
+                reply_markup=reply_markup
+            )
         except Exception as e2:
             print(f"Drugi błąd przy edycji wiadomości: {e2}")
         
@@ -1,71 +1,142 @@
+import os
+import time
+import asyncio
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode, ChatAction
 from utils.translations import get_text
-from utils.pdf_translator import translate_pdf_first_paragraph
 from database.credits_client import check_user_credits, deduct_user_credits, get_user_credits
 from handlers.menu_handler import get_user_language
+from utils.download_manager import download_manager
+from config import BOT_NAME, PDF_TRANSLATION_MAX_PAGES
+
+# Koszt tłumaczenia dokumentu PDF
+PDF_TRANSLATION_CREDIT_COST = 8
+
+async def translate_and_send_pdf(context, chat_id, status_message, file_id, file_unique_id, file_name, user_id, language, target_lang="en"):
+    """
+    Tłumaczy cały dokument PDF, pokazując postęp w wiadomości statusowej,
+    i wysyła użytkownikowi przetłumaczony plik PDF
+
+    Args:
+        context: Kontekst bota
+        chat_id (int): ID czatu
+        status_message: Wiadomość, w której pokazywany jest postęp
+        file_id (str): ID pliku w Telegramie
+        file_unique_id (str): Stały identyfikator pliku (klucz cache tekstu PDF)
+        file_name (str): Nazwa pliku
+        user_id (int): ID użytkownika
+        language (str): Język interfejsu użytkownika
+        target_lang (str): Język docelowy tłumaczenia
+
+    Returns:
+        bool: True, jeśli tłumaczenie się powiodło
+    """
+    # Postęp pokazujemy najwyżej co 2 sekundy
+    last_progress_update = 0
+
+    async def report_progress(done, total):
+        nonlocal last_progress_update
+        now = time.monotonic()
+        if done < total and now - last_progress_update < 2.0:
+            return
+        last_progress_update = now
+        await status_message.edit_text(get_text("translating_pdf_progress", language, done=done, total=total))
+
+    # Moduły PDF (PyPDF2, reportlab) są ładowane dopiero przy pierwszym tłumaczeniu
+    from utils.pdf_translator import translate_pdf_document
+    from utils.pdf_generator import generate_translated_pdf
+
+    async with download_manager.open(context.bot, file_id, file_unique_id) as downloaded:
+        result = await translate_pdf_document(
+            downloaded.view(), target_lang, file_unique_id=file_unique_id, progress_callback=report_progress
+        )
+
+    if not result["success"]:
+        await status_message.edit_text(
+            f"*{get_text('pdf_translation_error', language)}*\n\n{result['error']}",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return False
+
+    # Składanie PDF przez reportlab jest synchroniczne - wykonujemy je w osobnym wątku
+    base_name = os.path.splitext(file_name)[0]
+    pdf_buffer = await asyncio.to_thread(
+        generate_translated_pdf, result["pages"], f"{base_name} ({target_lang})", BOT_NAME
+    )
+
+    caption = get_text(
+        "pdf_translation_result", language,
+        pages=result["page_count"], paragraphs=result["paragraph_count"]
+    )
+    if result["truncated"]:
+        caption += "\n" + get_text(
+            "pdf_translation_truncated", language,
+            max_pages=PDF_TRANSLATION_MAX_PAGES, total_pages=result["total_pages"]
+        )
+    await context.bot.send_document(
+        chat_id=chat_id,
+        document=pdf_buffer,
+        filename=f"{base_name}_{target_lang}.pdf",
+        caption=caption
+    )
+
+    # Odejmij kredyty dopiero po dostarczeniu przetłumaczonego pliku
+    deduct_user_credits(user_id, PDF_TRANSLATION_CREDIT_COST, f"Tłumaczenie pliku PDF: {file_name}")
+
+    try:
+        await status_message.delete()
+    except Exception as e:
+        print(f"Błąd usuwania wiadomości statusowej: {e}")
+
+    # Sprawdź aktualny stan kredytów
+    credits = get_user_credits(user_id)
+    if credits < 5:
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=f"*{get_text('low_credits_warning', language)}* {get_text('low_credits_message', language, credits=credits)}",
+            parse_mode=ParseMode.MARKDOWN
+        )
+
+    return True
 
 async def handle_pdf_translation(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Obsługuje tłumaczenie pierwszego akapitu z pliku PDF
+    Obsługuje tłumaczenie całego dokumentu PDF
     """
     user_id = update.effective_user.id
     language = get_user_language(context, user_id)
-    
+
     # Sprawdź, czy użytkownik ma wystarczającą liczbę kredytów
-    credit_cost = 8  # Ustalamy koszt operacji tłumaczenia PDF na 8 kredytów
+    credit_cost = PDF_TRANSLATION_CREDIT_COST
     if not check_user_credits(user_id, credit_cost):
         await update.message.reply_text(get_text("subscription_expired", language))
         return
-    
+
     # Sprawdź, czy wiadomość zawiera plik PDF
     if not update.message.document or not update.message.document.file_name.lower().endswith('.pdf'):
         await update.message.reply_text(get_text("not_pdf_file", language, default="Plik nie jest w formacie PDF."))
         return
-    
+
     document = update.message.document
     file_name = document.file_name
-    
+
     # Sprawdź rozmiar pliku (limit 25MB)
     if document.file_size > 25 * 1024 * 1024:
         await update.message.reply_text(get_text("file_too_large", language))
         return
-    
+
     # Wyślij informację o rozpoczęciu tłumaczenia
     status_message = await update.message.reply_text(get_text("translating_pdf", language))
-    
+
     # Wyślij informację o aktywności bota
-    await update.message.chat.send_action(action=ChatAction.TYPING)
-    
-    # Pobierz plik
-    file = await context.bot.get_file(document.file_id)
-    file_bytes = await file.download_as_bytearray()
-    
-    # Przetłumacz pierwszy akapit
-    result = await translate_pdf_first_paragraph(file_bytes)
-    
-    # Odejmij kredyty
-    deduct_user_credits(user_id, credit_cost, f"Tłumaczenie pliku PDF: {file_name}")
-    
-    # Przygotuj odpowiedź
-    if result["success"]:
-        response = f"*{get_text('pdf_translation_result', language)}*\n\n"
-        response += f"*{get_text('original_text', language)}:*\n{result['original_text']}\n\n"
-        response += f"*{get_text('translated_text', language)}:*\n{result['translated_text']}"
-    else:
-        response = f"*{get_text('pdf_translation_error', language)}*\n\n{result['error']}"
-    
-    # Wyślij wynik tłumaczenia
-    await status_message.edit_text(
-        text=response,
-        parse_mode=ParseMode.MARKDOWN
-    )
-    
-    # Sprawdź aktualny stan kredytów
-    credits = get_user_credits(user_id)
-    if credits < 5:
-        await update.message.reply_text(
-            f"*{get_text('low_credits_warning', language)}* {get_text('low_credits_message', language, credits=credits)}",
-            parse_mode=ParseMode.MARKDOWN
-        )
\ No newline at end of file
+    await update.message.chat.send_action(action=ChatAction.UPLOAD_DOCUMENT)
+
+    try:
+        await translate_and_send_pdf(
+            context, update.effective_chat.id, status_message, document.file_id,
+            document.file_unique_id, file_name, user_id, language
+        )
+    except Exception as e:
+        print(f"Błąd przy tłumaczeniu PDF: {e}")
+        await status_message.edit_text(f"{get_text('pdf_translation_error', language)}: {str(e)}")
@@ -1,10 +1,14 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
-from config import BOT_NAME, AVAILABLE_LANGUAGES
+from config import AVAILABLE_LANGUAGES
 from utils.translations import get_text
 from database.sqlite_client import get_or_create_user, get_message_status
 from database.credits_client import get_user_credits
+from utils.session_registry import get_session, get_session_async
+from handlers.menu_handler import create_main_menu_markup, get_welcome_text, get_query_message_kind
+from utils.media_registry import media_registry
+from utils.message_editor import edit_message, get_message_kind
 
 # Zabezpieczony import z awaryjnym fallbackiem
 try:
@@ -36,9 +40,10 @@ def get_user_language(context, user_id):
     Returns:
         str: Kod języka (pl, en, ru)
     """
-    # Sprawdź, czy język jest zapisany w kontekście
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data'] and 'language' in context.chat_data['user_data'][user_id]:
-        return context.chat_data['user_data'][user_id]['language']
+    # Sprawdź, czy język jest zapisany w sesji
+    session = get_session(context, user_id)
+    if session.language:
+        return session.language
     
     # Jeśli nie, pobierz z bazy danych
     try:
@@ -51,14 +56,8 @@ def get_user_language(context, user_id):
         conn.close()
         
         if result and result[0]:
-            # Zapisz w kontekście na przyszłość
-            if 'user_data' not in context.chat_data:
-                context.chat_data['user_data'] = {}
-            
-            if user_id not in context.chat_data['user_data']:
-                context.chat_data['user_data'][user_id] = {}
-            
-            context.chat_data['user_data'][user_id]['language'] = result[0]
+            # Zapisz w sesji na przyszłość
+            session.language = result[0]
             return result[0]
     except Exception as e:
         print(f"Błąd pobierania języka z bazy: {e}")
@@ -73,14 +72,8 @@ def get_user_language(context, user_id):
             conn.close()
             
             if result and result[0]:
-                # Zapisz w kontekście na przyszłość
-                if 'user_data' not in context.chat_data:
-                    context.chat_data['user_data'] = {}
-                
-                if user_id not in context.chat_data['user_data']:
-                    context.chat_data['user_data'][user_id] = {}
-                
-                context.chat_data['user_data'][user_id]['language'] = result[0]
+                # Zapisz w sesji na przyszłość
+                session.language = result[0]
                 return result[0]
         except Exception as e:
             print(f"Błąd pobierania language_code z bazy: {e}")
@@ -144,8 +137,10 @@ async def show_language_selection(update: Update, context: ContextTypes.DEFAULT_
         language_message = f"Wybierz język / Choose language / Выберите язык:"
         
         # Wyślij zdjęcie z tekstem wyboru języka
-        await update.message.reply_photo(
-            photo=banner_url,
+        await media_registry.send_photo(
+            context.bot,
+            update.effective_chat.id,
+            banner_url,
             caption=language_message,
             reply_markup=reply_markup
         )
@@ -179,14 +174,9 @@ async def handle_language_selection(update: Update, context: ContextTypes.DEFAUL
         except Exception as e:
             print(f"Błąd zapisywania języka: {e}")
         
-        # Zapisz język w kontekście
-        if 'user_data' not in context.chat_data:
-            context.chat_data['user_data'] = {}
-        
-        if user_id not in context.chat_data['user_data']:
-            context.chat_data['user_data'][user_id] = {}
-        
-        context.chat_data['user_data'][user_id]['language'] = language
+        # Zapisz język w sesji
+        session = await get_session_async(context, user_id)
+        session.language = language
         
         # Teraz wszystkie pobierane teksty będą używać nowego języka
         
@@ -194,36 +184,23 @@ async def handle_language_selection(update: Update, context: ContextTypes.DEFAUL
         banner_url = "https://i.imgur.com/OiPImmC.png"
         
         # Pobierz przetłumaczony tekst powitalny
-        welcome_text = get_text("welcome_message", language, bot_name=BOT_NAME)
+        welcome_text = get_welcome_text(language)
         
         # Utwórz klawiaturę menu z przetłumaczonymi tekstami
-        keyboard = [
-            [
-                InlineKeyboardButton(get_text("menu_chat_mode", language), callback_data="menu_section_chat_modes"),
-                InlineKeyboardButton(get_text("image_generate", language), callback_data="menu_image_generate")
-            ],
-            [
-                InlineKeyboardButton(get_text("menu_credits", language), callback_data="menu_section_credits"),
-                InlineKeyboardButton(get_text("menu_dialog_history", language), callback_data="menu_section_history")
-            ],
-            [
-                InlineKeyboardButton(get_text("menu_settings", language), callback_data="menu_section_settings"),
-                InlineKeyboardButton(get_text("menu_help", language), callback_data="menu_help")
-            ]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = create_main_menu_markup(language)
         
         # Aktualizuj wiadomość
         try:
-            await query.edit_message_caption(
-                caption=welcome_text,
+            await edit_message(
+                query,
+                kind=get_query_message_kind(query),
+                text=welcome_text,
                 reply_markup=reply_markup
             )
             
             # Zapisz ID wiadomości menu i stan menu
             from handlers.menu_handler import store_menu_state
-            store_menu_state(context, user_id, 'main', query.message.message_id)
+            store_menu_state(context, user_id, 'main', query.message.message_id, get_message_kind(query.message))
         except Exception as e:
             print(f"Błąd przy aktualizacji podpisu wiadomości: {e}")
             try:
@@ -237,7 +214,7 @@ async def handle_language_selection(update: Update, context: ContextTypes.DEFAUL
                 
                 # Zapisz ID wiadomości menu i stan menu
                 from handlers.menu_handler import store_menu_state
-                store_menu_state(context, user_id, 'main', message.message_id)
+                store_menu_state(context, user_id, 'main', message.message_id, get_message_kind(message))
             except Exception as e2:
                 print(f"Błąd przy wysyłaniu nowej wiadomości: {e2}")
     except Exception as e:
@@ -256,14 +233,9 @@ async def show_welcome_message(update: Update, context: ContextTypes.DEFAULT_TYP
             if not language:
                 language = "pl"  # Domyślny język
         
-        # Zapisz język w kontekście
-        if 'user_data' not in context.chat_data:
-            context.chat_data['user_data'] = {}
-        
-        if user_id not in context.chat_data['user_data']:
-            context.chat_data['user_data'][user_id] = {}
-        
-        context.chat_data['user_data'][user_id]['language'] = language
+        # Zapisz język w sesji
+        session = await get_session_async(context, user_id)
+        session.language = language
         
         # Pobierz stan kredytów
         credits = get_user_credits(user_id)
@@ -272,36 +244,23 @@ async def show_welcome_message(update: Update, context: ContextTypes.DEFAULT_TYP
         banner_url = "https://i.imgur.com/YPubLDE.png"
         
         # Pobierz przetłumaczony tekst powitalny
-        welcome_text = get_text("welcome_message", language, bot_name=BOT_NAME)
+        welcome_text = get_welcome_text(language)
         
         # Utwórz klawiaturę menu
-        keyboard = [
-            [
-                InlineKeyboardButton(get_text("menu_chat_mode", language), callback_data="menu_section_chat_modes"),
-                InlineKeyboardButton(get_text("image_generate", language), callback_data="menu_image_generate")
-            ],
-            [
-                InlineKeyboardButton(get_text("menu_credits", language), callback_data="menu_section_credits"),
-                InlineKeyboardButton(get_text("menu_dialog_history", language), callback_data="menu_section_history")
-            ],
-            [
-                InlineKeyboardButton(get_text("menu_settings", language), callback_data="menu_section_settings"),
-                InlineKeyboardButton(get_text("menu_help", language), callback_data="menu_help")
-            ]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = create_main_menu_markup(language)
         
         # Wyślij zdjęcie z podpisem i menu
-        message = await update.message.reply_photo(
-            photo=banner_url,
+        message = await media_registry.send_photo(
+            context.bot,
+            update.effective_chat.id,
+            banner_url,
             caption=welcome_text,
             reply_markup=reply_markup
         )
         
         # Zapisz ID wiadomości menu i stan menu
         from handlers.menu_handler import store_menu_state
-        store_menu_state(context, user_id, 'main', message.message_id)
+        store_menu_state(context, user_id, 'main', message.message_id, get_message_kind(message))
         
         return message
     except Exception as e:
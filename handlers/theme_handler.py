@@ -8,6 +8,7 @@ from database.sqlite_client import (
 )
 from utils.translations import get_text
 from handlers.menu_handler import get_user_language
+from utils.session_registry import get_session_async
 
 async def theme_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -48,14 +49,9 @@ async def create_new_theme(update: Update, context: ContextTypes.DEFAULT_TYPE, t
         return
     
     # Zapisz aktualny temat w kontekście użytkownika
-    if 'user_data' not in context.chat_data:
-        context.chat_data['user_data'] = {}
-    
-    if user_id not in context.chat_data['user_data']:
-        context.chat_data['user_data'][user_id] = {}
-    
-    context.chat_data['user_data'][user_id]['current_theme_id'] = theme['id']
-    context.chat_data['user_data'][user_id]['current_theme_name'] = theme['theme_name']
+    session = await get_session_async(context, user_id)
+    session.current_theme_id = theme['id']
+    session.current_theme_name = theme['theme_name']
     
     # Utwórz konwersację dla tego tematu
     conversation = get_active_themed_conversation(user_id, theme['id'])
@@ -107,11 +103,9 @@ async def show_themes_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
     reply_markup = InlineKeyboardMarkup(keyboard)
     
     # Pobierz aktualny temat
-    current_theme_id = None
-    current_theme_name = "brak"
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data']:
-        current_theme_id = context.chat_data['user_data'][user_id].get('current_theme_id')
-        current_theme_name = context.chat_data['user_data'][user_id].get('current_theme_name', "brak")
+    session = await get_session_async(context, user_id)
+    current_theme_id = session.current_theme_id
+    current_theme_name = session.current_theme_name or "brak"
     
     await update.message.reply_text(
         f"📑 *Tematy konwersacji*\n\n"
@@ -143,12 +137,10 @@ async def handle_theme_callback(update: Update, context: ContextTypes.DEFAULT_TY
     
     # Obsługa przycisku rozmowy bez tematu
     if query.data == "no_theme":
-        # Usuń aktualny temat z kontekstu użytkownika
-        if 'user_data' in context.chat_data and user_id in context.chat_data['user_data']:
-            if 'current_theme_id' in context.chat_data['user_data'][user_id]:
-                del context.chat_data['user_data'][user_id]['current_theme_id']
-            if 'current_theme_name' in context.chat_data['user_data'][user_id]:
-                del context.chat_data['user_data'][user_id]['current_theme_name']
+        # Usuń aktualny temat z sesji użytkownika
+        session = await get_session_async(context, user_id)
+        session.current_theme_id = None
+        session.current_theme_name = None
         
         # Utwórz nową konwersację bez tematu
         from database.sqlite_client import create_new_conversation
@@ -174,14 +166,9 @@ async def handle_theme_callback(update: Update, context: ContextTypes.DEFAULT_TY
             return
         
         # Zapisz aktualny temat w kontekście użytkownika
-        if 'user_data' not in context.chat_data:
-            context.chat_data['user_data'] = {}
-        
-        if user_id not in context.chat_data['user_data']:
-            context.chat_data['user_data'][user_id] = {}
-        
-        context.chat_data['user_data'][user_id]['current_theme_id'] = theme['id']
-        context.chat_data['user_data'][user_id]['current_theme_name'] = theme['theme_name']
+        session = await get_session_async(context, user_id)
+        session.current_theme_id = theme['id']
+        session.current_theme_name = theme['theme_name']
         
         # Pobierz aktywną konwersację dla tego tematu
         conversation = get_active_themed_conversation(user_id, theme['id'])
@@ -201,12 +188,10 @@ async def notheme_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     language = get_user_language(context, user_id)
     
-    # Usuń aktualny temat z kontekstu użytkownika
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data']:
-        if 'current_theme_id' in context.chat_data['user_data'][user_id]:
-            del context.chat_data['user_data'][user_id]['current_theme_id']
-        if 'current_theme_name' in context.chat_data['user_data'][user_id]:
-            del context.chat_data['user_data'][user_id]['current_theme_name']
+    # Usuń aktualny temat z sesji użytkownika
+    session = await get_session_async(context, user_id)
+    session.current_theme_id = None
+    session.current_theme_name = None
     
     # Utwórz nową konwersację bez tematu
     from database.sqlite_client import create_new_conversation
@@ -5,7 +5,13 @@ from utils.translations import get_text
 from utils.openai_client import analyze_image, analyze_document
 from database.credits_client import check_user_credits, deduct_user_credits, get_user_credits
 from handlers.menu_handler import get_user_language
+from utils.download_manager import download_manager
+from utils.streamed_reply import send_long_reply
+import os
 import re
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -79,11 +85,9 @@ async def translate_photo(update: Update, context: ContextTypes.DEFAULT_TYPE, ph
     await update.message.chat.send_action(action=ChatAction.TYPING)
     
     # Pobierz zdjęcie
-    file = await context.bot.get_file(photo.file_id)
-    file_bytes = await file.download_as_bytearray()
-    
-    # Tłumacz tekst ze zdjęcia w określonym kierunku
-    result = await analyze_image(file_bytes, f"photo_{photo.file_unique_id}.jpg", mode="translate", target_language=target_lang)
+    async with download_manager.open(context.bot, photo.file_id, photo.file_unique_id) as downloaded:
+        # Tłumacz tekst ze zdjęcia w określonym kierunku
+        result = await analyze_image(downloaded.view(), f"photo_{photo.file_unique_id}.jpg", mode="translate", target_language=target_lang)
     
     # Odejmij kredyty
     deduct_user_credits(user_id, credit_cost, f"Tłumaczenie tekstu ze zdjęcia na język {target_lang}")
@@ -129,21 +133,25 @@ async def translate_document(update: Update, context: ContextTypes.DEFAULT_TYPE,
     await update.message.chat.send_action(action=ChatAction.TYPING)
     
     # Pobierz plik
-    file = await context.bot.get_file(document.file_id)
-    file_bytes = await file.download_as_bytearray()
-    
-    # Tłumacz dokument
-    result = await analyze_document(file_bytes, file_name, mode="translate", target_language=target_lang)
+    async with download_manager.open(context.bot, document.file_id, document.file_unique_id) as downloaded:
+        # Tłumacz dokument
+        result = await analyze_document(downloaded.view(), file_name, mode="translate", target_language=target_lang)
+    
+    # Wyślij tłumaczenie (długie tłumaczenie trafia do kilku wiadomości lub pliku)
+    try:
+        await send_long_reply(
+            message,
+            f"**{get_text('translation_result', language, default='Wynik tłumaczenia')}**\n\n{result}",
+            document_name=f"{os.path.splitext(file_name)[0]}_{target_lang}.md"
+        )
+    except Exception as e:
+        logger.error(f"Nie udało się wysłać tłumaczenia dokumentu {file_name}: {e}")
+        await update.message.reply_text(get_text("response_error", language, error=str(e)))
+        return
     
-    # Odejmij kredyty
+    # Odejmij kredyty dopiero po dostarczeniu tłumaczenia
     deduct_user_credits(user_id, credit_cost, f"Tłumaczenie dokumentu na język {target_lang}: {file_name}")
     
-    # Wyślij tłumaczenie
-    await message.edit_text(
-        f"*{get_text('translation_result', language, default='Wynik tłumaczenia')}*\n\n{result}",
-        parse_mode=ParseMode.MARKDOWN
-    )
-    
     # Sprawdź aktualny stan kredytów
     credits = get_user_credits(user_id)
     if credits < 5:
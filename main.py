@@ -1,11 +1,12 @@
 import logging
 import os
 import re
+import asyncio
 import datetime
 import pytz
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram import ReplyKeyboardRemove
-from handlers.help_handler import help_command, check_status
+from handlers.help_handler import help_command, create_status_summary_template
 from handlers.translate_handler import translate_command
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, 
@@ -15,23 +16,24 @@ from telegram.constants import ParseMode, ChatAction
 from config import (
     TELEGRAM_TOKEN, DEFAULT_MODEL, AVAILABLE_MODELS, 
     MAX_CONTEXT_MESSAGES, CHAT_MODES, BOT_NAME, CREDIT_COSTS,
-    AVAILABLE_LANGUAGES, ADMIN_USER_IDS
+    AVAILABLE_LANGUAGES, ADMIN_USER_IDS, BOT_TRANSPORT, MAX_CONCURRENT_UPDATES, OPENAI_API_KEY,
+    ADMIN_STATS_DEFAULT_DAYS, ADMIN_STATS_MAX_DAYS
 )
 
 # Import funkcji z modułu tłumaczeń
-from utils.translations import get_text
+from utils.translations import get_text, catalog
 
 # Import funkcji z modułu sqlite_client
 from database.sqlite_client import (
     get_or_create_user, create_new_conversation, 
     get_active_conversation, save_message, 
-    get_conversation_history, get_message_status
+    get_conversation_history, get_message_status, init_database
 )
 
 # Import funkcji obsługi kredytów
 from database.credits_client import (
     get_user_credits, add_user_credits, deduct_user_credits, 
-    check_user_credits
+    check_user_credits, get_credit_packages
 )
 
 # Import handlerów kredytów
@@ -47,7 +49,8 @@ from handlers.code_handler import (
 
 # Import handlerów menu
 from handlers.menu_handler import (
-    handle_menu_callback, set_user_name, get_user_language, store_menu_state
+    handle_menu_callback, set_user_name, get_user_language, store_menu_state,
+    update_menu, create_main_menu_markup, get_restart_text, get_query_message_kind
 )
 
 # Import handlera start
@@ -68,8 +71,19 @@ from utils.openai_client import (
 
 # Import handlera eksportu
 from handlers.export_handler import export_conversation
+from utils.streamed_reply import StreamedReply, send_long_reply
+from utils.update_processor import UserOrderedUpdateProcessor
+from utils.session_registry import get_session_async, session_registry
+from utils.callback_router import callback_router
+from utils.warmup import run_warm_up
+from utils.media_registry import media_registry
+from utils.message_editor import edit_message, get_message_kind, get_edit_stats
+from utils.download_manager import download_manager
+from utils.file_cache import file_cache
+from utils.admin_analytics import load_reports, format_summary, export_report_bytes, check_export_format
+from utils.callback_store import callback_store, make_callback_data, resolve_callback_payload
+from handlers.pdf_handler import translate_and_send_pdf, PDF_TRANSLATION_CREDIT_COST
 from handlers.theme_handler import theme_command, notheme_command, handle_theme_callback
-from utils.credit_analytics import generate_credit_usage_chart, generate_usage_breakdown_chart
 
 # Konfiguracja loggera
 logging.basicConfig(
@@ -88,13 +102,8 @@ async def onboarding_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     language = get_user_language(context, user_id)
     
     # Inicjalizacja stanu onboardingu
-    if 'user_data' not in context.chat_data:
-        context.chat_data['user_data'] = {}
-    
-    if user_id not in context.chat_data['user_data']:
-        context.chat_data['user_data'][user_id] = {}
-    
-    context.chat_data['user_data'][user_id]['onboarding_state'] = 0
+    session = await get_session_async(context, user_id)
+    session.onboarding_state = 0
     
     # Lista kroków onboardingu
     steps = [
@@ -124,8 +133,10 @@ async def onboarding_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     reply_markup = InlineKeyboardMarkup(keyboard)
     
     # Wysyłamy zdjęcie z podpisem dla pierwszego kroku
-    await update.message.reply_photo(
-        photo=get_onboarding_image_url(step_name),
+    await media_registry.send_photo(
+        context.bot,
+        update.effective_chat.id,
+        get_onboarding_image_url(step_name),
         caption=text,
         reply_markup=reply_markup,
         parse_mode=ParseMode.MARKDOWN
@@ -163,17 +174,13 @@ async def handle_onboarding_callback(update: Update, context: ContextTypes.DEFAU
     await query.answer()  # Odpowiedz na callback, aby usunąć oczekiwanie
     
     # Inicjalizacja stanu onboardingu jeśli nie istnieje
-    if 'user_data' not in context.chat_data:
-        context.chat_data['user_data'] = {}
+    session = await get_session_async(context, user_id)
     
-    if user_id not in context.chat_data['user_data']:
-        context.chat_data['user_data'][user_id] = {}
-    
-    if 'onboarding_state' not in context.chat_data['user_data'][user_id]:
-        context.chat_data['user_data'][user_id]['onboarding_state'] = 0
+    if session.onboarding_state is None:
+        session.onboarding_state = 0
     
     # Pobierz aktualny stan onboardingu
-    current_step = context.chat_data['user_data'][user_id]['onboarding_state']
+    current_step = session.onboarding_state
     
     # Lista kroków onboardingu
     steps = [
@@ -185,17 +192,16 @@ async def handle_onboarding_callback(update: Update, context: ContextTypes.DEFAU
     if query.data == "onboarding_next":
         # Przejdź do następnego kroku
         next_step = min(current_step + 1, len(steps) - 1)
-        context.chat_data['user_data'][user_id]['onboarding_state'] = next_step
+        session.onboarding_state = next_step
         step_name = steps[next_step]
     elif query.data == "onboarding_back":
         # Wróć do poprzedniego kroku
         prev_step = max(0, current_step - 1)
-        context.chat_data['user_data'][user_id]['onboarding_state'] = prev_step
+        session.onboarding_state = prev_step
         step_name = steps[prev_step]
     elif query.data == "onboarding_finish":
         # Usuń stan onboardingu
-        if 'onboarding_state' in context.chat_data['user_data'][user_id]:
-            del context.chat_data['user_data'][user_id]['onboarding_state']
+        session.onboarding_state = None
         
         # Usuń wiadomość onboardingu
         try:
@@ -209,7 +215,7 @@ async def handle_onboarding_callback(update: Update, context: ContextTypes.DEFAU
         return
     
     # Pobierz aktualny krok po aktualizacji
-    current_step = context.chat_data['user_data'][user_id]['onboarding_state']
+    current_step = session.onboarding_state
     step_name = steps[current_step]
     
     # Przygotuj tekst dla aktualnego kroku
@@ -245,20 +251,17 @@ async def handle_onboarding_callback(update: Update, context: ContextTypes.DEFAU
     image_url = get_onboarding_image_url(step_name)
     
     try:
-        # Usuń poprzednią wiadomość i wyślij nową z odpowiednim obrazem
-        await query.message.delete()
-        await context.bot.send_photo(
-            chat_id=query.message.chat_id,
-            photo=image_url,
-            caption=text,
-            reply_markup=reply_markup
-        )
+        # Zamień obraz i podpis w obecnej wiadomości (jedno zapytanie, bez usuwania)
+        await media_registry.edit_photo(query.message, image_url, caption=text, reply_markup=reply_markup)
     except Exception as e:
         print(f"Błąd przy aktualizacji wiadomości onboardingu: {e}")
         try:
-            # Jeśli usunięcie i wysłanie nowej wiadomości się nie powiedzie, 
-            # próbujemy zaktualizować obecną
-            await query.edit_message_caption(
+            # Jeśli edycja się nie powiedzie, usuń wiadomość i wyślij nową z odpowiednim obrazem
+            await query.message.delete()
+            await media_registry.send_photo(
+                context.bot,
+                query.message.chat_id,
+                image_url,
                 caption=text,
                 reply_markup=reply_markup
             )
@@ -279,22 +282,8 @@ async def restart_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Resetowanie konwersacji - tworzymy nową konwersację i czyścimy kontekst
         conversation = create_new_conversation(user_id)
         
-        # Zachowujemy wybrane ustawienia użytkownika (język, model)
-        user_data = {}
-        if 'user_data' in context.chat_data and user_id in context.chat_data['user_data']:
-            # Pobieramy tylko podstawowe ustawienia, reszta jest resetowana
-            old_user_data = context.chat_data['user_data'][user_id]
-            if 'language' in old_user_data:
-                user_data['language'] = old_user_data['language']
-            if 'current_model' in old_user_data:
-                user_data['current_model'] = old_user_data['current_model']
-            if 'current_mode' in old_user_data:
-                user_data['current_mode'] = old_user_data['current_mode']
-        
-        # Resetujemy dane użytkownika w kontekście i ustawiamy tylko zachowane ustawienia
-        if 'user_data' not in context.chat_data:
-            context.chat_data['user_data'] = {}
-        context.chat_data['user_data'][user_id] = user_data
+        # Zachowujemy wybrane ustawienia użytkownika (język, model, tryb), reszta sesji jest resetowana
+        (await get_session_async(context, user_id)).reset()
         
         # Pobierz język użytkownika
         language = get_user_language(context, user_id)
@@ -302,36 +291,21 @@ async def restart_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Wyślij potwierdzenie restartu
         restart_message = get_text("restart_command", language)
         
-        # Utwórz klawiaturę menu
-        keyboard = [
-            [
-                InlineKeyboardButton(get_text("menu_chat_mode", language), callback_data="menu_section_chat_modes"),
-                InlineKeyboardButton(get_text("image_generate", language), callback_data="menu_image_generate")
-            ],
-            [
-                InlineKeyboardButton(get_text("menu_credits", language), callback_data="menu_section_credits"),
-                InlineKeyboardButton(get_text("menu_dialog_history", language), callback_data="menu_section_history")
-            ],
-            [
-                InlineKeyboardButton(get_text("menu_settings", language), callback_data="menu_section_settings"),
-                InlineKeyboardButton(get_text("menu_help", language), callback_data="menu_help")
-            ]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        # Klawiatura menu
+        reply_markup = create_main_menu_markup(language)
         
         # Wyślij wiadomość z menu
         try:
             # Próbuj wysłać wiadomość tekstową zamiast zdjęcia
             message = await context.bot.send_message(
                 chat_id=chat_id,
-                text=restart_message + "\n\n" + get_text("welcome_message", language, bot_name=BOT_NAME),
+                text=get_restart_text(language),
                 reply_markup=reply_markup,
                 parse_mode=ParseMode.MARKDOWN
             )
             
             # Zapisz ID wiadomości menu i stan menu
-            store_menu_state(context, user_id, 'main', message.message_id)
+            store_menu_state(context, user_id, 'main', message.message_id, get_message_kind(message))
             
         except Exception as e:
             print(f"Błąd przy wysyłaniu wiadomości po restarcie: {e}")
@@ -373,30 +347,17 @@ async def check_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Pobranie aktualnego trybu czatu
     current_mode = get_text("no_mode", language)
     current_mode_cost = 1
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data']:
-        user_data = context.chat_data['user_data'][user_id]
-        if 'current_mode' in user_data and user_data['current_mode'] in CHAT_MODES:
-            mode_id = user_data['current_mode']
-            current_mode = get_text(f"chat_mode_{mode_id}", language, default=CHAT_MODES[mode_id]["name"])
-            current_mode_cost = CHAT_MODES[mode_id]["credit_cost"]
-    
-    # Stwórz wiadomość o statusie, używając tłumaczeń
-    message = f"""
-*{get_text("status_command", language, bot_name=BOT_NAME)}*
-
-{get_text("available_credits", language)}: *{credits}*
-{get_text("current_mode", language)}: *{current_mode}* ({get_text("cost", language)}: {current_mode_cost} {get_text("credits_per_message", language)})
-
-{get_text("operation_costs", language)}:
-- {get_text("standard_message", language)} (GPT-3.5): 1 {get_text("credit", language)}
-- {get_text("premium_message", language)} (GPT-4o): 3 {get_text("credits", language)}
-- {get_text("expert_message", language)} (GPT-4): 5 {get_text("credits", language)}
-- {get_text("dalle_image", language)}: 10-15 {get_text("credits", language)}
-- {get_text("document_analysis", language)}: 5 {get_text("credits", language)}
-- {get_text("photo_analysis", language)}: 8 {get_text("credits", language)}
-
-{get_text("buy_more_credits", language)}: /buy.
-"""
+    mode_id = (await get_session_async(context, user_id)).current_mode
+    if mode_id in CHAT_MODES:
+        current_mode = get_text(f"chat_mode_{mode_id}", language, default=CHAT_MODES[mode_id]["name"])
+        current_mode_cost = CHAT_MODES[mode_id]["credit_cost"]
+    
+    # Stwórz wiadomość o statusie z gotowego szablonu
+    message = create_status_summary_template(language).render(
+        credits=credits,
+        current_mode=current_mode,
+        current_mode_cost=current_mode_cost
+    )
     
     await update.message.reply_text(message, parse_mode=ParseMode.MARKDOWN)
 
@@ -455,17 +416,24 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_message = update.message.text
     language = get_user_language(context, user_id)
     
+    # Wiadomości wysłane szybko po sobie łączymy w jedno zapytanie
+    processor = context.application.update_processor
+    if isinstance(processor, UserOrderedUpdateProcessor):
+        burst = await processor.collect_burst(user_id, update)
+        user_message = "\n\n".join(burst)
+    else:
+        processor = None
+    
     print(f"Otrzymano wiadomość od użytkownika {user_id}: {user_message}")
     
     # Określ tryb i koszt kredytów
     current_mode = "no_mode"
     credit_cost = 1
     
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data']:
-        user_data = context.chat_data['user_data'][user_id]
-        if 'current_mode' in user_data and user_data['current_mode'] in CHAT_MODES:
-            current_mode = user_data['current_mode']
-            credit_cost = CHAT_MODES[current_mode]["credit_cost"]
+    session = await get_session_async(context, user_id)
+    if session.current_mode in CHAT_MODES:
+        current_mode = session.current_mode
+        credit_cost = CHAT_MODES[current_mode]["credit_cost"]
     
     print(f"Tryb: {current_mode}, koszt kredytów: {credit_cost}")
     
@@ -509,12 +477,10 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     model_to_use = CHAT_MODES[current_mode].get("model", DEFAULT_MODEL)
     
     # Jeśli użytkownik wybrał konkretny model, użyj go
-    if 'user_data' in context.chat_data and user_id in context.chat_data['user_data']:
-        user_data = context.chat_data['user_data'][user_id]
-        if 'current_model' in user_data:
-            model_to_use = user_data['current_model']
-            # Aktualizuj koszt kredytów na podstawie modelu
-            credit_cost = CREDIT_COSTS["message"].get(model_to_use, CREDIT_COSTS["message"]["default"])
+    if session.current_model:
+        model_to_use = session.current_model
+        # Aktualizuj koszt kredytów na podstawie modelu
+        credit_cost = CREDIT_COSTS["message"].get(model_to_use, CREDIT_COSTS["message"]["default"])
     
     print(f"Używany model: {model_to_use}")
     
@@ -528,40 +494,49 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Wyślij początkową pustą wiadomość, którą będziemy aktualizować
     response_message = await update.message.reply_text(get_text("generating_response", language))
     
-    # Zainicjuj pełną odpowiedź
+    # Zainicjuj pełną odpowiedź (długie odpowiedzi są kontynuowane w kolejnych wiadomościach)
     full_response = ""
-    buffer = ""
-    last_update = datetime.datetime.now().timestamp()
+    reply = StreamedReply(response_message)
     
-    # Spróbuj wygenerować odpowiedź
-    try:
-        print("Rozpoczynam generowanie odpowiedzi strumieniowej...")
-        # Generuj odpowiedź strumieniowo
+    async def stream_response():
+        nonlocal full_response
         async for chunk in chat_completion_stream(messages, model=model_to_use):
             full_response += chunk
-            buffer += chunk
             
-            # Aktualizuj wiadomość co 1 sekundę lub gdy bufor jest wystarczająco duży
-            current_time = datetime.datetime.now().timestamp()
-            if current_time - last_update >= 1.0 or len(buffer) > 100:
-                try:
-                    # Dodaj migający kursor na końcu wiadomości
-                    await response_message.edit_text(full_response + "▌", parse_mode=ParseMode.MARKDOWN)
-                    buffer = ""
-                    last_update = current_time
-                except Exception as e:
-                    # Jeśli wystąpi błąd (np. wiadomość nie została zmieniona), kontynuuj
-                    print(f"Błąd przy aktualizacji wiadomości: {e}")
+            # Planista edycji sam decyduje, kiedy zaktualizować wiadomość
+            await reply.feed(chunk)
+    
+    # Spróbuj wygenerować odpowiedź
+    try:
+        print("Rozpoczynam generowanie odpowiedzi strumieniowej...")
+        # Generowanie działa w osobnym zadaniu, które nowa wiadomość użytkownika może przerwać
+        stream_task = asyncio.create_task(stream_response())
+        if processor:
+            processor.register_stream(user_id, stream_task)
+        try:
+            await stream_task
+            interrupted = False
+        except asyncio.CancelledError:
+            if not stream_task.cancelled():
+                # Anulowano cały handler, a nie tylko generowanie
+                stream_task.cancel()
+                raise
+            interrupted = True
+        finally:
+            if processor:
+                processor.unregister_stream(user_id, stream_task)
         
-        print("Zakończono generowanie odpowiedzi")
+        if interrupted:
+            print(f"Generowanie przerwane przez nową wiadomość użytkownika {user_id}")
+            if not full_response:
+                await reply.fail(get_text("response_interrupted", language))
+                return
+            await reply.feed("\n\n" + get_text("response_interrupted", language))
+        else:
+            print("Zakończono generowanie odpowiedzi")
         
-        # Aktualizuj wiadomość z pełną odpowiedzią bez kursora
-        try:
-            await response_message.edit_text(full_response, parse_mode=ParseMode.MARKDOWN)
-        except Exception as e:
-            # Jeśli wystąpi błąd formatowania Markdown, wyślij bez formatowania
-            print(f"Błąd formatowania Markdown: {e}")
-            await response_message.edit_text(full_response)
+        # Aktualizuj wiadomość z pełną odpowiedzią bez kursora (bez formatowania, jeśli Markdown jest niepoprawny)
+        await reply.finish()
         
         # Zapisz odpowiedź do bazy danych
         save_message(conversation_id, user_id, full_response, is_from_user=False, model_used=model_to_use)
@@ -571,7 +546,7 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         print(f"Odjęto {credit_cost} kredytów za wiadomość")
     except Exception as e:
         print(f"Wystąpił błąd podczas generowania odpowiedzi: {e}")
-        await response_message.edit_text(f"Wystąpił błąd podczas generowania odpowiedzi: {str(e)}")
+        await reply.fail(f"Wystąpił błąd podczas generowania odpowiedzi: {str(e)}")
         return
     
     # Sprawdź aktualny stan kredytów
@@ -629,31 +604,47 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Wyślij informację o aktywności bota
     await update.message.chat.send_action(action=ChatAction.TYPING)
     
-    file = await context.bot.get_file(document.file_id)
-    file_bytes = await file.download_as_bytearray()
+    # Postęp analizy dużych plików pokazujemy w wiadomości statusowej (najwyżej co 2 sekundy)
+    last_progress_update = 0
     
-    # Analizuj plik - w trybie tłumaczenia lub analizy w zależności od opcji
-    if translate_mode:
-        analysis = await analyze_document(file_bytes, file_name, mode="translate")
-        header = f"*{get_text('translated_text', language)}:*\n\n"
-    else:
-        analysis = await analyze_document(file_bytes, file_name)
-        header = f"*{get_text('file_analysis', language)}:* {file_name}\n\n"
+    async def report_progress(done, total):
+        nonlocal last_progress_update
+        now = datetime.datetime.now().timestamp()
+        if done < total and now - last_progress_update < 2.0:
+            return
+        last_progress_update = now
+        status_key = "translating_file_progress" if translate_mode else "analyzing_file_progress"
+        await message.edit_text(get_text(status_key, language, done=done, total=total))
+    
+    # Analizuj plik - w trybie tłumaczenia lub analizy w zależności od opcji.
+    # Plik jest pobierany strumieniowo i przekazywany jako widok bez kopiowania
+    async with download_manager.open(context.bot, document.file_id, document.file_unique_id) as downloaded:
+        if translate_mode:
+            analysis = await analyze_document(downloaded.view(), file_name, mode="translate", progress_callback=report_progress)
+            header = f"**{get_text('translated_text', language)}:**\n\n"
+        else:
+            analysis = await analyze_document(downloaded.view(), file_name, progress_callback=report_progress, file_unique_id=document.file_unique_id)
+            header = f"**{get_text('file_analysis', language)}:** {file_name}\n\n"
     
-    # Odejmij kredyty
+    # Wyślij analizę do użytkownika - tłumaczenie dużego pliku może zająć wiele wiadomości
+    try:
+        await send_long_reply(message, f"{header}{analysis}", document_name=f"{os.path.splitext(file_name)[0]}.md")
+    except Exception as e:
+        logger.error(f"Nie udało się wysłać wyniku analizy pliku {file_name}: {e}")
+        await update.message.reply_text(get_text("response_error", language, error=str(e)))
+        return
+    
+    # Odejmij kredyty dopiero po dostarczeniu wyniku
     description = "Tłumaczenie dokumentu" if translate_mode else "Analiza dokumentu"
     deduct_user_credits(user_id, credit_cost, f"{description}: {file_name}")
     
-    # Wyślij analizę do użytkownika
-    await message.edit_text(
-        f"{header}{analysis}",
-        parse_mode=ParseMode.MARKDOWN
-    )
-    
     # Dodaj klawiaturę z dodatkowymi opcjami dla plików PDF
     if is_pdf and not translate_mode:
         keyboard = [[
-            InlineKeyboardButton(get_text("pdf_translate_button", language), callback_data=f"translate_pdf_{document.file_id}")
+            InlineKeyboardButton(get_text("pdf_translate_button", language), callback_data=make_callback_data(
+                "translate_pdf_",
+                {"file_id": document.file_id, "file_unique_id": document.file_unique_id, "file_name": file_name}
+            ))
         ]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
@@ -700,16 +691,14 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Wyślij informację o aktywności bota
     await update.message.chat.send_action(action=ChatAction.TYPING)
     
-    file = await context.bot.get_file(photo.file_id)
-    file_bytes = await file.download_as_bytearray()
-    
     # Analizuj zdjęcie w odpowiednim trybie
-    if translate_mode:
-        result = await analyze_image(file_bytes, f"photo_{photo.file_unique_id}.jpg", mode="translate")
-        header = "*Tłumaczenie tekstu ze zdjęcia:*\n\n"
-    else:
-        result = await analyze_image(file_bytes, f"photo_{photo.file_unique_id}.jpg", mode="analyze")
-        header = "*Analiza zdjęcia:*\n\n"
+    async with download_manager.open(context.bot, photo.file_id, photo.file_unique_id) as downloaded:
+        if translate_mode:
+            result = await analyze_image(downloaded.view(), f"photo_{photo.file_unique_id}.jpg", mode="translate")
+            header = "*Tłumaczenie tekstu ze zdjęcia:*\n\n"
+        else:
+            result = await analyze_image(downloaded.view(), f"photo_{photo.file_unique_id}.jpg", mode="analyze")
+            header = "*Analiza zdjęcia:*\n\n"
     
     # Odejmij kredyty
     description = "Tłumaczenie tekstu ze zdjęcia" if translate_mode else "Analiza zdjęcia"
@@ -724,7 +713,9 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Dodaj klawiaturę z dodatkowymi opcjami
     if not translate_mode:
         keyboard = [[
-            InlineKeyboardButton("🔄 Przetłumacz tekst z tego zdjęcia", callback_data=f"translate_photo_{photo.file_id}")
+            InlineKeyboardButton("🔄 Przetłumacz tekst z tego zdjęcia", callback_data=make_callback_data(
+                "translate_photo_", {"file_id": photo.file_id, "file_unique_id": photo.file_unique_id}
+            ))
         ]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
@@ -762,11 +753,9 @@ async def handle_photo_translate(update: Update, context: ContextTypes.DEFAULT_T
     # Wyślij informację o aktywności bota
     await update.message.chat.send_action(action=ChatAction.TYPING)
     
-    file = await context.bot.get_file(photo.file_id)
-    file_bytes = await file.download_as_bytearray()
-    
     # Analizuj zdjęcie w trybie tłumaczenia
-    translation = await analyze_image(file_bytes, f"photo_{photo.file_unique_id}.jpg", mode="translate")
+    async with download_manager.open(context.bot, photo.file_id, photo.file_unique_id) as downloaded:
+        translation = await analyze_image(downloaded.view(), f"photo_{photo.file_unique_id}.jpg", mode="translate")
     
     # Odejmij kredyty
     deduct_user_credits(user_id, credit_cost, "Tłumaczenie tekstu ze zdjęcia")
@@ -804,680 +793,404 @@ async def show_translation_instructions(update: Update, context: ContextTypes.DE
 # Handlers dla przycisków i callbacków
 
 async def handle_callback_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Obsługa zapytań zwrotnych (z przycisków)"""
+    """Obsługa zapytań zwrotnych (z przycisków) - kierowanie do handlera przez router"""
     query = update.callback_query
-    
-    # Dodaj debugowanie
-    print(f"Otrzymano callback: {query.data}")
-    user_id = query.from_user.id
-    language = get_user_language(context, user_id)
-    
+    logger.debug(f"Otrzymano callback: {query.data}")
+
     # Zawsze odpowiadaj na callback, aby usunąć oczekiwanie
     await query.answer()
-    
-    # Obsługa przycisków onboardingu
-    if query.data.startswith("onboarding_"):
-        await handle_onboarding_callback(update, context)
-        return
-    
-    # Najpierw sprawdzamy, czy to callback związany z menu
-    if query.data.startswith("menu_"):
-        print(f"Rozpoznano callback menu: {query.data}")
-        try:
-            # Importuj funkcję obsługi menu
-            from handlers.menu_handler import handle_menu_callback
-            result = await handle_menu_callback(update, context)
-            print(f"Wynik obsługi menu: {result}")
-            if result:
-                return
-            # Jeśli menu_handler nie obsłużył callbacku, kontynuujemy poniżej
-        except Exception as e:
-            print(f"Błąd w obsłudze menu: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            # Wyślij informację o błędzie
-            try:
-                # Sprawdź, czy wiadomość ma podpis (jest to zdjęcie lub inny typ mediów)
-                if hasattr(query.message, 'caption'):
-                    await query.edit_message_caption(
-                        caption=f"Wystąpił błąd podczas obsługi menu: {str(e)}",
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                else:
-                    await query.edit_message_text(
-                        text=f"Wystąpił błąd podczas obsługi menu: {str(e)}",
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-            except:
-                pass
-    
-    # Obsługa wyboru języka
-    if query.data.startswith("start_lang_"):
-        from handlers.start_handler import handle_language_selection
-        await handle_language_selection(update, context)
-        return
-    
-    # Obsługa przycisku wyboru modelu
-    if query.data.startswith("model_"):
-        model_id = query.data[6:]  # Pobierz ID modelu (usuń prefix "model_")
-        await handle_model_selection(update, context, model_id)
-        return
-    
-    # Obsługa przycisków ustawień
-    elif query.data.startswith("settings_"):
-        print(f"Rozpoznano callback ustawień: {query.data}")
+
+    await callback_router.dispatch(update, context)
+
+async def edit_callback_message(query, text, reply_markup=None, parse_mode=None):
+    """Edytuje wiadomość z przyciskami (podpis mediów lub tekst)"""
+    return await edit_message(query, text, reply_markup=reply_markup, parse_mode=parse_mode,
+                              kind=get_query_message_kind(query))
+
+async def handle_menu_route(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Obsługa przycisków menu"""
+    query = update.callback_query
+    try:
+        result = await handle_menu_callback(update, context)
+    except Exception as e:
+        print(f"Błąd w obsłudze menu: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        # Wyślij informację o błędzie
         try:
-            from handlers.menu_handler import handle_menu_callback
-            result = await handle_menu_callback(update, context)
-            if not result:
-                await query.answer("Funkcja w trakcie implementacji.")
-            return
-        except Exception as e:
-            print(f"Błąd w obsłudze ustawień: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            await query.answer(f"Error: {str(e)}")
-            return
-    
-    # Obsługa wyboru trybu czatu
-    if query.data.startswith("mode_"):
-        print(f"Rozpoznano callback trybu: {query.data}")
-        mode_id = query.data[5:]  # Pobierz ID trybu (usuń prefix "mode_")
-        await handle_mode_selection(update, context, mode_id)
+            await edit_callback_message(
+                query, f"Wystąpił błąd podczas obsługi menu: {str(e)}", parse_mode=ParseMode.MARKDOWN
+            )
+        except:
+            pass
         return
 
-    # Obsługa tematów konwersacji
-    if query.data.startswith("theme_") or query.data == "new_theme" or query.data == "no_theme":
-        from handlers.theme_handler import handle_theme_callback
-        await handle_theme_callback(update, context)
-        return
-    
-    # POPRAWKA: Bezpośrednia obsługa history_view
-    if query.data == "history_view":
-        user_id = query.from_user.id
-        language = get_user_language(context, user_id)
-        
-        # Pobierz aktywną konwersację
-        from database.sqlite_client import get_active_conversation, get_conversation_history
-        conversation = get_active_conversation(user_id)
-        
-        if not conversation:
-            # Informacja przez wiadomość
-            keyboard = [[InlineKeyboardButton(get_text("back", language), callback_data="menu_section_history")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption=get_text("history_no_conversation", language),
-                    reply_markup=reply_markup
-                )
-            else:
-                await query.edit_message_text(
-                    text=get_text("history_no_conversation", language),
-                    reply_markup=reply_markup
-                )
-            return
-        
-        # Pobierz historię konwersacji
-        history = get_conversation_history(conversation['id'])
-        
-        if not history:
-            keyboard = [[InlineKeyboardButton(get_text("back", language), callback_data="menu_section_history")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption=get_text("history_empty", language),
-                    reply_markup=reply_markup
-                )
-            else:
-                await query.edit_message_text(
-                    text=get_text("history_empty", language),
-                    reply_markup=reply_markup
-                )
-            return
-        
-        # Przygotuj tekst z historią - bez formatowania Markdown
-        message_text = f"{get_text('history_title', language)}\n\n"
-        
-        for i, msg in enumerate(history[-10:]):  # Ostatnie 10 wiadomości
-            sender = get_text("history_user", language) if msg['is_from_user'] else get_text("history_bot", language)
-            
-            # Skróć treść wiadomości
-            content = msg['content']
-            if len(content) > 100:
-                content = content[:97] + "..."
-                
-            message_text += f"{i+1}. {sender}: {content}\n\n"
-        
-        # Dodaj przycisk do powrotu
-        keyboard = [[InlineKeyboardButton(get_text("back", language), callback_data="menu_section_history")]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        if hasattr(query.message, 'caption'):
-            await query.edit_message_caption(
-                caption=message_text,
-                reply_markup=reply_markup
-            )
-        else:
-            await query.edit_message_text(
-                text=message_text,
-                reply_markup=reply_markup
-            )
+    if not result:
+        await handle_unknown_callback(update, context)
+
+async def handle_settings_route(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Obsługa przycisków ustawień"""
+    query = update.callback_query
+    try:
+        result = await handle_menu_callback(update, context)
+        if not result:
+            await query.answer("Funkcja w trakcie implementacji.")
+    except Exception as e:
+        print(f"Błąd w obsłudze ustawień: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        await query.answer(f"Error: {str(e)}")
+
+async def handle_model_route(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Obsługa przycisku wyboru modelu"""
+    model_id = update.callback_query.data[len("model_"):]
+    await handle_model_selection(update, context, model_id)
+
+async def handle_mode_route(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Obsługa wyboru trybu czatu"""
+    mode_id = update.callback_query.data[len("mode_"):]
+    await handle_mode_selection(update, context, mode_id)
+
+async def show_history_view(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Wyświetla ostatnie wiadomości aktywnej konwersacji"""
+    query = update.callback_query
+    user_id = query.from_user.id
+    language = get_user_language(context, user_id)
+
+    keyboard = [[InlineKeyboardButton(get_text("back", language), callback_data="menu_section_history")]]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    # Pobierz aktywną konwersację
+    conversation = get_active_conversation(user_id)
+    if not conversation:
+        await edit_callback_message(query, get_text("history_no_conversation", language), reply_markup)
         return
-    
-    # POPRAWKA: Bezpośrednia obsługa menu_credits_check
-    if query.data == "menu_credits_check" or query.data == "credits_check":
-        user_id = query.from_user.id
-        language = get_user_language(context, user_id)
-        
-        # Pobierz stan kredytów
-        from database.credits_client import get_user_credits
-        credits = get_user_credits(user_id)
-        
-        # Klawiatura z opcjami kredytów
-        keyboard = [
-            [InlineKeyboardButton(get_text("buy_credits_btn", language), callback_data="credits_buy")],
-            [InlineKeyboardButton(get_text("credit_stats", language, default="Statystyki"), callback_data="credits_stats")],
-            [InlineKeyboardButton(get_text("back", language), callback_data="menu_section_credits")]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        # Tekst informacyjny o kredytach
-        message = get_text("credits_info", language, bot_name=BOT_NAME, credits=credits)
-        
-        if hasattr(query.message, 'caption'):
-            await query.edit_message_caption(
-                caption=message,
-                reply_markup=reply_markup,
-                parse_mode=ParseMode.MARKDOWN
-            )
-        else:
-            await query.edit_message_text(
-                text=message,
-                reply_markup=reply_markup,
-                parse_mode=ParseMode.MARKDOWN
-            )
+
+    # Pobierz historię konwersacji
+    history = get_conversation_history(conversation['id'])
+    if not history:
+        await edit_callback_message(query, get_text("history_empty", language), reply_markup)
         return
-    
-    # POPRAWKA: Bezpośrednia obsługa menu_credits_buy
-    if query.data == "menu_credits_buy" or query.data == "credits_buy":
-        user_id = query.from_user.id
-        language = get_user_language(context, user_id)
-        
-        # Pobierz pakiety kredytów
-        from database.credits_client import get_credit_packages
-        packages = get_credit_packages()
-        
-        packages_text = ""
-        for pkg in packages:
-            packages_text += f"*{pkg['id']}.* {pkg['name']} - *{pkg['credits']}* {get_text('credits', language)} - *{pkg['price']} PLN*\n"
-        
-        # Utwórz klawiaturę z pakietami
-        keyboard = []
-        for pkg in packages:
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"{pkg['name']} - {pkg['credits']} {get_text('credits', language)} ({pkg['price']} PLN)", 
-                    callback_data=f"buy_package_{pkg['id']}"
-                )
-            ])
-        
-        # Dodaj przycisk dla gwiazdek Telegram
-        keyboard.append([
-            InlineKeyboardButton("⭐ " + get_text("buy_with_stars", language, default="Kup za gwiazdki Telegram"), 
-                                callback_data="show_stars_options")
-        ])
-        
-        # Dodaj przycisk powrotu
+
+    # Przygotuj tekst z historią - bez formatowania Markdown
+    message_text = f"{get_text('history_title', language)}\n\n"
+
+    for i, msg in enumerate(history[-10:]):  # Ostatnie 10 wiadomości
+        sender = get_text("history_user", language) if msg['is_from_user'] else get_text("history_bot", language)
+
+        # Skróć treść wiadomości
+        content = msg['content']
+        if len(content) > 100:
+            content = content[:97] + "..."
+
+        message_text += f"{i+1}. {sender}: {content}\n\n"
+
+    await edit_callback_message(query, message_text, reply_markup)
+
+async def show_credits_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Wyświetla stan kredytów użytkownika"""
+    query = update.callback_query
+    user_id = query.from_user.id
+    language = get_user_language(context, user_id)
+
+    # Pobierz stan kredytów
+    credits = get_user_credits(user_id)
+
+    # Klawiatura z opcjami kredytów
+    keyboard = [
+        [InlineKeyboardButton(get_text("buy_credits_btn", language), callback_data="credits_buy")],
+        [InlineKeyboardButton(get_text("credit_stats", language, default="Statystyki"), callback_data="credits_stats")],
+        [InlineKeyboardButton(get_text("back", language), callback_data="menu_section_credits")]
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    # Tekst informacyjny o kredytach
+    message = get_text("credits_info", language, bot_name=BOT_NAME, credits=credits)
+    await edit_callback_message(query, message, reply_markup, parse_mode=ParseMode.MARKDOWN)
+
+async def show_credit_packages(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Wyświetla pakiety kredytów do kupienia"""
+    query = update.callback_query
+    user_id = query.from_user.id
+    language = get_user_language(context, user_id)
+
+    # Pobierz pakiety kredytów
+    packages = get_credit_packages()
+
+    packages_text = ""
+    for pkg in packages:
+        packages_text += f"*{pkg['id']}.* {pkg['name']} - *{pkg['credits']}* {get_text('credits', language)} - *{pkg['price']} PLN*\n"
+
+    # Utwórz klawiaturę z pakietami
+    keyboard = []
+    for pkg in packages:
         keyboard.append([
-            InlineKeyboardButton(get_text("back", language), callback_data="menu_section_credits")
-        ])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        # Tekst informacyjny o zakupie kredytów
-        message = get_text("buy_credits", language, packages=packages_text)
-        
-        if hasattr(query.message, 'caption'):
-            await query.edit_message_caption(
-                caption=message,
-                reply_markup=reply_markup,
-                parse_mode=ParseMode.MARKDOWN
-            )
-        else:
-            await query.edit_message_text(
-                text=message,
-                reply_markup=reply_markup,
-                parse_mode=ParseMode.MARKDOWN
+            InlineKeyboardButton(
+                f"{pkg['name']} - {pkg['credits']} {get_text('credits', language)} ({pkg['price']} PLN)",
+                callback_data=f"buy_package_{pkg['id']}"
             )
+        ])
+
+    # Dodaj przycisk dla gwiazdek Telegram
+    keyboard.append([
+        InlineKeyboardButton("⭐ " + get_text("buy_with_stars", language, default="Kup za gwiazdki Telegram"),
+                            callback_data="show_stars_options")
+    ])
+
+    # Dodaj przycisk powrotu
+    keyboard.append([
+        InlineKeyboardButton(get_text("back", language), callback_data="menu_section_credits")
+    ])
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    # Tekst informacyjny o zakupie kredytów
+    message = get_text("buy_credits", language, packages=packages_text)
+    await edit_callback_message(query, message, reply_markup, parse_mode=ParseMode.MARKDOWN)
+
+async def handle_photo_translate_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Obsługa przycisku tłumaczenia zdjęcia"""
+    query = update.callback_query
+    user_id = query.from_user.id
+    language = get_user_language(context, user_id)
+
+    payload = await resolve_callback_payload(query.data, "translate_photo_", legacy_key="file_id")
+    if payload is None:
+        await edit_callback_message(query, get_text("button_expired", language))
         return
-    
-    # Obsługa przycisku tłumaczenia zdjęcia
-    if query.data.startswith("translate_photo_"):
-        photo_file_id = query.data.replace("translate_photo_", "")
-        user_id = query.from_user.id
-        language = get_user_language(context, user_id)
-        
-        # Sprawdź, czy użytkownik ma wystarczającą liczbę kredytów
-        credit_cost = CREDIT_COSTS["photo"]
-        if not check_user_credits(user_id, credit_cost):
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption=get_text("subscription_expired", language),
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.edit_message_text(
-                    text=get_text("subscription_expired", language),
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            return
-        
-        # Pobierz zdjęcie
-        try:
-            if hasattr(query.message, 'caption'):
-                message = await query.edit_message_caption(
-                    caption="Tłumaczę tekst ze zdjęcia, proszę czekać...",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                message = await query.edit_message_text(
-                    text="Tłumaczę tekst ze zdjęcia, proszę czekać...",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            
-            file = await context.bot.get_file(photo_file_id)
-            file_bytes = await file.download_as_bytearray()
-            
-            # Tłumacz tekst ze zdjęcia
-            translation = await analyze_image(file_bytes, f"photo_{photo_file_id}.jpg", mode="translate")
-            
-            # Odejmij kredyty
-            deduct_user_credits(user_id, credit_cost, "Tłumaczenie tekstu ze zdjęcia")
-            
-            # Wyślij tłumaczenie
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption=f"*Tłumaczenie tekstu ze zdjęcia:*\n\n{translation}",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.edit_message_text(
-                    text=f"*Tłumaczenie tekstu ze zdjęcia:*\n\n{translation}",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            
-            # Sprawdź aktualny stan kredytów
-            credits = get_user_credits(user_id)
-            if credits < 5:
-                await context.bot.send_message(
-                    chat_id=query.message.chat_id,
-                    text=f"*{get_text('low_credits_warning', language)}* {get_text('low_credits_message', language, credits=credits)}",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            
-            return
-        except Exception as e:
-            print(f"Błąd przy tłumaczeniu zdjęcia: {e}")
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption=f"Wystąpił błąd podczas tłumaczenia zdjęcia: {str(e)}",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.edit_message_text(
-                    text=f"Wystąpił błąd podczas tłumaczenia zdjęcia: {str(e)}",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            return
-    
-    # Obsługa przycisku tłumaczenia PDF
-    if query.data.startswith("translate_pdf_"):
-        document_file_id = query.data.replace("translate_pdf_", "")
-        user_id = query.from_user.id
-        language = get_user_language(context, user_id)
-        
-        # Sprawdź, czy użytkownik ma wystarczającą liczbę kredytów
-        credit_cost = 8  # Koszt tłumaczenia PDF
-        if not check_user_credits(user_id, credit_cost):
-            await query.answer(get_text("subscription_expired_short", language, default="Niewystarczająca liczba kredytów."))
-            
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption=get_text("subscription_expired", language),
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.edit_message_text(
-                    text=get_text("subscription_expired", language),
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            return
-        
-        # Pobierz plik
-        try:
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption=get_text("translating_pdf", language),
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.edit_message_text(
-                    text=get_text("translating_pdf", language),
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            
-            file = await context.bot.get_file(document_file_id)
-            file_bytes = await file.download_as_bytearray()
-            
-            # Tłumacz pierwszy akapit z PDF
-            from utils.pdf_translator import translate_pdf_first_paragraph
-            result = await translate_pdf_first_paragraph(file_bytes)
-            
-            # Odejmij kredyty
-            deduct_user_credits(user_id, credit_cost, "Tłumaczenie pierwszego akapitu z PDF")
-            
-            # Przygotuj odpowiedź
-            if result["success"]:
-                response = f"*{get_text('pdf_translation_result', language)}*\n\n"
-                response += f"*{get_text('original_text', language)}:*\n{result['original_text'][:500]}...\n\n"
-                response += f"*{get_text('translated_text', language)}:*\n{result['translated_text'][:500]}..."
-            else:
-                response = f"*{get_text('pdf_translation_error', language)}*\n\n{result['error']}"
-            
-            # Wyślij wynik tłumaczenia
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption=response,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.edit_message_text(
-                    text=response,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            
-            # Sprawdź aktualny stan kredytów
-            credits = get_user_credits(user_id)
-            if credits < 5:
-                await context.bot.send_message(
-                    chat_id=query.message.chat_id,
-                    text=f"*{get_text('low_credits_warning', language)}* {get_text('low_credits_message', language, credits=credits)}",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            
-            return
-        except Exception as e:
-            print(f"Błąd przy tłumaczeniu PDF: {e}")
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption=f"{get_text('pdf_translation_error', language)}: {str(e)}",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.edit_message_text(
-                    text=f"{get_text('pdf_translation_error', language)}: {str(e)}",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            return
+    photo_file_id = payload["file_id"]
+    photo_name = payload.get("file_unique_id") or photo_file_id
 
-    # Obsługa kredytów
-    if query.data.startswith("buy_") or query.data.startswith("credits_"):
-        from handlers.credit_handler import handle_credit_callback
-        await handle_credit_callback(update, context)
+    # Sprawdź, czy użytkownik ma wystarczającą liczbę kredytów
+    credit_cost = CREDIT_COSTS["photo"]
+    if not check_user_credits(user_id, credit_cost):
+        await edit_callback_message(query, get_text("subscription_expired", language), parse_mode=ParseMode.MARKDOWN)
         return
-    
-    # Obsługa historii
-    if query.data.startswith("history_"):
-        if query.data == "history_new":
-            # Twórz nową konwersację
-            conversation = create_new_conversation(user_id)
-            # Sprawdź, czy wiadomość ma podpis (jest to zdjęcie lub inny typ mediów)
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption=get_text("new_chat_success", get_user_language(context, user_id)),
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.edit_message_text(
-                    text=get_text("new_chat_success", get_user_language(context, user_id)),
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            return
-        elif query.data == "history_export":
-            # Eksportuj bieżącą konwersację
-            from handlers.export_handler import export_conversation
-            # Tworzymy sztuczny obiekt update do przekazania do funkcji export_conversation
-            class FakeUpdate:
-                class FakeMessage:
-                    def __init__(self, chat_id, message_id):
-                        self.chat_id = chat_id
-                        self.message_id = message_id
-                        self.chat = type('obj', (object,), {'send_action': lambda *args, **kwargs: None})
-                    async def reply_text(self, *args, **kwargs):
-                        pass
-                    async def reply_document(self, *args, **kwargs):
-                        pass
-                def __init__(self, query):
-                    self.message = self.FakeMessage(query.message.chat_id, query.message.message_id)
-                    self.effective_user = query.from_user
-                    self.effective_chat = type('obj', (object,), {'id': query.message.chat_id})
-            
-            fake_update = FakeUpdate(query)
-            await export_conversation(fake_update, context)
-            # Informacja o eksporcie
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption="Eksportowanie konwersacji do PDF...",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.edit_message_text(
-                    text="Eksportowanie konwersacji do PDF...",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            return
-        elif query.data == "history_delete":
-            # Pytanie o potwierdzenie usunięcia historii
-            keyboard = [
-                [
-                    InlineKeyboardButton(get_text("yes", get_user_language(context, user_id)), callback_data="history_confirm_delete"),
-                    InlineKeyboardButton(get_text("no", get_user_language(context, user_id)), callback_data="menu_section_history")
-                ]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption=get_text("history_delete_confirm", get_user_language(context, user_id)),
-                    reply_markup=reply_markup,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.edit_message_text(
-                    text=get_text("history_delete_confirm", get_user_language(context, user_id)),
-                    reply_markup=reply_markup,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            return
-    
-    # Obsługa przycisku restartu bota
-    if query.data == "restart_bot":
-        user_id = query.from_user.id
-        chat_id = query.message.chat_id
-        language = get_user_language(context, user_id)
-        
-        restart_message = get_text("restarting_bot", language)
-        try:
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(caption=restart_message)
-            else:
-                await query.edit_message_text(text=restart_message)
-        except Exception as e:
-            print(f"Błąd przy aktualizacji wiadomości: {e}")
-        
-        # Resetowanie konwersacji - tworzymy nową konwersację i czyścimy kontekst
-        conversation = create_new_conversation(user_id)
-        
-        # Zachowujemy wybrane ustawienia użytkownika (język, model)
-        user_data = {}
-        if 'user_data' in context.chat_data and user_id in context.chat_data['user_data']:
-            # Pobieramy tylko podstawowe ustawienia, reszta jest resetowana
-            old_user_data = context.chat_data['user_data'][user_id]
-            if 'language' in old_user_data:
-                user_data['language'] = old_user_data['language']
-            if 'current_model' in old_user_data:
-                user_data['current_model'] = old_user_data['current_model']
-            if 'current_mode' in old_user_data:
-                user_data['current_mode'] = old_user_data['current_mode']
-        
-        # Resetujemy dane użytkownika w kontekście i ustawiamy tylko zachowane ustawienia
-        if 'user_data' not in context.chat_data:
-            context.chat_data['user_data'] = {}
-        context.chat_data['user_data'][user_id] = user_data
-        
-        # Potwierdź restart
-        restart_complete = get_text("restart_command", language)
-        
-        # Utwórz klawiaturę menu
-        keyboard = [
-            [
-                InlineKeyboardButton(get_text("menu_chat_mode", language), callback_data="menu_section_chat_modes"),
-                InlineKeyboardButton(get_text("image_generate", language), callback_data="menu_image_generate")
-            ],
-            [
-                InlineKeyboardButton(get_text("menu_credits", language), callback_data="menu_section_credits"),
-                InlineKeyboardButton(get_text("menu_dialog_history", language), callback_data="menu_section_history")
-            ],
-            [
-                InlineKeyboardButton(get_text("menu_settings", language), callback_data="menu_section_settings"),
-                InlineKeyboardButton(get_text("menu_help", language), callback_data="menu_help")
-            ]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        # Wyślij nową wiadomość z menu
-        try:
-            # Używamy welcome_message zamiast main_menu + status
-            welcome_text = get_text("welcome_message", language, bot_name=BOT_NAME)
-            message = await context.bot.send_message(
-                chat_id=chat_id,
-                text=restart_complete + "\n\n" + welcome_text,
-                reply_markup=reply_markup,
+
+    # Pobierz zdjęcie
+    try:
+        await edit_callback_message(
+            query, "Tłumaczę tekst ze zdjęcia, proszę czekać...", parse_mode=ParseMode.MARKDOWN
+        )
+
+        # Tłumacz tekst ze zdjęcia
+        async with download_manager.open(context.bot, photo_file_id, payload.get("file_unique_id")) as downloaded:
+            translation = await analyze_image(downloaded.view(), f"photo_{photo_name}.jpg", mode="translate")
+
+        # Odejmij kredyty
+        deduct_user_credits(user_id, credit_cost, "Tłumaczenie tekstu ze zdjęcia")
+
+        # Wyślij tłumaczenie
+        await edit_callback_message(
+            query, f"*Tłumaczenie tekstu ze zdjęcia:*\n\n{translation}", parse_mode=ParseMode.MARKDOWN
+        )
+
+        # Sprawdź aktualny stan kredytów
+        credits = get_user_credits(user_id)
+        if credits < 5:
+            await context.bot.send_message(
+                chat_id=query.message.chat_id,
+                text=f"*{get_text('low_credits_warning', language)}* {get_text('low_credits_message', language, credits=credits)}",
                 parse_mode=ParseMode.MARKDOWN
             )
-            
-            # Zapisz ID wiadomości menu i stan menu
-            from handlers.menu_handler import store_menu_state
-            store_menu_state(context, user_id, 'main', message.message_id)
-        except Exception as e:
-            print(f"Błąd przy wysyłaniu wiadomości po restarcie: {e}")
-            # Próbuj wysłać prostą wiadomość
-            try:
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=restart_complete
-                )
-            except Exception as e2:
-                print(f"Nie udało się wysłać nawet prostej wiadomości: {e2}")
-        
-        return
-        
-    # Obsługa historii rozmów
-    if query.data == "history_confirm_delete":
-        user_id = query.from_user.id
-        # Twórz nową konwersację (efektywnie "usuwając" historię)
-        conversation = create_new_conversation(user_id)
-        
-        if conversation:
-            from handlers.menu_handler import update_menu
-            await update_menu(update, context, 'history')
-        else:
-            if hasattr(query.message, 'caption'):
-                await query.edit_message_caption(
-                    caption="Wystąpił błąd podczas czyszczenia historii.",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-            else:
-                await query.edit_message_text(
-                    text="Wystąpił błąd podczas czyszczenia historii.",
-                    parse_mode=ParseMode.MARKDOWN
-                )
-        return
-    
-    # Obsługa notatek
-    if query.data.startswith("note_"):
-        from handlers.note_handler import handle_note_callback
-        await handle_note_callback(update, context)
+    except Exception as e:
+        print(f"Błąd przy tłumaczeniu zdjęcia: {e}")
+        await edit_callback_message(
+            query, f"Wystąpił błąd podczas tłumaczenia zdjęcia: {str(e)}", parse_mode=ParseMode.MARKDOWN
+        )
+
+async def handle_pdf_translate_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Obsługa przycisku tłumaczenia PDF"""
+    query = update.callback_query
+    user_id = query.from_user.id
+    language = get_user_language(context, user_id)
+
+    payload = await resolve_callback_payload(query.data, "translate_pdf_", legacy_key="file_id")
+    if payload is None:
+        await query.message.reply_text(get_text("button_expired", language))
         return
-    
-    # Obsługa przypomnień  
-    if query.data.startswith("reminder_"):
-        from handlers.reminder_handler import handle_reminder_callback
-        await handle_reminder_callback(update, context)
+
+    # Sprawdź, czy użytkownik ma wystarczającą liczbę kredytów
+    if not check_user_credits(user_id, PDF_TRANSLATION_CREDIT_COST):
+        await query.answer(get_text("subscription_expired_short", language, default="Niewystarczająca liczba kredytów."))
+        await edit_callback_message(query, get_text("subscription_expired", language), parse_mode=ParseMode.MARKDOWN)
         return
-    
-    # Specjalna obsługa przycisku powrotu do głównego menu
-    if query.data == "menu_back_main":
-        keyboard = [
-            [
-                InlineKeyboardButton(get_text("menu_chat_mode", language), callback_data="menu_section_chat_modes"),
-                InlineKeyboardButton(get_text("image_generate", language), callback_data="menu_image_generate")
-            ],
-            [
-                InlineKeyboardButton(get_text("menu_credits", language), callback_data="menu_section_credits"),
-                InlineKeyboardButton(get_text("menu_dialog_history", language), callback_data="menu_section_history")
-            ],
-            [
-                InlineKeyboardButton(get_text("menu_settings", language), callback_data="menu_section_settings"),
-                InlineKeyboardButton(get_text("menu_help", language), callback_data="menu_help")
-            ]
+
+    # Postęp tłumaczenia pokazujemy w nowej wiadomości, aby zachować analizę dokumentu
+    status_message = await query.message.reply_text(get_text("translating_pdf", language))
+    try:
+        await translate_and_send_pdf(
+            context, query.message.chat_id, status_message, payload["file_id"],
+            payload.get("file_unique_id"), payload.get("file_name", "document.pdf"), user_id, language
+        )
+    except Exception as e:
+        print(f"Błąd przy tłumaczeniu PDF: {e}")
+        await status_message.edit_text(f"{get_text('pdf_translation_error', language)}: {str(e)}")
+
+async def handle_history_new(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Rozpoczyna nową konwersację z menu historii"""
+    query = update.callback_query
+    user_id = query.from_user.id
+    create_new_conversation(user_id)
+    await edit_callback_message(
+        query, get_text("new_chat_success", get_user_language(context, user_id)), parse_mode=ParseMode.MARKDOWN
+    )
+
+class _CallbackExportUpdate:
+    """Zastępczy obiekt update przekazywany do export_conversation z poziomu przycisku"""
+
+    class FakeMessage:
+        def __init__(self, chat_id, message_id):
+            self.chat_id = chat_id
+            self.message_id = message_id
+            self.chat = type('obj', (object,), {'send_action': lambda *args, **kwargs: None})
+        async def reply_text(self, *args, **kwargs):
+            pass
+        async def reply_document(self, *args, **kwargs):
+            pass
+
+    def __init__(self, query):
+        self.message = self.FakeMessage(query.message.chat_id, query.message.message_id)
+        self.effective_user = query.from_user
+        self.effective_chat = type('obj', (object,), {'id': query.message.chat_id})
+
+async def handle_history_export(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Eksportuje bieżącą konwersację z menu historii"""
+    query = update.callback_query
+    await export_conversation(_CallbackExportUpdate(query), context)
+    # Informacja o eksporcie
+    await edit_callback_message(query, "Eksportowanie konwersacji do PDF...", parse_mode=ParseMode.MARKDOWN)
+
+async def handle_history_delete(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Pyta o potwierdzenie usunięcia historii"""
+    query = update.callback_query
+    language = get_user_language(context, query.from_user.id)
+    keyboard = [
+        [
+            InlineKeyboardButton(get_text("yes", language), callback_data="history_confirm_delete"),
+            InlineKeyboardButton(get_text("no", language), callback_data="menu_section_history")
         ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        # Używanie welcome_message
-        welcome_text = get_text("welcome_message", language, bot_name=BOT_NAME)
-        
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    await edit_callback_message(
+        query, get_text("history_delete_confirm", language), reply_markup, parse_mode=ParseMode.MARKDOWN
+    )
+
+async def handle_history_confirm_delete(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Usuwa historię rozmów (tworzy nową konwersację)"""
+    query = update.callback_query
+    # Twórz nową konwersację (efektywnie "usuwając" historię)
+    conversation = create_new_conversation(query.from_user.id)
+
+    if conversation:
+        await update_menu(update, context, 'history')
+    else:
+        await edit_callback_message(
+            query, "Wystąpił błąd podczas czyszczenia historii.", parse_mode=ParseMode.MARKDOWN
+        )
+
+async def handle_restart_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Obsługa przycisku restartu bota"""
+    query = update.callback_query
+    user_id = query.from_user.id
+    chat_id = query.message.chat_id
+    language = get_user_language(context, user_id)
+
+    restart_message = get_text("restarting_bot", language)
+    try:
+        await edit_callback_message(query, restart_message)
+    except Exception as e:
+        print(f"Błąd przy aktualizacji wiadomości: {e}")
+
+    # Resetowanie konwersacji - tworzymy nową konwersację i czyścimy kontekst
+    create_new_conversation(user_id)
+
+    # Zachowujemy wybrane ustawienia użytkownika (język, model, tryb), reszta sesji jest resetowana
+    (await get_session_async(context, user_id)).reset()
+
+    # Potwierdź restart
+    restart_complete = get_text("restart_command", language)
+
+    # Utwórz klawiaturę menu
+    reply_markup = create_main_menu_markup(language)
+
+    # Wyślij nową wiadomość z menu
+    try:
+        # Używamy welcome_message zamiast main_menu + status
+        message = await context.bot.send_message(
+            chat_id=chat_id,
+            text=get_restart_text(language),
+            reply_markup=reply_markup,
+            parse_mode=ParseMode.MARKDOWN
+        )
+
+        # Zapisz ID wiadomości menu i stan menu
+        store_menu_state(context, user_id, 'main', message.message_id, get_message_kind(message))
+    except Exception as e:
+        print(f"Błąd przy wysyłaniu wiadomości po restarcie: {e}")
+        # Próbuj wysłać prostą wiadomość
         try:
-            # Wyślij nową wiadomość zamiast edytować starą
-            message = await context.bot.send_message(
-                chat_id=query.message.chat_id,
-                text=welcome_text,
-                reply_markup=reply_markup,
-                parse_mode=ParseMode.MARKDOWN
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=restart_complete
             )
-            # Zapisz ID nowej wiadomości menu
-            store_menu_state(context, user_id, 'main', message.message_id)
-            
-            # Opcjonalnie usuń starą wiadomość
-            try:
-                await query.message.delete()
-            except:
-                pass
-                
-            return
-        except Exception as e:
-            print(f"Błąd przy obsłudze menu_back_main: {e}")
-            # W przypadku błędu, kontynuujemy do standardowej obsługi
+        except Exception as e2:
+            print(f"Nie udało się wysłać nawet prostej wiadomości: {e2}")
 
-    # Jeśli dotarliśmy tutaj, oznacza to, że callback nie został obsłużony
-    print(f"Nieobsłużony callback: {query.data}")
+async def handle_unknown_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Obsługa przycisków, dla których nie ma handlera"""
     try:
-        if hasattr(query.message, 'caption'):
-            await query.edit_message_caption(
-                caption=f"Nieznany przycisk. Spróbuj ponownie później.",
-                parse_mode=ParseMode.MARKDOWN
-            )
-        else:
-            await query.edit_message_text(
-                text=f"Nieznany przycisk. Spróbuj ponownie później.",
-                parse_mode=ParseMode.MARKDOWN
-            )
+        await edit_callback_message(
+            update.callback_query, "Nieznany przycisk. Spróbuj ponownie później.", parse_mode=ParseMode.MARKDOWN
+        )
     except:
         pass
 
+def register_callback_routes(router):
+    """
+    Rejestruje trasy zapytań zwrotnych. Trasy dokładne mają pierwszeństwo
+    przed prefiksowymi, a dłuższy prefiks przed krótszym.
+
+    Args:
+        router: Router zapytań zwrotnych
+    """
+    router.add_route("onboarding_", handle_onboarding_callback)
+    router.add_route("start_lang_", handle_language_selection)
+    router.add_route("model_", handle_model_route)
+    router.add_route("mode_", handle_mode_route)
+    router.add_route("settings_", handle_settings_route)
+
+    # Menu - przyciski obsługiwane bezpośrednio mają własne trasy dokładne
+    router.add_route("menu_", handle_menu_route)
+    router.add_route("menu_credits_check", show_credits_check, exact=True)
+
+    # Tematy konwersacji
+    router.add_route("theme_", handle_theme_callback)
+    router.add_route("new_theme", handle_theme_callback, exact=True)
+    router.add_route("no_theme", handle_theme_callback, exact=True)
+
+    # Kredyty
+    router.add_route("credits_check", show_credits_check, exact=True)
+    router.add_route("credits_buy", show_credit_packages, exact=True)
+    router.add_route("credits_", handle_credit_callback)
+    router.add_route("buy_", handle_credit_callback)
+    router.add_route("show_stars_options", handle_credit_callback, exact=True)
+    router.add_route("credit_advanced_analytics", handle_credit_callback, exact=True)
+
+    # Tłumaczenie plików
+    router.add_route("translate_photo_", handle_photo_translate_callback)
+    router.add_route("translate_pdf_", handle_pdf_translate_callback)
+
+    # Historia rozmów
+    router.add_route("history_view", show_history_view, exact=True)
+    router.add_route("history_new", handle_history_new, exact=True)
+    router.add_route("history_export", handle_history_export, exact=True)
+    router.add_route("history_delete", handle_history_delete, exact=True)
+    router.add_route("history_confirm_delete", handle_history_confirm_delete, exact=True)
+
+    router.add_route("restart_bot", handle_restart_callback, exact=True)
+
+    router.set_fallback(handle_unknown_callback)
+
 async def handle_model_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, model_id):
     """Obsługa wyboru modelu AI"""
     query = update.callback_query
@@ -1487,26 +1200,17 @@ async def handle_model_selection(update: Update, context: ContextTypes.DEFAULT_T
     # Sprawdź, czy model istnieje
     if model_id not in AVAILABLE_MODELS:
         # Sprawdź typ wiadomości i użyj odpowiedniej metody
-        if hasattr(query.message, 'caption'):
-            await query.edit_message_caption(
-                caption=get_text("model_not_available", language),
-                parse_mode=ParseMode.MARKDOWN
-            )
-        else:
-            await query.edit_message_text(
-                text=get_text("model_not_available", language),
-                parse_mode=ParseMode.MARKDOWN
-            )
+        await edit_message(
+            query,
+            kind=get_query_message_kind(query),
+            text=get_text("model_not_available", language),
+            parse_mode=ParseMode.MARKDOWN
+        )
         return
     
     # Zapisz wybrany model w kontekście użytkownika
-    if 'user_data' not in context.chat_data:
-        context.chat_data['user_data'] = {}
-    
-    if user_id not in context.chat_data['user_data']:
-        context.chat_data['user_data'][user_id] = {}
-    
-    context.chat_data['user_data'][user_id]['current_model'] = model_id
+    session = await get_session_async(context, user_id)
+    session.current_model = model_id
     
     # Pobierz koszt kredytów dla wybranego modelu
     credit_cost = CREDIT_COSTS["message"].get(model_id, CREDIT_COSTS["message"]["default"])
@@ -1516,16 +1220,12 @@ async def handle_model_selection(update: Update, context: ContextTypes.DEFAULT_T
     message_text = get_text("model_selected", language, model=model_name, credits=credit_cost)
     
     # Sprawdź typ wiadomości i użyj odpowiedniej metody
-    if hasattr(query.message, 'caption'):
-        await query.edit_message_caption(
-            caption=message_text,
-            parse_mode=ParseMode.MARKDOWN
-        )
-    else:
-        await query.edit_message_text(
-            text=message_text,
-            parse_mode=ParseMode.MARKDOWN
-        )
+    await edit_message(
+        query,
+        kind=get_query_message_kind(query),
+        text=message_text,
+        parse_mode=ParseMode.MARKDOWN
+    )
 
 # Handlers dla komend administracyjnych
 
@@ -1627,12 +1327,102 @@ Dostępne kredyty: *{credits}*
     
     await update.message.reply_text(info, parse_mode=ParseMode.MARKDOWN)
 
+async def admin_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Wyświetla statystyki całego bota i opcjonalnie wysyła raporty jako pliki (tylko dla administratorów)
+    Użycie: /adminstats [dni] [csv|parquet]
+    """
+    user_id = update.effective_user.id
+    
+    # Sprawdź, czy użytkownik jest administratorem
+    if user_id not in ADMIN_USER_IDS:
+        await update.message.reply_text("Nie masz uprawnień do tej komendy.")
+        return
+    
+    usage = "Użycie: /adminstats [dni] [csv|parquet]"
+    days = ADMIN_STATS_DEFAULT_DAYS
+    export_format = None
+    args = list(context.args or [])
+    try:
+        if args and args[0].isdigit():
+            days = int(args.pop(0))
+        if args:
+            export_format = args.pop(0).lower()
+            check_export_format(export_format)
+        if args:
+            raise ValueError("Za dużo argumentów.")
+        if not 0 < days <= ADMIN_STATS_MAX_DAYS:
+            raise ValueError(f"Liczba dni musi być z zakresu 1-{ADMIN_STATS_MAX_DAYS}.")
+    except ValueError as e:
+        await update.message.reply_text(f"{e}\n{usage}")
+        return
+    
+    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
+    
+    try:
+        # Zapytania agregujące całą bazę wykonujemy poza pętlą zdarzeń
+        reports = await asyncio.to_thread(load_reports, days)
+    except Exception as e:
+        logger.error(f"Błąd obliczania statystyk administracyjnych: {e}")
+        await update.message.reply_text("Wystąpił błąd podczas obliczania statystyk.")
+        return
+    
+    edits = get_edit_stats()
+    runtime = (
+        f"\n\n*Edycje wiadomości (od startu):* podpisy {edits['caption']}, teksty {edits['text']}, "
+        f"bez zmian {edits['not_modified']}, nieudane {edits['failed']}"
+    )
+    await update.message.reply_text(format_summary(reports, days) + runtime, parse_mode=ParseMode.MARKDOWN)
+    
+    if export_format:
+        for name, frame in reports.items():
+            document = await asyncio.to_thread(export_report_bytes, frame, export_format)
+            await update.message.reply_document(
+                document=document,
+                filename=f"{name}_{days}d.{export_format}"
+            )
+
 # Główna funkcja uruchamiająca bota
 
+async def post_init(application):
+    """
+    Wywoływane po inicjalizacji aplikacji, przed obsługą pierwszych aktualizacji.
+    Rozgrzewka (menu, baza, fonty PDF, wykresy, pula procesów, połączenie z OpenAI,
+    ciężkie zależności) działa w tle, więc nie opóźnia obsługi pierwszych aktualizacji.
+    """
+    application.create_task(run_warm_up())
+
+async def post_stop(application):
+    """Wywoływane po zatrzymaniu odbierania aktualizacji - w trybie webhook usuwa webhook z Telegrama"""
+    if BOT_TRANSPORT == "webhook":
+        from utils.webhook_server import delete_webhook
+        await delete_webhook(application)
+
+async def post_shutdown(application):
+    """Wywoływane po zatrzymaniu aplikacji - zamyka połączenia używane do pobierania plików i usuwa pliki z pamięci podręcznej"""
+    await download_manager.close()
+    file_cache.close()
+
 def main():
     """Funkcja uruchamiająca bota"""
-    # Inicjalizacja aplikacji
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    print(f"API Key is {'set' if OPENAI_API_KEY else 'NOT SET'}")
+    
+    # Inicjalizacja bazy danych
+    init_database()
+    
+    # Sesje zapisane przez dawną persystencję chat_data trafiają do rejestru sesji
+    session_registry.migrate_legacy_sessions()
+    
+    # Inicjalizacja aplikacji - aktualizacje różnych użytkowników przetwarzane równolegle
+    application = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .concurrent_updates(UserOrderedUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     
     # Handler dla help
     application.add_handler(CommandHandler("help", help_command))
@@ -1679,6 +1469,7 @@ def main():
     # Komendy administracyjne
     application.add_handler(CommandHandler("addcredits", add_credits_admin))
     application.add_handler(CommandHandler("userinfo", get_user_info))
+    application.add_handler(CommandHandler("adminstats", admin_stats_command))
     
     # Handler eksportu
     application.add_handler(CommandHandler("export", export_conversation))
@@ -1688,6 +1479,7 @@ def main():
     application.add_handler(CommandHandler("notheme", notheme_command))
     
     # WAŻNE: Handler callbacków (musi być przed handlerami mediów i tekstu)
+    register_callback_routes(callback_router)
     application.add_handler(CallbackQueryHandler(handle_callback_query))
     
     # Handlery mediów (dokumenty, zdjęcia)
@@ -1697,8 +1489,26 @@ def main():
     # Handler wiadomości tekstowych (zawsze na końcu)
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, message_handler))
     
-    # Uruchomienie bota
-    application.run_polling()
+    # Sprawdzenie tłumaczeń (brakujące klucze i niezgodne pola są logowane)
+    for language, problems in catalog.validate().items():
+        if problems["missing"] or problems["placeholders"]:
+            print(f"Tłumaczenia {language}: brak {len(problems['missing'])} kluczy, "
+                  f"niezgodne pola w {len(problems['placeholders'])}")
+    
+    # Uruchomienie bota - przez webhook lub long polling
+    if BOT_TRANSPORT == "webhook":
+        from utils.webhook_server import run_webhook
+        run_webhook(application)
+    else:
+        application.run_polling()
+    
+    # Zamknięcie puli procesów po zatrzymaniu bota
+    from utils.process_pool import shutdown_process_pool
+    shutdown_process_pool()
+
+    # Zapis danych przycisków i sesji, aby działały po ponownym uruchomieniu
+    callback_store.flush()
+    session_registry.flush()
 
 if __name__ == '__main__':
     # Aktualizacja bazy danych przed uruchomieniem
@@ -46,6 +46,12 @@ def update_database_credits():
         )
         ''')
         
+        # Indeks dla analizy kredytów (transakcje użytkownika z ostatnich dni)
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_credit_transactions_user_date
+        ON credit_transactions(user_id, created_at)
+        ''')
+        
         # Dodaj tabelę pakietów kredytów
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS credit_packages (
@@ -107,19 +113,58 @@ def update_database_credits():
             conn.close()
         return False
 
+def update_database_analytics():
+    """
+    Przygotowuje bazę do statystyk administracyjnych: włącza tryb WAL (odczyty
+    nie blokują zapisów bota) i dodaje indeksy dat dla zestawień całego bota.
+    """
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        
+        # Tryb WAL jest zapisywany w pliku bazy - wystarczy włączyć go raz
+        journal_mode = cursor.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        logger.info(f"Tryb dziennika bazy danych: {journal_mode}")
+        
+        # Indeksy dla zestawień z ostatnich dni (wszyscy użytkownicy)
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_credit_transactions_date
+        ON credit_transactions(created_at)
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_messages_date
+        ON messages(created_at)
+        ''')
+        
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        logger.error(f"Błąd podczas przygotowania bazy danych do statystyk: {e}")
+        if 'conn' in locals():
+            conn.close()
+        return False
+
 def run_all_updates():
     """
     Uruchamia wszystkie funkcje aktualizujące bazę danych
     """
     logger.info("Rozpoczynam pełną aktualizację bazy danych")
     
+    # Tabele podstawowe (users, conversations, messages...) muszą istnieć przed
+    # migracjami, które je zmieniają lub indeksują
+    from database.sqlite_client import init_database, init_themes_table
+    init_database()
+    
     # Aktualizacja tabel kredytów
     update_result = update_database_credits()
     
     # Inicjalizacja tabel tematów konwersacji
-    from database.sqlite_client import init_themes_table
     init_themes_table()
     
+    # Tryb WAL i indeksy statystyk administracyjnych
+    update_database_analytics()
+    
     logger.info("Zakończono pełną aktualizację bazy danych")
     return update_result
 
@@ -0,0 +1,372 @@
+"""
+Moduł statystyk administracyjnych całego bota: przychód dzienny, zużycie kredytów
+według modeli, aktywni użytkownicy i największe wydatki.
+
+Zestawienia są liczone w SQLite jednym zapytaniem agregującym na raport (do pandas
+trafiają tylko wyniki), na połączeniu tylko do odczytu. Przy bazie w trybie WAL
+odczyt nie blokuje zapisów bota, a wszystkie raporty pochodzą z jednej migawki bazy.
+
+Użycie z wiersza poleceń:
+    python -m utils.admin_analytics --days 30
+    python -m utils.admin_analytics --days 90 --format parquet --output exports
+"""
+import os
+import io
+import sqlite3
+import logging
+import datetime
+import argparse
+import importlib.util
+from pathlib import Path
+import pytz
+from config import ADMIN_STATS_DEFAULT_DAYS, ADMIN_STATS_TOP_USERS, ADMIN_STATS_BUSY_TIMEOUT
+from database.sqlite_client import DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# Opis transakcji zakupu: f"Zakup pakietu {nazwa}" (database/credits_client.py)
+PURCHASE_DESCRIPTION_PREFIX = "Zakup pakietu "
+# Opis kredytów za wiadomość: f"Wiadomość ({model})" (main.py)
+MESSAGE_DESCRIPTION_PREFIX = "Wiadomość ("
+OTHER_OPERATIONS_MODEL = "Inne operacje"
+
+EXPORT_FORMATS = ("csv", "parquet")
+
+# Zapytania raportów. Parametry: :start (początek okresu, ISO UTC), :limit oraz prefiksy opisów transakcji.
+# Daty są zapisywane przez isoformat() w UTC - pierwsze 10 znaków to dzień.
+REPORT_QUERIES = {
+    "summary": """
+        WITH period_credits AS (
+            SELECT SUM(CASE WHEN transaction_type = 'deduct' THEN amount ELSE 0 END) AS credits_used,
+                   SUM(CASE WHEN transaction_type = 'purchase' THEN 1 ELSE 0 END) AS purchases
+            FROM credit_transactions
+            WHERE created_at >= :start
+        ),
+        period_revenue AS (
+            SELECT SUM(p.price) AS revenue
+            FROM credit_transactions t
+            JOIN (SELECT name, MAX(price) AS price FROM credit_packages GROUP BY name) p
+              ON t.description = :purchase_prefix || p.name
+            WHERE t.transaction_type = 'purchase' AND t.created_at >= :start
+        ),
+        period_messages AS (
+            SELECT COUNT(DISTINCT user_id) AS active_users,
+                   SUM(is_from_user) AS user_messages
+            FROM messages
+            WHERE created_at >= :start
+        )
+        SELECT (SELECT COUNT(*) FROM users) AS users,
+               (SELECT COUNT(*) FROM user_credits WHERE total_spent > 0) AS paying_users,
+               (SELECT ROUND(COALESCE(SUM(total_spent), 0), 2) FROM user_credits) AS total_revenue,
+               (SELECT COALESCE(SUM(credits_amount), 0) FROM user_credits) AS credits_outstanding,
+               ROUND(COALESCE(r.revenue, 0), 2) AS period_revenue,
+               COALESCE(c.purchases, 0) AS period_purchases,
+               COALESCE(c.credits_used, 0) AS period_credits_used,
+               m.active_users AS period_active_users,
+               COALESCE(m.user_messages, 0) AS period_user_messages
+        FROM period_credits c, period_revenue r, period_messages m
+    """,
+    "daily_revenue": """
+        SELECT substr(t.created_at, 1, 10) AS day,
+               COUNT(*) AS purchases,
+               COUNT(DISTINCT t.user_id) AS buyers,
+               SUM(t.amount) AS credits_sold,
+               ROUND(COALESCE(SUM(p.price), 0), 2) AS revenue
+        FROM credit_transactions t
+        LEFT JOIN (SELECT name, MAX(price) AS price FROM credit_packages GROUP BY name) p
+          ON t.description = :purchase_prefix || p.name
+        WHERE t.transaction_type = 'purchase' AND t.created_at >= :start
+        GROUP BY day
+        ORDER BY day
+    """,
+    "model_usage": """
+        WITH credits AS (
+            SELECT CASE WHEN description LIKE :message_prefix || '%)'
+                        THEN substr(description, length(:message_prefix) + 1,
+                                    length(description) - length(:message_prefix) - 1)
+                        ELSE :other_model END AS model,
+                   COUNT(*) AS operations,
+                   COUNT(DISTINCT user_id) AS users,
+                   SUM(amount) AS credits_used
+            FROM credit_transactions
+            WHERE transaction_type = 'deduct' AND created_at >= :start
+            GROUP BY model
+        ),
+        replies AS (
+            SELECT model_used AS model, COUNT(*) AS bot_messages
+            FROM messages
+            WHERE is_from_user = 0 AND model_used IS NOT NULL AND created_at >= :start
+            GROUP BY model_used
+        )
+        SELECT model,
+               SUM(credits_used) AS credits_used,
+               SUM(operations) AS operations,
+               SUM(users) AS users,
+               SUM(bot_messages) AS bot_messages
+        FROM (
+            SELECT model, credits_used, operations, users, 0 AS bot_messages FROM credits
+            UNION ALL
+            SELECT model, 0, 0, 0, bot_messages FROM replies
+        )
+        GROUP BY model
+        ORDER BY credits_used DESC, bot_messages DESC
+    """,
+    "active_users": """
+        WITH activity AS (
+            SELECT substr(created_at, 1, 10) AS day,
+                   COUNT(DISTINCT user_id) AS active_users,
+                   SUM(is_from_user) AS user_messages
+            FROM messages
+            WHERE created_at >= :start
+            GROUP BY day
+        ),
+        spending AS (
+            SELECT substr(created_at, 1, 10) AS day,
+                   COUNT(DISTINCT user_id) AS spending_users,
+                   SUM(amount) AS credits_used
+            FROM credit_transactions
+            WHERE transaction_type = 'deduct' AND created_at >= :start
+            GROUP BY day
+        ),
+        signups AS (
+            SELECT substr(created_at, 1, 10) AS day, COUNT(*) AS new_users
+            FROM users
+            WHERE created_at >= :start
+            GROUP BY day
+        )
+        SELECT d.day,
+               COALESCE(a.active_users, 0) AS active_users,
+               COALESCE(a.user_messages, 0) AS user_messages,
+               COALESCE(s.spending_users, 0) AS spending_users,
+               COALESCE(s.credits_used, 0) AS credits_used,
+               COALESCE(n.new_users, 0) AS new_users
+        FROM (SELECT day FROM activity UNION SELECT day FROM spending UNION SELECT day FROM signups) d
+        LEFT JOIN activity a ON a.day = d.day
+        LEFT JOIN spending s ON s.day = d.day
+        LEFT JOIN signups n ON n.day = d.day
+        ORDER BY d.day
+    """,
+    "top_spenders": """
+        WITH period AS (
+            SELECT user_id,
+                   SUM(CASE WHEN transaction_type = 'deduct' THEN amount ELSE 0 END) AS period_credits_used,
+                   MAX(created_at) AS last_transaction_at
+            FROM credit_transactions
+            WHERE created_at >= :start
+            GROUP BY user_id
+        )
+        SELECT uc.user_id,
+               u.username,
+               ROUND(uc.total_spent, 2) AS total_spent,
+               uc.total_credits_purchased,
+               uc.credits_amount,
+               COALESCE(p.period_credits_used, 0) AS period_credits_used,
+               p.last_transaction_at
+        FROM user_credits uc
+        LEFT JOIN users u ON u.id = uc.user_id
+        LEFT JOIN period p ON p.user_id = uc.user_id
+        WHERE uc.total_spent > 0 OR p.period_credits_used > 0
+        ORDER BY uc.total_spent DESC, period_credits_used DESC
+        LIMIT :limit
+    """,
+}
+
+REPORT_NAMES = tuple(REPORT_QUERIES)
+
+def connect_read_only(db_path=None):
+    """
+    Otwiera połączenie z bazą tylko do odczytu
+
+    Args:
+        db_path (str, optional): Ścieżka do bazy danych (domyślnie DB_PATH)
+
+    Returns:
+        Connection: Połączenie SQLite (mode=ro, query_only)
+    """
+    path = os.path.abspath(db_path or DB_PATH)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Baza danych {path} nie istnieje")
+    conn = sqlite3.connect(f"{Path(path).as_uri()}?mode=ro", uri=True, timeout=ADMIN_STATS_BUSY_TIMEOUT)
+    conn.execute("PRAGMA query_only = 1")
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    if journal_mode.lower() != "wal":
+        # W trybie rollback journal długi odczyt wstrzymuje zatwierdzanie zapisów bota
+        logger.warning(f"Baza działa w trybie {journal_mode} - statystyki mogą opóźniać zapisy (uruchom update_database.py, aby włączyć WAL)")
+    return conn
+
+def load_reports(days=ADMIN_STATS_DEFAULT_DAYS, names=None, limit=ADMIN_STATS_TOP_USERS, db_path=None):
+    """
+    Oblicza raporty administracyjne z jednej migawki bazy
+
+    Args:
+        days (int): Liczba dni do uwzględnienia
+        names (list, optional): Nazwy raportów (domyślnie wszystkie z REPORT_QUERIES)
+        limit (int): Liczba użytkowników w raporcie top_spenders
+        db_path (str, optional): Ścieżka do bazy danych (domyślnie DB_PATH)
+
+    Returns:
+        dict: Nazwa raportu -> DataFrame
+    """
+    import pandas as pd
+
+    names = list(names or REPORT_NAMES)
+    unknown = [name for name in names if name not in REPORT_QUERIES]
+    if unknown:
+        raise ValueError(f"Nieznane raporty: {', '.join(unknown)}")
+
+    params = {
+        "start": (datetime.datetime.now(pytz.UTC) - datetime.timedelta(days=days)).isoformat(),
+        "limit": limit,
+        "purchase_prefix": PURCHASE_DESCRIPTION_PREFIX,
+        "message_prefix": MESSAGE_DESCRIPTION_PREFIX,
+        "other_model": OTHER_OPERATIONS_MODEL,
+    }
+    conn = connect_read_only(db_path)
+    try:
+        # Jedna transakcja odczytu - wszystkie raporty widzą ten sam stan bazy
+        conn.execute("BEGIN")
+        reports = {}
+        for name in names:
+            sql = REPORT_QUERIES[name]
+            used = {key: value for key, value in params.items() if f":{key}" in sql}
+            reports[name] = pd.read_sql_query(sql, conn, params=used)
+        conn.rollback()
+    finally:
+        conn.close()
+    return reports
+
+def check_export_format(fmt):
+    """
+    Sprawdza, czy format eksportu jest obsługiwany i dostępny
+
+    Args:
+        fmt (str): "csv" lub "parquet"
+
+    Raises:
+        ValueError: Gdy format jest nieznany lub brakuje biblioteki Parquet
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Nieznany format eksportu: {fmt} (dostępne: {', '.join(EXPORT_FORMATS)})")
+    if fmt == "parquet" and not any(importlib.util.find_spec(engine) for engine in ("pyarrow", "fastparquet")):
+        raise ValueError("Eksport do Parquet wymaga biblioteki pyarrow (pip install pyarrow)")
+
+def export_report(frame, target, fmt="csv"):
+    """
+    Zapisuje raport w formacie CSV lub Parquet
+
+    Args:
+        frame (DataFrame): Raport
+        target (str | BinaryIO): Ścieżka do pliku lub bufor binarny
+        fmt (str): "csv" lub "parquet"
+    """
+    check_export_format(fmt)
+    if fmt == "parquet":
+        frame.to_parquet(target, index=False)
+    else:
+        frame.to_csv(target, index=False, encoding="utf-8")
+
+def export_report_bytes(frame, fmt="csv"):
+    """
+    Zapisuje raport do bufora w pamięci (np. do wysłania jako dokument)
+
+    Returns:
+        BytesIO: Bufor z raportem ustawiony na początek
+    """
+    buffer = io.BytesIO()
+    export_report(frame, buffer, fmt)
+    buffer.seek(0)
+    return buffer
+
+def export_reports(reports, directory, fmt="csv", days=ADMIN_STATS_DEFAULT_DAYS):
+    """
+    Zapisuje raporty do katalogu (jeden plik na raport)
+
+    Args:
+        reports (dict): Wynik load_reports
+        directory (str): Katalog docelowy (tworzony, jeśli nie istnieje)
+        fmt (str): "csv" lub "parquet"
+        days (int): Liczba dni (do nazwy pliku)
+
+    Returns:
+        list: Ścieżki zapisanych plików
+    """
+    check_export_format(fmt)
+    os.makedirs(directory, exist_ok=True)
+    today = datetime.datetime.now(pytz.UTC).strftime("%Y%m%d")
+    paths = []
+    for name, frame in reports.items():
+        path = os.path.join(directory, f"{name}_{days}d_{today}.{fmt}")
+        export_report(frame, path, fmt)
+        paths.append(path)
+    return paths
+
+def format_summary(reports, days):
+    """
+    Formatuje podsumowanie raportów do wysłania w Telegramie (Markdown)
+
+    Args:
+        reports (dict): Wynik load_reports (z raportami summary, model_usage i top_spenders)
+        days (int): Liczba dni
+
+    Returns:
+        str: Tekst podsumowania
+    """
+    summary = reports["summary"].to_dict("records")[0]
+    lines = [
+        f"*Statystyki bota - ostatnie {days} dni*",
+        "",
+        f"Użytkownicy: *{summary['users']}* (płacący: {summary['paying_users']})",
+        f"Aktywni w okresie: *{summary['period_active_users']}*, wiadomości: {summary['period_user_messages']}",
+        f"Przychód w okresie: *{summary['period_revenue']:.2f} zł* ({summary['period_purchases']} zakupów)",
+        f"Przychód łącznie: {summary['total_revenue']:.2f} zł",
+        f"Zużyte kredyty w okresie: *{summary['period_credits_used']}*",
+        f"Niewykorzystane kredyty: {summary['credits_outstanding']}",
+    ]
+
+    models = reports.get("model_usage")
+    if models is not None and not models.empty:
+        lines += ["", "*Kredyty według modeli:*"]
+        for row in models.itertuples(index=False):
+            lines.append(f"`{row.model}`: {row.credits_used} kr. ({row.operations} op., {row.users} użytk.)")
+
+    spenders = reports.get("top_spenders")
+    if spenders is not None and not spenders.empty:
+        lines += ["", "*Najwięcej wydający:*"]
+        for position, row in enumerate(spenders.itertuples(index=False), start=1):
+            name = f"@{row.username}" if row.username else f"ID {row.user_id}"
+            lines.append(f"{position}. `{name}`: {row.total_spent:.2f} zł, {row.period_credits_used} kr. w okresie")
+
+    return "\n".join(lines)
+
+def main(argv=None):
+    """Punkt wejścia wiersza poleceń: wypisuje raporty lub eksportuje je do plików"""
+    parser = argparse.ArgumentParser(description="Statystyki administracyjne bota")
+    parser.add_argument("--days", type=int, default=ADMIN_STATS_DEFAULT_DAYS, help="Liczba dni do uwzględnienia")
+    parser.add_argument("--report", action="append", choices=REPORT_NAMES, help="Raport (można podać kilka razy; domyślnie wszystkie)")
+    parser.add_argument("--limit", type=int, default=ADMIN_STATS_TOP_USERS, help="Liczba użytkowników w raporcie top_spenders")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", help="Format eksportu")
+    parser.add_argument("--output", help="Katalog eksportu (bez tej opcji raporty są wypisywane)")
+    parser.add_argument("--db", help="Ścieżka do bazy danych")
+    args = parser.parse_args(argv)
+
+    if args.days <= 0:
+        parser.error("--days musi być liczbą dodatnią")
+    if args.output:
+        try:
+            check_export_format(args.format)
+        except ValueError as e:
+            parser.error(str(e))
+
+    reports = load_reports(args.days, args.report, args.limit, args.db)
+    if args.output:
+        for path in export_reports(reports, args.output, args.format, args.days):
+            print(path)
+    else:
+        for name, frame in reports.items():
+            print(f"== {name} ==")
+            print(frame.to_string(index=False) if not frame.empty else "(brak danych)")
+            print()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+"""
+Moduł kierujący zapytania zwrotne (przyciski) do handlerów na podstawie drzewa prefiksów
+"""
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Liczba ostatnich pomiarów czasu obsługi trasy używana do percentyli
+LATENCY_SAMPLES = 200
+
+# Obsługa dłuższa niż ten próg (sekundy) jest logowana jako ostrzeżenie
+SLOW_CALLBACK_SECONDS = 5.0
+
+class CallbackRouter:
+    """
+    Router zapytań zwrotnych oparty na drzewie prefiksów (trie).
+
+    Trasy rejestruje się deklaratywnie: dokładne (callback_data równe wzorcowi)
+    albo prefiksowe (callback_data zaczyna się od wzorca). Wyszukiwanie przechodzi
+    drzewo znak po znaku, więc koszt zależy tylko od długości callback_data,
+    a nie od liczby tras. Wygrywa najdłuższe dopasowanie, przy czym trasa
+    dokładna ma pierwszeństwo przed prefiksową o tym samym wzorcu.
+    """
+
+    def __init__(self, fallback=None):
+        self._root = self._new_node()
+        self._fallback = fallback
+        self._stats = {}
+        self._unmatched = 0
+
+    @staticmethod
+    def _new_node():
+        return {"children": {}, "exact": None, "prefix": None}
+
+    def add_route(self, pattern, handler, exact=False):
+        """
+        Rejestruje trasę
+
+        Args:
+            pattern (str): Dokładna wartość callback_data lub jej prefiks
+            handler: Funkcja async (update, context) obsługująca zapytanie
+            exact (bool): True dla trasy dokładnej, False dla prefiksowej
+        """
+        node = self._root
+        for char in pattern:
+            node = node["children"].setdefault(char, self._new_node())
+
+        kind = "exact" if exact else "prefix"
+        if node[kind] is not None:
+            raise ValueError(f"Trasa {kind} '{pattern}' jest już zarejestrowana")
+
+        name = pattern if exact else pattern + "*"
+        node[kind] = (name, handler)
+        self._stats[name] = {"calls": 0, "errors": 0, "total_time": 0.0, "max_time": 0.0,
+                             "recent": deque(maxlen=LATENCY_SAMPLES)}
+
+    def set_fallback(self, handler):
+        """Ustawia handler zapytań, które nie pasują do żadnej trasy"""
+        self._fallback = handler
+
+    def resolve(self, data):
+        """
+        Znajduje trasę dla callback_data
+
+        Args:
+            data (str): Wartość callback_data
+
+        Returns:
+            tuple | None: (nazwa_trasy, handler) lub None, jeśli żadna trasa nie pasuje
+        """
+        node = self._root
+        match = node["prefix"]
+        for char in data:
+            node = node["children"].get(char)
+            if node is None:
+                return match
+            if node["prefix"] is not None:
+                match = node["prefix"]
+        return node["exact"] or match
+
+    async def dispatch(self, update, context):
+        """
+        Przekazuje zapytanie zwrotne do pasującego handlera i mierzy czas obsługi
+
+        Args:
+            update: Aktualizacja Telegram z callback_query
+            context: Kontekst bota
+
+        Returns:
+            bool: True, jeśli zapytanie trafiło do zarejestrowanej trasy
+        """
+        data = update.callback_query.data or ""
+        route = self.resolve(data)
+        if route is None:
+            self._unmatched += 1
+            logger.warning(f"Nieobsłużony callback: {data}")
+            if self._fallback:
+                await self._fallback(update, context)
+            return False
+
+        name, handler = route
+        stats = self._stats[name]
+        started_at = time.perf_counter()
+        try:
+            await handler(update, context)
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            stats["calls"] += 1
+            stats["total_time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+            stats["recent"].append(elapsed)
+            if elapsed > SLOW_CALLBACK_SECONDS:
+                logger.warning(f"Wolna obsługa callbacku {data} (trasa {name}): {elapsed:.1f}s")
+        return True
+
+    def get_stats(self):
+        """
+        Zwraca statystyki tras
+
+        Returns:
+            dict: Dla każdej użytej trasy liczba wywołań, błędów oraz czasy obsługi
+                (średni, p95 i maksymalny, w milisekundach); liczba niedopasowanych zapytań
+        """
+        routes = {}
+        for name, stats in self._stats.items():
+            if not stats["calls"]:
+                continue
+            recent = sorted(stats["recent"])
+            routes[name] = {
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "avg_ms": round(stats["total_time"] / stats["calls"] * 1000, 1),
+                "p95_ms": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 1),
+                "max_ms": round(stats["max_time"] * 1000, 1)
+            }
+        return {"routes": routes, "unmatched": self._unmatched}
+
+# Współdzielony router zapytań zwrotnych
+callback_router = CallbackRouter()
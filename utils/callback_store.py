@@ -0,0 +1,287 @@
+"""
+Moduł przechowujący dane przycisków po stronie serwera.
+callback_data przenosi tylko krótki token, a właściwe dane (ID plików,
+wybory użytkownika itp.) są przechowywane w pamięci i zapisywane do SQLite.
+"""
+import json
+import time
+import asyncio
+import sqlite3
+import secrets
+import logging
+from collections import OrderedDict
+from database.sqlite_client import DB_PATH
+from config import CALLBACK_STORE_MAX_ENTRIES, CALLBACK_STORE_TTL, CALLBACK_STORE_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Limit Telegrama dla callback_data (bajty)
+CALLBACK_DATA_MAX_BYTES = 64
+
+# Liczba losowych bajtów tokena i długość tokena w znakach base64url
+TOKEN_BYTES = 8
+TOKEN_LENGTH = 11
+
+# Co tyle zapisów usuwane są przeterminowane wpisy z SQLite
+PURGE_EVERY = 500
+
+class CallbackStore:
+    """
+    Magazyn danych przycisków: krótki, nieprzewidywalny token -> dane (JSON).
+
+    Najnowsze wpisy są trzymane w pamięci (LRU). Nowe wpisy są co
+    flush_interval sekund zapisywane partią do tabeli callback_payloads
+    (w osobnym wątku), więc po awarii bota giną najwyżej przyciski z ostatnich
+    sekund. Po przekroczeniu limitu najdawniej używane wpisy są usuwane
+    z pamięci i wczytywane z bazy przy kliknięciu przycisku. Wpisy wygasają
+    po czasie TTL.
+    """
+
+    def __init__(self, max_entries=CALLBACK_STORE_MAX_ENTRIES, ttl=CALLBACK_STORE_TTL, db_path=DB_PATH,
+                 flush_interval=CALLBACK_STORE_FLUSH_INTERVAL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self._entries = OrderedDict()   # token -> (dane, czas_wygaśnięcia)
+        self._unsaved = {}              # token -> (JSON, czas_wygaśnięcia) - wpisy czekające na zapis do bazy
+        self._table_ready = False
+        self._writes = 0
+        self._flusher = None
+        self._stats = {"stored": 0, "hits": 0, "db_hits": 0, "misses": 0, "expired": 0, "spilled": 0, "written": 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        if not self._table_ready:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS callback_payloads (
+                token TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_callback_payloads_expires ON callback_payloads(expires_at)")
+            conn.commit()
+            self._table_ready = True
+        return conn
+
+    def put(self, payload, ttl=None):
+        """
+        Zapisuje dane przycisku
+
+        Args:
+            payload (dict): Dane serializowalne do JSON
+            ttl (int, optional): Czas ważności w sekundach (domyślnie z konfiguracji)
+
+        Returns:
+            str: Token do umieszczenia w callback_data
+        """
+        token = secrets.token_urlsafe(TOKEN_BYTES)
+        expires_at = time.time() + (ttl or self.ttl)
+        self._entries[token] = (payload, expires_at)
+        self._unsaved[token] = (json.dumps(payload), expires_at)
+        self._stats["stored"] += 1
+
+        if len(self._entries) > self.max_entries:
+            # Usuwamy naraz 10% najdawniej używanych wpisów
+            self._spill(max(1, self.max_entries // 10))
+
+        self._writes += 1
+        self._ensure_flusher()
+        return token
+
+    async def get(self, token):
+        """
+        Pobiera dane przycisku (wpisy spoza pamięci są odczytywane z bazy w osobnym wątku)
+
+        Args:
+            token (str): Token z callback_data
+
+        Returns:
+            dict | None: Dane lub None, jeśli token jest nieznany albo wygasł
+        """
+        now = time.time()
+        entry = self._entries.get(token)
+        if entry is not None:
+            if entry[1] < now:
+                del self._entries[token]
+                self._stats["expired"] += 1
+                return None
+            self._entries.move_to_end(token)
+            self._stats["hits"] += 1
+            return entry[0]
+
+        row = self._unsaved.get(token)
+        if row is None:
+            row = await asyncio.to_thread(self._read, token)
+
+        if row is None:
+            self._stats["misses"] += 1
+            return None
+        if row[1] < now:
+            self._stats["expired"] += 1
+            return None
+
+        payload = json.loads(row[0])
+        self._stats["db_hits"] += 1
+        return payload
+
+    def _read(self, token):
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT payload, expires_at FROM callback_payloads WHERE token = ?", (token,)
+            ).fetchone()
+            conn.close()
+            return row
+        except Exception as e:
+            logger.error(f"Błąd odczytu danych przycisku z bazy: {e}")
+            return None
+
+    def _spill(self, count):
+        """Usuwa z pamięci najdawniej używane wpisy (niezapisane czekają w _unsaved na najbliższy zapis)"""
+        spilled = 0
+        while self._entries and spilled < count:
+            self._entries.popitem(last=False)
+            spilled += 1
+        self._stats["spilled"] += spilled
+
+    def _take_unsaved(self):
+        """Pobiera wiersze czekające na zapis"""
+        rows = [(token, payload, expires_at) for token, (payload, expires_at) in self._unsaved.items()]
+        self._unsaved.clear()
+        return rows
+
+    def _finish_write(self, rows, written):
+        """Po nieudanym zapisie przywraca wiersze, aby ponowić zapis w kolejnej partii"""
+        if written:
+            self._stats["written"] += len(rows)
+            return
+        for token, payload, expires_at in rows:
+            self._unsaved.setdefault(token, (payload, expires_at))
+
+    def _write(self, rows):
+        """
+        Zapisuje wiersze jednym zapytaniem (bez dostępu do stanu magazynu,
+        więc może działać w osobnym wątku)
+
+        Returns:
+            bool: True, jeśli zapis się powiódł
+        """
+        try:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO callback_payloads (token, payload, expires_at) VALUES (?, ?, ?)", rows
+            )
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Błąd zapisu danych przycisków do bazy: {e}")
+            return False
+
+    def _ensure_flusher(self):
+        """Uruchamia okresowy zapis nowych wpisów, jeśli działa pętla zdarzeń"""
+        if self._flusher is not None and not self._flusher.done():
+            return
+        try:
+            self._flusher = asyncio.get_running_loop().create_task(self._run_flusher())
+        except RuntimeError:
+            # Brak pętli zdarzeń (np. skrypty) - wpisy zapisze flush()
+            pass
+
+    async def _run_flusher(self):
+        while self._unsaved:
+            await asyncio.sleep(self.flush_interval)
+            rows = self._take_unsaved()
+            if rows:
+                self._finish_write(rows, await asyncio.to_thread(self._write, rows))
+            if self._writes >= PURGE_EVERY:
+                self._writes = 0
+                self._purge_memory()
+                await asyncio.to_thread(self._purge_database)
+
+    def _purge_memory(self):
+        now = time.time()
+        for token in [token for token, (_, expires_at) in self._entries.items() if expires_at < now]:
+            del self._entries[token]
+
+    def _purge_database(self):
+        now = time.time()
+        try:
+            conn = self._connect()
+            deleted = conn.execute("DELETE FROM callback_payloads WHERE expires_at < ?", (now,)).rowcount
+            conn.commit()
+            conn.close()
+            return deleted
+        except Exception as e:
+            logger.error(f"Błąd usuwania przeterminowanych danych przycisków: {e}")
+            return 0
+
+    def purge_expired(self):
+        """
+        Usuwa przeterminowane wpisy z pamięci i z bazy
+
+        Returns:
+            int: Liczba usuniętych wpisów z bazy
+        """
+        self._purge_memory()
+        return self._purge_database()
+
+    def flush(self):
+        """Zapisuje w bieżącym wątku wpisy czekające na zapis (przy zamykaniu bota), aby przyciski działały po restarcie"""
+        rows = self._take_unsaved()
+        if rows:
+            self._finish_write(rows, self._write(rows))
+
+    def get_stats(self):
+        """
+        Zwraca statystyki magazynu
+
+        Returns:
+            dict: Liczniki zapisów, trafień (pamięć/baza), chybień i wygaśnięć
+        """
+        stats = dict(self._stats)
+        stats["in_memory"] = len(self._entries)
+        stats["unsaved"] = len(self._unsaved)
+        return stats
+
+# Współdzielony magazyn danych przycisków
+callback_store = CallbackStore()
+
+def make_callback_data(prefix, payload, ttl=None):
+    """
+    Tworzy callback_data z prefiksem trasy i tokenem danych
+
+    Args:
+        prefix (str): Prefiks trasy routera (np. "translate_pdf_")
+        payload (dict): Dane przycisku
+        ttl (int, optional): Czas ważności w sekundach
+
+    Returns:
+        str: callback_data mieszczące się w limicie Telegrama
+    """
+    callback_data = prefix + callback_store.put(payload, ttl)
+    if len(callback_data.encode('utf-8')) > CALLBACK_DATA_MAX_BYTES:
+        raise ValueError(f"Prefiks callback_data jest za długi: {prefix}")
+    return callback_data
+
+async def resolve_callback_payload(callback_data, prefix, legacy_key=None):
+    """
+    Odczytuje dane przycisku z callback_data
+
+    Args:
+        callback_data (str): Wartość callback_data
+        prefix (str): Prefiks trasy
+        legacy_key (str, optional): Klucz, pod którym zwracana jest surowa wartość
+            ze starszych przycisków (sprzed wprowadzenia tokenów), np. "file_id"
+
+    Returns:
+        dict | None: Dane przycisku lub None, jeśli przycisk wygasł
+    """
+    value = callback_data[len(prefix):]
+    payload = await callback_store.get(value)
+    if payload is None and legacy_key and len(value) > TOKEN_LENGTH:
+        # Starsze przyciski zawierały ID pliku bezpośrednio w callback_data
+        return {legacy_key: value}
+    return payload
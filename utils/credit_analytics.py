@@ -1,218 +1,326 @@
 # utils/credit_analytics.py
+import io
+import time
 import sqlite3
+import asyncio
 import datetime
+from collections import OrderedDict
 import pytz
-import matplotlib.pyplot as plt
-import io
-from matplotlib.dates import DateFormatter
-import numpy as np
+from config import CHART_CACHE_MAX_ENTRIES, CHART_CACHE_TTL
 
 # Ścieżka do pliku bazy danych
 DB_PATH = "bot_database.sqlite"
 
-def generate_credit_usage_chart(user_id, days=30):
+# Kategorie zużycia kredytów: (kategoria, wzorzec opisu transakcji) - sprawdzane w tej kolejności
+USAGE_CATEGORY_PATTERNS = [
+    ("Wiadomości", "Wiadomość"),
+    ("Obrazy", "obraz|DALL-E"),
+    ("Analiza dokumentów", "dokument"),
+    ("Analiza zdjęć", "zdjęc"),
+]
+OTHER_USAGE_CATEGORY = "Inne"
+
+# Pamięć podręczna LRU: (user_id, dni, ID ostatniej transakcji) -> (czas, wykresy PNG)
+_chart_cache = OrderedDict()
+
+def new_figure(figsize):
     """
-    Generuje wykres użycia kredytów w czasie
+    Tworzy rysunek z płótnem Agg bez użycia pyplot (bez globalnego stanu,
+    więc wykresy mogą być rysowane równolegle w różnych wątkach i procesach)
+
+    Args:
+        figsize (tuple): Rozmiar rysunku w calach
+
+    Returns:
+        Figure: Rysunek matplotlib
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    return figure
+
+def figure_to_png(figure):
+    """Zapisuje rysunek do bufora PNG"""
+    buf = io.BytesIO()
+    figure.savefig(buf, format='png', dpi=100)
+    buf.seek(0)
+    return buf
+
+def load_credit_flows(user_id, days=30, db_path=None):
+    """
+    Wczytuje godzinowe sumy transakcji kredytowych użytkownika z ostatnich dni.
+    Wiersze transakcji są sumowane w SQLite (po indeksie user_id, created_at),
+    więc do pandas trafia najwyżej 24 wiersze na dzień niezależnie od liczby transakcji.
     
     Args:
         user_id (int): ID użytkownika
         days (int): Liczba dni do uwzględnienia w analizie
+        db_path (str, optional): Ścieżka do bazy danych (domyślnie DB_PATH)
     
     Returns:
-        BytesIO: Bufor zawierający wygenerowany wykres
+        DataFrame: Kolumny period (początek godziny, datetime UTC), usage i purchases
+                   (suma kredytów), balance (saldo po ostatniej transakcji w godzinie),
+                   posortowane według czasu
     """
+    import pandas as pd
+    
+    start_date = (datetime.datetime.now(pytz.UTC) - datetime.timedelta(days=days)).isoformat()
+    conn = sqlite3.connect(db_path or DB_PATH)
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Pobierz transakcje z ostatnich X dni
-        start_date = (datetime.datetime.now(pytz.UTC) - datetime.timedelta(days=days)).isoformat()
-        
-        cursor.execute("""
-            SELECT created_at, transaction_type, amount, credits_after
+        # Daty są zapisywane przez isoformat() w UTC - pierwsze 13 znaków to godzina.
+        # Przy jednym agregacie MAX() SQLite zwraca credits_after z wiersza o najpóźniejszej dacie.
+        flows = pd.read_sql_query(
+            """
+            SELECT substr(created_at, 1, 13) AS period,
+                   SUM(CASE WHEN transaction_type = 'deduct' THEN amount ELSE 0 END) AS usage,
+                   SUM(CASE WHEN transaction_type IN ('add', 'purchase') THEN amount ELSE 0 END) AS purchases,
+                   credits_after AS balance,
+                   MAX(created_at) AS last_transaction_at
             FROM credit_transactions
             WHERE user_id = ? AND created_at >= ?
-            ORDER BY created_at ASC
-        """, (user_id, start_date))
-        
-        transactions = cursor.fetchall()
+            GROUP BY period
+            ORDER BY period
+            """,
+            conn, params=(user_id, start_date),
+            dtype={"usage": "int64", "purchases": "int64", "balance": "int64"}
+        )
+    finally:
         conn.close()
+    
+    flows["period"] = pd.to_datetime(flows["period"], format="%Y-%m-%dT%H", utc=True)
+    return flows.drop(columns="last_transaction_at")
+
+def daily_credit_flows(flows):
+    """
+    Sumuje zużycie i zakupy kredytów w kolejnych dniach
+    
+    Args:
+        flows (DataFrame): Wynik load_credit_flows
+    
+    Returns:
+        DataFrame: Indeks - dni z transakcjami, kolumny usage i purchases
+    """
+    return flows.groupby(flows["period"].dt.floor("D"))[["usage", "purchases"]].sum()
+
+def classify_usage(descriptions):
+    """
+    Przypisuje opisom transakcji kategorie zużycia (USAGE_CATEGORY_PATTERNS)
+    
+    Args:
+        descriptions (Series): Opisy transakcji
+    
+    Returns:
+        Series: Kategorie (typ category)
+    """
+    import numpy as np
+    import pandas as pd
+    
+    descriptions = descriptions.fillna("")
+    conditions = [descriptions.str.contains(pattern, regex=True) for _, pattern in USAGE_CATEGORY_PATTERNS]
+    labels = [category for category, _ in USAGE_CATEGORY_PATTERNS]
+    categories = np.select(conditions, labels, default=OTHER_USAGE_CATEGORY)
+    return pd.Series(
+        pd.Categorical(categories, categories=labels + [OTHER_USAGE_CATEGORY]),
+        index=descriptions.index
+    )
+
+def generate_credit_usage_chart(user_id, days=30, db_path=None):
+    """
+    Generuje wykres użycia kredytów w czasie
+    
+    Args:
+        user_id (int): ID użytkownika
+        days (int): Liczba dni do uwzględnienia w analizie
+        db_path (str, optional): Ścieżka do bazy danych (domyślnie DB_PATH)
+    
+    Returns:
+        BytesIO: Bufor zawierający wygenerowany wykres
+    """
+    try:
+        flows = load_credit_flows(user_id, days, db_path)
         
-        if not transactions:
+        if flows.empty:
             return None
         
-        # Przygotuj dane do wykresu
-        dates = []
-        balances = []
-        usage_amounts = []
-        purchase_amounts = []
-        
-        for created_at, trans_type, amount, credits_after in transactions:
-            try:
-                # Konwersja formatu daty
-                dt = datetime.datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                dates.append(dt)
-                balances.append(credits_after)
-                
-                if trans_type == 'deduct':
-                    usage_amounts.append(amount)
-                    purchase_amounts.append(0)
-                elif trans_type in ['add', 'purchase']:
-                    usage_amounts.append(0)
-                    purchase_amounts.append(amount)
-            except Exception as e:
-                print(f"Błąd przy przetwarzaniu transakcji: {e}")
+        daily = daily_credit_flows(flows)
         
         # Wygeneruj wykres
-        plt.figure(figsize=(10, 6))
+        from matplotlib.dates import DateFormatter
+        import numpy as np
+        figure = new_figure((10, 6))
+        balance_axes, daily_axes = figure.subplots(2, 1)
         
         # Wykres salda
-        plt.subplot(2, 1, 1)
-        plt.plot(dates, balances, 'b-', label='Saldo kredytów')
-        plt.xlabel('Data')
-        plt.ylabel('Kredyty')
-        plt.title('Historia salda kredytów')
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.gca().xaxis.set_major_formatter(DateFormatter('%d-%m-%Y'))
-        plt.gcf().autofmt_xdate()
-        plt.legend()
+        balance_axes.plot(flows["period"], flows["balance"], 'b-', label='Saldo kredytów')
+        balance_axes.set_xlabel('Data')
+        balance_axes.set_ylabel('Kredyty')
+        balance_axes.set_title('Historia salda kredytów')
+        balance_axes.grid(True, linestyle='--', alpha=0.7)
+        balance_axes.xaxis.set_major_formatter(DateFormatter('%d-%m-%Y'))
+        balance_axes.tick_params(axis='x', labelrotation=30)
+        balance_axes.legend()
         
         # Wykres transakcji
-        plt.subplot(2, 1, 2)
-        
-        # Przygotuj dane do wykresu słupkowego
-        unique_dates = sorted(list(set([d.date() for d in dates])))
-        daily_usage = [0] * len(unique_dates)
-        daily_purchases = [0] * len(unique_dates)
-        
-        for i, (dt, usage, purchase) in enumerate(zip(dates, usage_amounts, purchase_amounts)):
-            date_idx = unique_dates.index(dt.date())
-            daily_usage[date_idx] += usage
-            daily_purchases[date_idx] += purchase
-        
-        x = np.arange(len(unique_dates))
+        x = np.arange(len(daily))
         bar_width = 0.35
         
-        plt.bar(x - bar_width/2, daily_usage, bar_width, label='Zużycie', color='red', alpha=0.7)
-        plt.bar(x + bar_width/2, daily_purchases, bar_width, label='Zakupy', color='green', alpha=0.7)
+        daily_axes.bar(x - bar_width/2, daily["usage"], bar_width, label='Zużycie', color='red', alpha=0.7)
+        daily_axes.bar(x + bar_width/2, daily["purchases"], bar_width, label='Zakupy', color='green', alpha=0.7)
         
-        plt.xlabel('Data')
-        plt.ylabel('Kredyty')
-        plt.title('Dzienne zużycie i zakupy kredytów')
-        plt.xticks(x, [d.strftime('%d-%m') for d in unique_dates], rotation=45)
-        plt.grid(True, linestyle='--', alpha=0.3, axis='y')
-        plt.legend()
+        daily_axes.set_xlabel('Data')
+        daily_axes.set_ylabel('Kredyty')
+        daily_axes.set_title('Dzienne zużycie i zakupy kredytów')
+        daily_axes.set_xticks(x, daily.index.strftime('%d-%m'), rotation=45)
+        daily_axes.grid(True, linestyle='--', alpha=0.3, axis='y')
+        daily_axes.legend()
         
-        plt.tight_layout()
-        
-        # Zapisz wykres do bufora
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100)
-        buf.seek(0)
-        plt.close()
-        
-        return buf
+        figure.tight_layout()
+        return figure_to_png(figure)
     except Exception as e:
         print(f"Błąd przy generowaniu wykresu: {e}")
-        if 'plt' in locals():
-            plt.close()
         return None
 
-def get_credit_usage_breakdown(user_id, days=30):
+def get_credit_usage_breakdown(user_id, days=30, db_path=None):
     """
     Pobiera rozkład zużycia kredytów według rodzaju operacji
     
     Args:
         user_id (int): ID użytkownika
         days (int): Liczba dni do uwzględnienia w analizie
+        db_path (str, optional): Ścieżka do bazy danych (domyślnie DB_PATH)
     
     Returns:
         dict: Słownik z rozkładem zużycia kredytów
     """
+    import pandas as pd
+    
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Pobierz transakcje z ostatnich X dni
         start_date = (datetime.datetime.now(pytz.UTC) - datetime.timedelta(days=days)).isoformat()
         
-        cursor.execute("""
-            SELECT description, SUM(amount)
-            FROM credit_transactions
-            WHERE user_id = ? AND created_at >= ? AND transaction_type = 'deduct'
-            GROUP BY description
-            ORDER BY SUM(amount) DESC
-        """, (user_id, start_date))
-        
-        usage_breakdown = cursor.fetchall()
-        conn.close()
+        # Sumy dla każdego opisu liczy SQLite - do pandas trafia po jednym wierszu na opis
+        conn = sqlite3.connect(db_path or DB_PATH)
+        try:
+            usage = pd.read_sql_query("""
+                SELECT description, SUM(amount) AS amount
+                FROM credit_transactions
+                WHERE user_id = ? AND created_at >= ? AND transaction_type = 'deduct'
+                GROUP BY description
+            """, conn, params=(user_id, start_date))
+        finally:
+            conn.close()
         
-        result = {}
-        for description, amount in usage_breakdown:
-            category = "Inne"
-            if description:
-                if "Wiadomość" in description:
-                    category = "Wiadomości"
-                elif "obraz" in description or "DALL-E" in description:
-                    category = "Obrazy"
-                elif "dokument" in description:
-                    category = "Analiza dokumentów"
-                elif "zdjęci" in description or "zdjęc" in description:
-                    category = "Analiza zdjęć"
-            
-            if category not in result:
-                result[category] = 0
-            result[category] += amount
+        if usage.empty:
+            return {}
         
-        return result
+        totals = usage["amount"].groupby(classify_usage(usage["description"]), observed=True).sum()
+        totals = totals.sort_values(ascending=False)
+        return {category: int(amount) for category, amount in totals.items()}
     except Exception as e:
         print(f"Błąd przy pobieraniu rozkładu zużycia kredytów: {e}")
-        if 'conn' in locals():
-            conn.close()
         return {}
 
-def generate_usage_breakdown_chart(user_id, days=30):
+def generate_usage_breakdown_chart(user_id, days=30, db_path=None):
     """
     Generuje wykres kołowy rozkładu zużycia kredytów
     
     Args:
         user_id (int): ID użytkownika
         days (int): Liczba dni do uwzględnienia w analizie
+        db_path (str, optional): Ścieżka do bazy danych (domyślnie DB_PATH)
     
     Returns:
         BytesIO: Bufor zawierający wygenerowany wykres
     """
     try:
         # Pobierz rozkład zużycia kredytów
-        usage_breakdown = get_credit_usage_breakdown(user_id, days)
+        usage_breakdown = get_credit_usage_breakdown(user_id, days, db_path)
         
         if not usage_breakdown:
             return None
         
         # Wygeneruj wykres kołowy
-        plt.figure(figsize=(8, 6))
+        figure = new_figure((8, 6))
+        axes = figure.subplots()
         
         labels = list(usage_breakdown.keys())
         sizes = list(usage_breakdown.values())
         colors = ['#ff9999', '#66b3ff', '#99ff99', '#ffcc99', '#c2c2f0']
         
-        plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90, shadow=True)
-        plt.axis('equal')
-        plt.title(f'Rozkład zużycia kredytów w ostatnich {days} dniach')
+        axes.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90, shadow=True)
+        axes.axis('equal')
+        axes.set_title(f'Rozkład zużycia kredytów w ostatnich {days} dniach')
         
-        # Zapisz wykres do bufora
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100)
-        buf.seek(0)
-        plt.close()
-        
-        return buf
+        return figure_to_png(figure)
     except Exception as e:
         print(f"Błąd przy generowaniu wykresu rozkładu zużycia: {e}")
-        if 'plt' in locals():
-            plt.close()
         return None
 
+def render_credit_charts(user_id, days=30, db_path=None):
+    """
+    Rysuje oba wykresy analizy kredytów (uruchamiane w procesie roboczym puli)
+    
+    Args:
+        user_id (int): ID użytkownika
+        days (int): Liczba dni do uwzględnienia w analizie
+        db_path (str, optional): Ścieżka do bazy danych (domyślnie DB_PATH)
+    
+    Returns:
+        tuple: (wykres historii, wykres rozkładu) jako bajty PNG lub None
+    """
+    charts = (
+        generate_credit_usage_chart(user_id, days, db_path),
+        generate_usage_breakdown_chart(user_id, days, db_path)
+    )
+    return tuple(chart.getvalue() if chart else None for chart in charts)
+
+def get_latest_transaction_id(user_id, db_path=None):
+    """
+    Zwraca ID ostatniej transakcji kredytowej użytkownika (zmienia się przy każdej zmianie salda)
+    
+    Args:
+        user_id (int): ID użytkownika
+        db_path (str, optional): Ścieżka do bazy danych (domyślnie DB_PATH)
+    
+    Returns:
+        int: ID transakcji lub 0, jeśli użytkownik nie ma transakcji
+    """
+    conn = sqlite3.connect(db_path or DB_PATH)
+    try:
+        result = conn.execute("SELECT MAX(id) FROM credit_transactions WHERE user_id = ?", (user_id,)).fetchone()
+    finally:
+        conn.close()
+    return result[0] or 0
+
+async def get_credit_charts(user_id, days=30):
+    """
+    Zwraca wykresy analizy kredytów, rysując je w puli procesów.
+    Gotowe wykresy są zapamiętywane z kluczem (użytkownik, dni, ostatnia transakcja),
+    więc kolejne zapytania są obsługiwane z pamięci podręcznej, dopóki nie
+    pojawi się nowa transakcja (lub nie minie CHART_CACHE_TTL).
+    
+    Args:
+        user_id (int): ID użytkownika
+        days (int): Liczba dni do uwzględnienia w analizie
+    
+    Returns:
+        tuple: (wykres historii, wykres rozkładu) jako bajty PNG lub None
+    """
+    from utils.process_pool import run_in_process
+    
+    latest_transaction_id = await asyncio.to_thread(get_latest_transaction_id, user_id)
+    key = (user_id, days, latest_transaction_id)
+    cached = _chart_cache.get(key)
+    if cached and time.monotonic() - cached[0] < CHART_CACHE_TTL:
+        _chart_cache.move_to_end(key)
+        return cached[1]
+    
+    charts = await run_in_process(render_credit_charts, user_id, days, DB_PATH)
+    _chart_cache[key] = (time.monotonic(), charts)
+    while len(_chart_cache) > CHART_CACHE_MAX_ENTRIES:
+        _chart_cache.popitem(last=False)
+    return charts
+
 def predict_credit_depletion(user_id, days=30):
     """
     Przewiduje, kiedy skończą się kredyty użytkownika na podstawie historii użycia
@@ -0,0 +1,282 @@
+"""
+Moduł do analizy dużych dokumentów tekstowych metodą map-reduce
+"""
+import re
+import codecs
+import asyncio
+import logging
+from utils.openai_client import get_client, openai_semaphore
+from config import (
+    DOCUMENT_CHUNK_MAX_CHARS, DOCUMENT_TRANSLATE_CHUNK_MAX_CHARS,
+    DOCUMENT_MAX_CHUNKS, DOCUMENT_CHUNK_SUMMARY_TOKENS, DOCUMENT_REDUCE_MAX_CHARS
+)
+
+logger = logging.getLogger(__name__)
+
+# Rozmiar porcji odczytywanej z pliku podczas dekodowania
+READ_BLOCK_SIZE = 64 * 1024
+
+# Wzorce linii rozpoczynających nowy blok strukturalny
+MARKDOWN_HEADING = re.compile(r'^#{1,6}\s')
+PYTHON_TOP_LEVEL = re.compile(r'^(def |async def |class |@|if __name__)')
+PDF_PAGE_MARKER = re.compile(r'^--- Page \d+ ---$')
+
+def iter_lines(source):
+    """
+    Dekoduje plik przyrostowo jako UTF-8 i zwraca kolejne linie
+
+    Args:
+        source (str | bytes | bytearray | file): Tekst, zawartość pliku lub obiekt pliku binarnego
+
+    Yields:
+        str: Kolejne linie tekstu (z zachowanym znakiem końca linii)
+
+    Raises:
+        UnicodeDecodeError: Jeśli plik nie jest poprawnym tekstem UTF-8
+    """
+    if isinstance(source, str):
+        yield from source.splitlines(keepends=True)
+        return
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ""
+
+    if hasattr(source, 'read'):
+        blocks = iter(lambda: source.read(READ_BLOCK_SIZE), b"")
+    else:
+        view = memoryview(source)
+        blocks = (view[i:i + READ_BLOCK_SIZE] for i in range(0, len(view), READ_BLOCK_SIZE))
+
+    for block in blocks:
+        pending += decoder.decode(bytes(block))
+        lines = pending.splitlines(keepends=True)
+        # Ostatnia linia może być niepełna - czekamy na kolejną porcję
+        pending = lines.pop() if lines and not lines[-1].endswith(('\n', '\r')) else ""
+        yield from lines
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+def iter_structural_blocks(lines, file_extension):
+    """
+    Grupuje linie w bloki zgodne ze strukturą pliku
+
+    Args:
+        lines (iterable): Linie tekstu
+        file_extension (str): Rozszerzenie pliku (np. ".md")
+
+    Yields:
+        str: Kolejne bloki tekstu
+    """
+    block = []
+    for line in lines:
+        if file_extension in ('.csv', '.json', '.log'):
+            # Każdy rekord (wiersz) jest osobnym blokiem
+            yield line
+            continue
+
+        if file_extension == '.md':
+            starts_block = bool(MARKDOWN_HEADING.match(line))
+        elif file_extension == '.py':
+            starts_block = bool(PYTHON_TOP_LEVEL.match(line))
+        elif file_extension == '.pdf':
+            # Tekst z PDF dzielimy na granicach stron
+            starts_block = bool(PDF_PAGE_MARKER.match(line.rstrip()))
+        else:
+            # Tekst - akapity oddzielone pustą linią
+            starts_block = not line.strip() and bool(block)
+
+        if starts_block and block:
+            yield "".join(block)
+            block = []
+        block.append(line)
+
+    if block:
+        yield "".join(block)
+
+def split_into_chunks(blocks, max_chars, header=""):
+    """
+    Łączy bloki w fragmenty nieprzekraczające zadanego rozmiaru
+
+    Args:
+        blocks (iterable): Bloki tekstu
+        max_chars (int): Maksymalna liczba znaków we fragmencie
+        header (str): Nagłówek dodawany na początku każdego fragmentu (np. nagłówek CSV)
+
+    Returns:
+        list: Lista fragmentów tekstu
+    """
+    chunks = []
+    current = []
+    current_size = len(header)
+
+    def flush():
+        nonlocal current, current_size
+        if current:
+            chunks.append(header + "".join(current))
+        current = []
+        current_size = len(header)
+
+    for block in blocks:
+        # Zbyt duży blok dzielimy po liniach, a zbyt długie linie na sztywno
+        if len(block) + len(header) > max_chars:
+            pieces = []
+            for line in block.splitlines(keepends=True):
+                while len(line) + len(header) > max_chars:
+                    cut = max_chars - len(header)
+                    pieces.append(line[:cut])
+                    line = line[cut:]
+                pieces.append(line)
+        else:
+            pieces = [block]
+
+        for piece in pieces:
+            if current_size + len(piece) > max_chars:
+                flush()
+            current.append(piece)
+            current_size += len(piece)
+
+    flush()
+    return chunks
+
+def chunk_document(source, file_name, max_chars):
+    """
+    Dzieli dokument tekstowy na fragmenty z zachowaniem jego struktury
+
+    Args:
+        source (str | bytes | file): Tekst lub zawartość pliku
+        file_name (str): Nazwa pliku
+        max_chars (int): Maksymalna liczba znaków we fragmencie
+
+    Returns:
+        list: Lista fragmentów tekstu
+    """
+    file_extension = file_name[file_name.rfind('.'):].lower() if '.' in file_name else ""
+    lines = iter_lines(source)
+
+    header = ""
+    if file_extension == '.csv':
+        # Nagłówek CSV powtarzamy w każdym fragmencie, aby model znał kolumny
+        header = next(lines, "")
+
+    return split_into_chunks(iter_structural_blocks(lines, file_extension), max_chars, header)
+
+def _select_chunks(chunks, mode):
+    """
+    Ogranicza liczbę fragmentów do DOCUMENT_MAX_CHUNKS
+
+    Returns:
+        list: Lista krotek (numer_fragmentu, tekst)
+    """
+    indexed = list(enumerate(chunks, start=1))
+    if len(indexed) <= DOCUMENT_MAX_CHUNKS:
+        return indexed
+
+    if mode == "translate":
+        # Tłumaczenie musi zachować ciągłość - bierzemy początek dokumentu
+        return indexed[:DOCUMENT_MAX_CHUNKS]
+
+    # Do analizy wybieramy fragmenty równomiernie z całego dokumentu
+    step = len(indexed) / DOCUMENT_MAX_CHUNKS
+    return [indexed[int(i * step)] for i in range(DOCUMENT_MAX_CHUNKS)]
+
+async def _complete(messages, max_tokens):
+    """Wywołuje OpenAI z zachowaniem globalnego limitu równoległych zapytań"""
+    async with openai_semaphore:
+        response = await get_client().chat.completions.create(
+            model="gpt-4o",
+            messages=messages,
+            max_tokens=max_tokens
+        )
+    return response.choices[0].message.content or ""
+
+async def _map_chunk(index, total, chunk, file_name, mode, target_lang_name):
+    """Przetwarza pojedynczy fragment dokumentu (etap map)"""
+    if mode == "translate":
+        messages = [
+            {"role": "system", "content": f"You are a professional translator. Translate the text to {target_lang_name}. Preserve the original formatting. Return only the translation."},
+            {"role": "user", "content": chunk}
+        ]
+        return await _complete(messages, max_tokens=4000)
+
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant who analyzes documents and files. You receive one part of a larger file."},
+        {"role": "user", "content": f"This is part {index} of {total} of file {file_name}. Summarize the key information, facts, numbers, anomalies and structure of this part concisely.\n\nPart content:\n\n{chunk}"}
+    ]
+    return await _complete(messages, max_tokens=DOCUMENT_CHUNK_SUMMARY_TOKENS)
+
+async def _reduce_summaries(summaries, file_name, user_instruction, note):
+    """Łączy częściowe podsumowania w odpowiedź końcową (etap reduce)"""
+    # Jeśli podsumowań jest zbyt dużo na jedno zapytanie, redukujemy je grupami
+    while sum(len(s) for s in summaries) > DOCUMENT_REDUCE_MAX_CHARS and len(summaries) > 1:
+        groups = split_into_chunks(
+            (f"{summary}\n\n" for summary in summaries), DOCUMENT_REDUCE_MAX_CHARS
+        )
+        summaries = await asyncio.gather(*[
+            _complete([
+                {"role": "system", "content": "You are a helpful assistant who merges summaries of consecutive parts of a document."},
+                {"role": "user", "content": f"Merge these summaries of consecutive parts of file {file_name} into one concise summary, keeping all key facts:\n\n{group}"}
+            ], max_tokens=DOCUMENT_CHUNK_SUMMARY_TOKENS * 2)
+            for group in groups
+        ])
+
+    joined = "\n\n".join(f"[Part {i}]\n{summary}" for i, summary in enumerate(summaries, start=1))
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant who analyzes documents and files."},
+        {"role": "user", "content": f"{user_instruction}\n\nThe file was too large to read at once, so below are summaries of its consecutive parts.{note}\n\n{joined}"}
+    ]
+    return await _complete(messages, max_tokens=1500)
+
+async def analyze_large_document(source, file_name, user_instruction, mode="analyze",
+                                 target_lang_name="English", progress_callback=None):
+    """
+    Analizuje lub tłumaczy duży dokument tekstowy: dzieli go na fragmenty,
+    przetwarza je równolegle, a następnie łączy wyniki
+
+    Args:
+        source (str | bytes | file): Tekst lub zawartość pliku
+        file_name (str): Nazwa pliku
+        user_instruction (str): Instrukcja dla etapu końcowego
+        mode (str): Tryb: "analyze" lub "translate"
+        target_lang_name (str): Nazwa języka docelowego dla tłumaczenia
+        progress_callback (callable, optional): Korutyna wywoływana jako
+            progress_callback(przetworzone, wszystkie) po każdym fragmencie
+
+    Returns:
+        str: Analiza dokumentu lub jego tłumaczenie
+
+    Raises:
+        UnicodeDecodeError: Jeśli plik nie jest poprawnym tekstem UTF-8
+    """
+    max_chars = DOCUMENT_TRANSLATE_CHUNK_MAX_CHARS if mode == "translate" else DOCUMENT_CHUNK_MAX_CHARS
+    chunks = await asyncio.to_thread(chunk_document, source, file_name, max_chars)
+    selected = _select_chunks(chunks, mode)
+    total = len(selected)
+    logger.info(f"Dokument {file_name}: {len(chunks)} fragmentów, przetwarzanych {total}")
+
+    done = 0
+
+    async def process(index, chunk):
+        nonlocal done
+        result = await _map_chunk(index, len(chunks), chunk, file_name, mode, target_lang_name)
+        done += 1
+        if progress_callback:
+            try:
+                await progress_callback(done, total)
+            except Exception as e:
+                logger.warning(f"Błąd przy aktualizacji postępu: {e}")
+        return result
+
+    results = await asyncio.gather(*[process(index, chunk) for index, chunk in selected])
+
+    if mode == "translate":
+        translation = "\n\n".join(results)
+        if total < len(chunks):
+            translation += f"\n\n[Translated {total} of {len(chunks)} parts of the document]"
+        return translation
+
+    note = ""
+    if total < len(chunks):
+        note = f" Only {total} of {len(chunks)} evenly spaced parts were analyzed."
+    return await _reduce_summaries(list(results), file_name, user_instruction, note)
@@ -0,0 +1,310 @@
+"""
+Moduł pobierania plików przesłanych do bota.
+Pliki są pobierane strumieniowo porcjami: małe pozostają w pamięci, większe
+trafiają do pliku tymczasowego i są udostępniane jako mapowanie pamięci,
+więc żaden etap nie trzyma kilku pełnych kopii pliku naraz.
+"""
+import os
+import mmap
+import asyncio
+import logging
+import tempfile
+from contextlib import asynccontextmanager
+from utils.file_cache import file_cache
+from config import DOWNLOAD_MAX_BYTES, DOWNLOAD_SPOOL_MAX_MEMORY, DOWNLOAD_CHUNK_SIZE, DOWNLOAD_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+class DownloadTooLargeError(ValueError):
+    """Plik przekracza dopuszczalny rozmiar pobierania"""
+
+class DownloadedFile:
+    """
+    Zawartość pobranego pliku: bufor w pamięci albo plik tymczasowy na dysku.
+    Plik jest przenoszony na dysk, gdy jego rozmiar przekroczy spool_max_memory.
+    """
+
+    def __init__(self, spool_max_memory=DOWNLOAD_SPOOL_MAX_MEMORY, max_bytes=DOWNLOAD_MAX_BYTES):
+        self.spool_max_memory = spool_max_memory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.path = None          # Ścieżka pliku na dysku (None, jeśli zawartość jest w pamięci)
+        self._owns_path = False
+        self._buffer = bytearray()
+        self._file = None
+        self._mmap = None
+        self._view = None
+
+    @classmethod
+    def from_path(cls, path, max_bytes=DOWNLOAD_MAX_BYTES):
+        """Udostępnia istniejący plik (lokalny serwer Bot API) bez kopiowania"""
+        downloaded = cls(max_bytes=max_bytes)
+        downloaded.path = path
+        downloaded.size = os.path.getsize(path)
+        if downloaded.size > max_bytes:
+            raise DownloadTooLargeError(f"Plik ma {downloaded.size} B (limit {max_bytes} B)")
+        return downloaded
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Udostępnia zawartość trzymaną w pamięci podręcznej"""
+        downloaded = cls(max_bytes=len(data))
+        downloaded._buffer = data
+        downloaded.size = len(data)
+        return downloaded
+
+    def write(self, chunk):
+        """Dopisuje porcję danych (zgodne z interfejsem pliku binarnego)"""
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise DownloadTooLargeError(f"Plik przekracza limit {self.max_bytes} B")
+        if self._file is None and self.size > self.spool_max_memory:
+            fd, self.path = tempfile.mkstemp(prefix="tg_download_")
+            self._owns_path = True
+            self._file = os.fdopen(fd, 'wb')
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._buffer += chunk
+        return len(chunk)
+
+    def finish(self):
+        """Kończy zapis - po nim zawartość jest dostępna do odczytu"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def freeze(self):
+        """
+        Zamienia bufor w pamięci na niezmienny obiekt bytes (do zapisu w pamięci podręcznej)
+
+        Returns:
+            bytes: Zawartość pliku
+        """
+        self._buffer = bytes(self._buffer)
+        return self._buffer
+
+    def relocate(self, path):
+        """Wskazuje nowe położenie pliku przeniesionego do pamięci podręcznej (nie jest już usuwany przy close)"""
+        self.path = path
+        self._owns_path = False
+
+    def view(self):
+        """
+        Zwraca zawartość pliku bez kopiowania
+
+        Returns:
+            memoryview: Widok bufora w pamięci lub mapowania pliku (tylko do odczytu)
+        """
+        if self._view is None:
+            if self.path is None:
+                self._view = memoryview(self._buffer).toreadonly()
+            elif self.size == 0:
+                self._view = memoryview(b"")
+            else:
+                with open(self.path, 'rb') as file:
+                    self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._mmap)
+        return self._view
+
+    def iter_chunks(self, chunk_size=DOWNLOAD_CHUNK_SIZE):
+        """Zwraca kolejne fragmenty zawartości (widoki, bez kopiowania)"""
+        view = self.view()
+        for start in range(0, self.size, chunk_size):
+            yield view[start:start + chunk_size]
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        """Zwalnia bufor i mapowanie oraz usuwa plik tymczasowy"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._view is not None:
+            try:
+                self._view.release()
+                if self._mmap is not None:
+                    self._mmap.close()
+            except BufferError:
+                # Ktoś wciąż używa fragmentu widoku - mapowanie zwolni GC
+                logger.debug("Mapowanie pobranego pliku jest nadal używane")
+            self._view = None
+            self._mmap = None
+        self._buffer = b""
+        if self._owns_path and self.path:
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                logger.warning(f"Nie udało się usunąć pliku tymczasowego {self.path}: {e}")
+        self.path = None
+
+class _Download:
+    __slots__ = ("task", "users")
+
+    def __init__(self, task):
+        self.task = task
+        self.users = 0
+
+class DownloadManager:
+    """
+    Menedżer pobierania plików z Telegrama.
+
+    Równoczesne pobrania tego samego pliku (ten sam file_unique_id) są łączone
+    w jedno. Pobrane pliki trafiają do pamięci podręcznej file_cache, więc
+    kolejne akcje na tym samym pliku pomijają get_file i pobieranie. Plik
+    tymczasowy spoza pamięci podręcznej jest usuwany, gdy ostatni korzystający
+    z niego handler wyjdzie z bloku open().
+    """
+
+    def __init__(self, chunk_size=DOWNLOAD_CHUNK_SIZE, timeout=DOWNLOAD_TIMEOUT):
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self._downloads = {}    # file_unique_id (lub file_id) -> _Download
+        self._http = None
+        self._stats = {"cache_hits": 0, "downloads": 0, "deduplicated": 0, "spooled_to_disk": 0, "bytes": 0, "too_large": 0, "failed": 0}
+
+    def _client(self):
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout, connect=10.0))
+        return self._http
+
+    async def _stream(self, url, downloaded):
+        async with self._client().stream("GET", url) as response:
+            response.raise_for_status()
+            length = int(response.headers.get("content-length") or 0)
+            if length > downloaded.max_bytes:
+                raise DownloadTooLargeError(f"Plik ma {length} B (limit {downloaded.max_bytes} B)")
+            async for chunk in response.aiter_bytes(self.chunk_size):
+                downloaded.write(chunk)
+
+    def _from_cache(self, file_unique_id, max_bytes):
+        cached = file_cache.get(file_unique_id)
+        if cached is None:
+            return None
+        if isinstance(cached, bytes):
+            downloaded = DownloadedFile.from_bytes(cached)
+        else:
+            downloaded = DownloadedFile.from_path(cached, max_bytes)
+            # Mapowanie otwarte od razu pozostaje ważne, nawet jeśli plik zostanie usunięty z pamięci podręcznej
+            downloaded.view()
+        self._stats["cache_hits"] += 1
+        return downloaded
+
+    def _remember(self, file_unique_id, downloaded):
+        if downloaded.path is None:
+            file_cache.put_bytes(file_unique_id, downloaded.freeze())
+        else:
+            path = file_cache.put_file(file_unique_id, downloaded.path, downloaded.size)
+            if path:
+                downloaded.relocate(path)
+
+    async def _download(self, bot, file_id, file_unique_id, max_bytes):
+        if file_unique_id:
+            try:
+                downloaded = self._from_cache(file_unique_id, max_bytes)
+            except OSError as e:
+                logger.warning(f"Nie udało się odczytać pliku {file_unique_id} z pamięci podręcznej: {e}")
+                downloaded = None
+            if downloaded is not None:
+                return downloaded
+
+        file = await bot.get_file(file_id)
+        if file.file_size and file.file_size > max_bytes:
+            raise DownloadTooLargeError(f"Plik ma {file.file_size} B (limit {max_bytes} B)")
+
+        file_path = file.file_path or ""
+        if file_path and not file_path.startswith(("http://", "https://")) and os.path.exists(file_path):
+            # Lokalny serwer Bot API - plik już jest na dysku
+            return DownloadedFile.from_path(file_path, max_bytes)
+
+        downloaded = DownloadedFile(max_bytes=max_bytes)
+        try:
+            if file_path.startswith(("http://", "https://")):
+                await self._stream(file_path, downloaded)
+            else:
+                await file.download_to_memory(out=downloaded)
+            downloaded.finish()
+        except BaseException:
+            downloaded.close()
+            raise
+
+        self._stats["downloads"] += 1
+        self._stats["bytes"] += downloaded.size
+        if downloaded.path:
+            self._stats["spooled_to_disk"] += 1
+        if file_unique_id:
+            self._remember(file_unique_id, downloaded)
+        return downloaded
+
+    @asynccontextmanager
+    async def open(self, bot, file_id, file_unique_id=None, max_bytes=DOWNLOAD_MAX_BYTES):
+        """
+        Pobiera plik (lub dołącza do trwającego pobierania) na czas bloku async with
+
+        Args:
+            bot: Obiekt bota
+            file_id (str): ID pliku w Telegramie
+            file_unique_id (str, optional): Stały identyfikator pliku (klucz łączenia pobrań)
+            max_bytes (int, optional): Maksymalny rozmiar pliku
+
+        Yields:
+            DownloadedFile: Pobrany plik; view() zwraca jego zawartość bez kopiowania
+
+        Raises:
+            DownloadTooLargeError: Gdy plik przekracza max_bytes
+        """
+        key = file_unique_id or file_id
+        download = self._downloads.get(key)
+        if download is None:
+            download = _Download(asyncio.ensure_future(self._download(bot, file_id, file_unique_id, max_bytes)))
+            self._downloads[key] = download
+        else:
+            self._stats["deduplicated"] += 1
+        download.users += 1
+
+        try:
+            try:
+                downloaded = await asyncio.shield(download.task)
+            except DownloadTooLargeError:
+                self._stats["too_large"] += 1
+                raise
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._stats["failed"] += 1
+                raise
+            yield downloaded
+        finally:
+            download.users -= 1
+            if download.users == 0:
+                if self._downloads.get(key) is download:
+                    del self._downloads[key]
+                if not download.task.done():
+                    download.task.cancel()
+                elif not download.task.cancelled() and download.task.exception() is None:
+                    download.task.result().close()
+
+    def get_stats(self):
+        """
+        Zwraca statystyki pobierania
+
+        Returns:
+            dict: Liczba trafień w pamięci podręcznej, pobrań, połączonych pobrań, plików zapisanych na dysku,
+                  pobranych bajtów, odrzuconych i nieudanych pobrań oraz trwających pobrań
+        """
+        stats = dict(self._stats)
+        stats["in_progress"] = len(self._downloads)
+        return stats
+
+    async def close(self):
+        """Zamyka połączenia HTTP (przy zatrzymaniu bota)"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+# Współdzielony menedżer pobierania
+download_manager = DownloadManager()
@@ -0,0 +1,284 @@
+"""
+Moduł planujący edycje wiadomości strumieniowanych przez bota.
+Wszystkie edycje przechodzą przez jeden obiekt, który łączy oczekujące
+aktualizacje tej samej wiadomości i pilnuje limitów Telegrama.
+"""
+import time
+import asyncio
+import logging
+from telegram.error import RetryAfter, BadRequest, NetworkError
+from config import (
+    EDIT_SCHEDULER_CHAT_INTERVAL, EDIT_SCHEDULER_MAX_INTERVAL,
+    EDIT_SCHEDULER_GLOBAL_RATE, EDIT_SCHEDULER_FINAL_ATTEMPTS
+)
+
+logger = logging.getLogger(__name__)
+
+def _retry_after_seconds(error):
+    """Zwraca czas oczekiwania z błędu RetryAfter w sekundach"""
+    retry_after = error.retry_after
+    if hasattr(retry_after, 'total_seconds'):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+class EditScheduler:
+    """
+    Planista edycji wiadomości.
+
+    Handlery publikują aktualny tekst wiadomości metodą publish(), a planista
+    wysyła tylko najnowszy tekst każdej wiadomości, z zachowaniem odstępu
+    między edycjami w jednym czacie i globalnego limitu edycji na sekundę.
+    Odstęp dla czatu rośnie po błędach RetryAfter i maleje po udanych edycjach.
+    """
+
+    def __init__(self, chat_interval=EDIT_SCHEDULER_CHAT_INTERVAL,
+                 max_interval=EDIT_SCHEDULER_MAX_INTERVAL,
+                 global_rate=EDIT_SCHEDULER_GLOBAL_RATE):
+        self.base_interval = chat_interval
+        self.max_interval = max_interval
+        self.global_rate = global_rate
+
+        self._pending = {}       # (chat_id, message_id) -> (message, text, parse_mode)
+        self._in_flight = {}     # (chat_id, message_id) -> asyncio.Task
+        self._finalizing = set()
+        self._last_sent = {}     # (chat_id, message_id) -> (text, parse_mode)
+        self._chats = {}         # chat_id -> {"next": czas, "interval": odstęp}
+
+        # Globalny kubełek żetonów
+        self._tokens = float(global_rate)
+        self._refilled_at = time.monotonic()
+
+        self._wakeup = None
+        self._worker = None
+        self._stats = {
+            "published": 0,
+            "coalesced": 0,
+            "sent": 0,
+            "failed": 0,
+            "retry_after": 0,
+            "finalized": 0
+        }
+
+    def _chat(self, chat_id):
+        """Zwraca stan limitu dla czatu"""
+        state = self._chats.get(chat_id)
+        if state is None:
+            state = self._chats[chat_id] = {"next": 0.0, "interval": self.base_interval}
+        return state
+
+    def _take_token(self):
+        """
+        Pobiera żeton z globalnego kubełka
+
+        Returns:
+            float: 0, jeśli żeton został pobrany, w przeciwnym razie czas oczekiwania na żeton
+        """
+        now = time.monotonic()
+        self._tokens = min(self.global_rate, self._tokens + (now - self._refilled_at) * self.global_rate)
+        self._refilled_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.global_rate
+
+    def _on_retry_after(self, state, error):
+        """Zwiększa odstęp między edycjami w czacie po błędzie RetryAfter"""
+        retry_after = _retry_after_seconds(error)
+        state["interval"] = min(self.max_interval, max(state["interval"] * 2, retry_after))
+        state["next"] = time.monotonic() + retry_after
+        self._stats["retry_after"] += 1
+        logger.warning(f"RetryAfter {retry_after}s, nowy odstęp edycji: {state['interval']:.1f}s")
+
+    def _ensure_worker(self):
+        """Uruchamia zadanie wysyłające edycje, jeśli jeszcze nie działa"""
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    def publish(self, message, text, parse_mode=None):
+        """
+        Publikuje aktualny tekst wiadomości. Jeśli poprzedni tekst nie został
+        jeszcze wysłany, zostaje zastąpiony nowym.
+
+        Args:
+            message: Wiadomość Telegram do edycji
+            text (str | callable): Nowy tekst wiadomości lub funkcja zwracająca
+                go - wywoływana dopiero przy wysyłce edycji
+            parse_mode (str, optional): Tryb formatowania
+        """
+        key = (message.chat_id, message.message_id)
+        if key in self._finalizing:
+            return
+
+        self._stats["published"] += 1
+        if key in self._pending:
+            self._stats["coalesced"] += 1
+        elif not callable(text) and self._last_sent.get(key) == (text, parse_mode):
+            return
+
+        self._pending[key] = (message, text, parse_mode)
+        self._ensure_worker()
+        self._wakeup.set()
+
+    async def _run(self):
+        """Pętla wysyłająca oczekujące edycje w kolejności ich zgłoszenia"""
+        while True:
+            now = time.monotonic()
+            ready = None
+            delay = None
+            for key in self._pending:
+                if key in self._in_flight:
+                    continue
+                wait = self._chat(key[0])["next"] - now
+                if wait <= 0:
+                    ready = key
+                    break
+                delay = wait if delay is None else min(delay, wait)
+
+            if ready is None:
+                self._wakeup.clear()
+                if not self._pending and not self._in_flight:
+                    self._prune(now)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            token_wait = self._take_token()
+            if token_wait:
+                await asyncio.sleep(token_wait)
+                continue
+
+            message, text, parse_mode = self._pending.pop(ready)
+            if callable(text):
+                text = text()
+                if self._last_sent.get(ready) == (text, parse_mode):
+                    continue
+            state = self._chat(ready[0])
+            state["next"] = now + state["interval"]
+            self._in_flight[ready] = asyncio.create_task(self._send(ready, message, text, parse_mode))
+
+    async def _send(self, key, message, text, parse_mode):
+        """Wysyła pojedynczą edycję pośrednią"""
+        state = self._chat(key[0])
+        try:
+            await message.edit_text(text, parse_mode=parse_mode)
+            self._last_sent[key] = (text, parse_mode)
+            self._stats["sent"] += 1
+            # Udane edycje stopniowo przywracają bazowy odstęp
+            state["interval"] = max(self.base_interval, state["interval"] * 0.9)
+        except RetryAfter as e:
+            self._on_retry_after(state, e)
+            # Niewysłany tekst wraca do kolejki, chyba że został już zastąpiony nowszym
+            if key not in self._finalizing:
+                self._pending.setdefault(key, (message, text, parse_mode))
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                self._last_sent[key] = (text, parse_mode)
+            else:
+                self._stats["failed"] += 1
+                logger.debug(f"Nieudana edycja pośrednia wiadomości {key}: {e}")
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.warning(f"Błąd przy edycji wiadomości {key}: {e}")
+        finally:
+            self._in_flight.pop(key, None)
+            if self._wakeup:
+                self._wakeup.set()
+
+    def _prune(self, now):
+        """Usuwa stan czatów, które od dawna nie mają edycji i mają bazowy odstęp"""
+        for chat_id in [chat_id for chat_id, state in self._chats.items()
+                        if state["interval"] <= self.base_interval and now - state["next"] > 60]:
+            del self._chats[chat_id]
+
+    async def finalize(self, message, text, parse_mode=None, fallback_text=None):
+        """
+        Wysyła końcową wersję wiadomości. Oczekujące edycje pośrednie są porzucane,
+        a edycja końcowa jest ponawiana po błędach RetryAfter i błędach sieci.
+
+        Args:
+            message: Wiadomość Telegram do edycji
+            text (str): Końcowy tekst wiadomości
+            parse_mode (str, optional): Tryb formatowania
+            fallback_text (str, optional): Tekst wysyłany bez formatowania,
+                jeśli Telegram nie przyjmie sformatowanej wersji
+
+        Returns:
+            bool: True, jeśli końcowy tekst został zapisany w wiadomości
+        """
+        key = (message.chat_id, message.message_id)
+        self._finalizing.add(key)
+        self._pending.pop(key, None)
+        try:
+            in_flight = self._in_flight.get(key)
+            if in_flight:
+                await asyncio.gather(in_flight, return_exceptions=True)
+
+            state = self._chat(key[0])
+            for attempt in range(EDIT_SCHEDULER_FINAL_ATTEMPTS):
+                delay = state["next"] - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                token_wait = self._take_token()
+                while token_wait:
+                    await asyncio.sleep(token_wait)
+                    token_wait = self._take_token()
+                state["next"] = time.monotonic() + state["interval"]
+
+                try:
+                    await message.edit_text(text, parse_mode=parse_mode)
+                    self._stats["finalized"] += 1
+                    return True
+                except RetryAfter as e:
+                    self._on_retry_after(state, e)
+                except BadRequest as e:
+                    if "not modified" in str(e).lower():
+                        self._stats["finalized"] += 1
+                        return True
+                    if parse_mode is None:
+                        logger.error(f"Nie udało się wysłać końcowej wersji wiadomości {key}: {e}")
+                        break
+                    # Telegram nie przyjął formatowania - wysyłamy zwykły tekst
+                    text = fallback_text if fallback_text is not None else text
+                    parse_mode = None
+                except NetworkError as e:
+                    logger.warning(f"Błąd sieci przy końcowej edycji wiadomości {key}: {e}")
+                    state["next"] = time.monotonic() + state["interval"] * (attempt + 1)
+
+            self._stats["failed"] += 1
+            return False
+        finally:
+            self._finalizing.discard(key)
+            self._last_sent.pop(key, None)
+
+    async def discard(self, message):
+        """
+        Porzuca oczekujące edycje wiadomości (np. przed jej usunięciem)
+
+        Args:
+            message: Wiadomość Telegram
+        """
+        key = (message.chat_id, message.message_id)
+        self._pending.pop(key, None)
+        in_flight = self._in_flight.get(key)
+        if in_flight:
+            await asyncio.gather(in_flight, return_exceptions=True)
+        self._last_sent.pop(key, None)
+
+    def get_stats(self):
+        """
+        Zwraca statystyki planisty edycji
+
+        Returns:
+            dict: Liczniki edycji oraz liczba oczekujących wiadomości
+        """
+        stats = dict(self._stats)
+        stats["pending"] = len(self._pending)
+        stats["in_flight"] = len(self._in_flight)
+        stats["tracked_chats"] = len(self._chats)
+        return stats
+
+# Współdzielony planista edycji dla całego procesu
+edit_scheduler = EditScheduler()
@@ -0,0 +1,170 @@
+"""
+Moduł pamięci podręcznej plików pobranych z Telegrama (klucz: file_unique_id).
+Małe pliki są trzymane w pamięci, większe w katalogu na dysku. Obie części
+mają limit rozmiaru (usuwane są najdawniej używane pliki) i czas ważności,
+dzięki czemu ponowne akcje na niedawno przesłanych plikach (tłumaczenie po
+analizie, /translate w odpowiedzi) nie pobierają ich ponownie.
+"""
+import os
+import time
+import shutil
+import logging
+import tempfile
+from collections import OrderedDict
+from config import (
+    FILE_CACHE_MEMORY_MAX_BYTES, FILE_CACHE_DISK_MAX_BYTES, FILE_CACHE_TTL,
+    FILE_CACHE_DIR, DOWNLOAD_SPOOL_MAX_MEMORY
+)
+
+logger = logging.getLogger(__name__)
+
+class FileCache:
+    """
+    Pamięć podręczna LRU zawartości plików z limitem rozmiaru i czasem ważności.
+
+    Pliki nie większe niż memory_item_max_bytes trafiają do pamięci, większe są
+    przenoszone (bez kopiowania) do katalogu pamięci podręcznej na dysku.
+    Przy pierwszym użyciu tworzony jest prywatny katalog procesu wewnątrz
+    katalogu nadrzędnego (indeks plików nie przetrwa restartu), a close()
+    usuwa tylko ten katalog - katalog nadrzędny nigdy nie jest usuwany.
+    """
+
+    def __init__(self, memory_max_bytes=FILE_CACHE_MEMORY_MAX_BYTES, disk_max_bytes=FILE_CACHE_DISK_MAX_BYTES,
+                 ttl=FILE_CACHE_TTL, directory=FILE_CACHE_DIR, memory_item_max_bytes=DOWNLOAD_SPOOL_MAX_MEMORY):
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.ttl = ttl
+        self.base_directory = directory or tempfile.gettempdir()
+        self.directory = None
+        self.memory_item_max_bytes = memory_item_max_bytes
+        self._memory = OrderedDict()   # file_unique_id -> (bytes, czas zapisu)
+        self._disk = OrderedDict()     # file_unique_id -> (ścieżka, rozmiar, czas zapisu)
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stored": 0, "evicted": 0, "expired": 0}
+
+    def _prepare_directory(self):
+        if self.directory:
+            return
+        os.makedirs(self.base_directory, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix="bot_file_cache_", dir=self.base_directory)
+
+    def _drop_memory(self, key):
+        data, _ = self._memory.pop(key)
+        self._memory_bytes -= len(data)
+
+    def _drop_disk(self, key):
+        path, size, _ = self._disk.pop(key)
+        self._disk_bytes -= size
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Nie udało się usunąć pliku z pamięci podręcznej {path}: {e}")
+
+    def _expire(self):
+        """Usuwa wpisy starsze niż ttl (najstarsze są na początku)"""
+        deadline = time.monotonic() - self.ttl
+        for entries, drop, stored_at_index in ((self._memory, self._drop_memory, 1), (self._disk, self._drop_disk, 2)):
+            expired = [key for key, entry in entries.items() if entry[stored_at_index] < deadline]
+            for key in expired:
+                drop(key)
+            self._stats["expired"] += len(expired)
+
+    def get(self, key):
+        """
+        Zwraca zawartość pliku z pamięci podręcznej
+
+        Args:
+            key (str): file_unique_id
+
+        Returns:
+            bytes | str | None: Zawartość pliku (z pamięci), ścieżka do pliku (z dysku)
+                lub None, jeśli pliku nie ma lub stracił ważność
+        """
+        self._expire()
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return self._memory[key][0]
+        if key in self._disk:
+            self._disk.move_to_end(key)
+            self._stats["disk_hits"] += 1
+            return self._disk[key][0]
+        self._stats["misses"] += 1
+        return None
+
+    def put_bytes(self, key, data):
+        """
+        Zapisuje zawartość małego pliku w pamięci
+
+        Args:
+            key (str): file_unique_id
+            data (bytes): Zawartość pliku
+        """
+        if len(data) > self.memory_item_max_bytes or len(data) > self.memory_max_bytes:
+            return
+        if key in self._memory:
+            self._drop_memory(key)
+        self._memory[key] = (data, time.monotonic())
+        self._memory_bytes += len(data)
+        self._stats["stored"] += 1
+        while self._memory_bytes > self.memory_max_bytes:
+            self._drop_memory(next(iter(self._memory)))
+            self._stats["evicted"] += 1
+
+    def put_file(self, key, path, size):
+        """
+        Przenosi pobrany plik tymczasowy do katalogu pamięci podręcznej
+
+        Args:
+            key (str): file_unique_id
+            path (str): Ścieżka pliku tymczasowego (plik zostaje przeniesiony)
+            size (int): Rozmiar pliku w bajtach
+
+        Returns:
+            str | None: Nowa ścieżka pliku lub None, jeśli plik nie został zapisany
+        """
+        if size > self.disk_max_bytes:
+            return None
+        try:
+            self._prepare_directory()
+            target = os.path.join(self.directory, key)
+            if key in self._disk:
+                self._drop_disk(key)
+            os.replace(path, target)
+        except OSError as e:
+            logger.warning(f"Nie udało się zapisać pliku {key} w pamięci podręcznej: {e}")
+            return None
+        self._disk[key] = (target, size, time.monotonic())
+        self._disk_bytes += size
+        self._stats["stored"] += 1
+        while self._disk_bytes > self.disk_max_bytes:
+            self._drop_disk(next(iter(self._disk)))
+            self._stats["evicted"] += 1
+        return target
+
+    def close(self):
+        """Usuwa pliki z dysku i prywatny katalog pamięci podręcznej (wywoływane przy zamykaniu bota)"""
+        self._disk.clear()
+        self._disk_bytes = 0
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+
+    def get_stats(self):
+        """
+        Zwraca statystyki pamięci podręcznej
+
+        Returns:
+            dict: Liczba i rozmiar plików w pamięci i na dysku oraz liczniki trafień,
+                  chybień, zapisów, usunięć i wygaśnięć
+        """
+        stats = dict(self._stats)
+        stats["memory_files"] = len(self._memory)
+        stats["memory_bytes"] = self._memory_bytes
+        stats["disk_files"] = len(self._disk)
+        stats["disk_bytes"] = self._disk_bytes
+        return stats
+
+# Współdzielona pamięć podręczna plików
+file_cache = FileCache()
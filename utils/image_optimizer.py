@@ -0,0 +1,183 @@
+"""
+Moduł przygotowujący zdjęcia do wysłania do modelu wizyjnego OpenAI
+"""
+import io
+import asyncio
+import logging
+import imghdr
+from PIL import Image, ImageOps
+from config import (
+    VISION_MAX_LONG_SIDE, VISION_MAX_SHORT_SIDE, VISION_LOW_DETAIL_SIDE,
+    VISION_JPEG_QUALITY, VISION_DETAIL
+)
+
+logger = logging.getLogger(__name__)
+
+# Formaty akceptowane przez API OpenAI bez konwersji
+SUPPORTED_MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+    "GIF": "image/gif"
+}
+
+# Statystyki optymalizacji od uruchomienia procesu
+_optimizer_stats = {
+    "images": 0,
+    "bytes_before": 0,
+    "bytes_after": 0
+}
+
+def sniff_image_mime_type(image_content):
+    """
+    Rozpoznaje rzeczywisty typ obrazu na podstawie nagłówka pliku
+
+    Args:
+        image_content (bytes): Zawartość obrazu
+
+    Returns:
+        str: Typ MIME obrazu (domyślnie image/jpeg)
+    """
+    image_type = imghdr.what(None, h=bytes(image_content[:32]))
+    if image_type and image_type.upper() in SUPPORTED_MIME_TYPES:
+        return SUPPORTED_MIME_TYPES[image_type.upper()]
+    return "image/jpeg"
+
+def _target_size(width, height, max_long_side, max_short_side):
+    """Oblicza wymiary obrazu mieszczące się w efektywnej rozdzielczości modelu"""
+    long_side, short_side = max(width, height), min(width, height)
+    scale = min(1.0, max_long_side / long_side, max_short_side / short_side)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+def _has_transparency(image):
+    """Sprawdza, czy obraz ma kanał przezroczystości"""
+    if image.mode in ("RGBA", "LA"):
+        return True
+    return image.mode == "P" and "transparency" in image.info
+
+def optimize_image_for_vision(image_content, mode="analyze"):
+    """
+    Zmniejsza i ponownie koduje obraz przed wysłaniem do modelu wizyjnego.
+    Funkcja jest synchroniczna i powinna być wywoływana w osobnym wątku.
+
+    Args:
+        image_content (bytes): Zawartość obrazu
+        mode (str): Tryb analizy: "analyze" lub "translate"
+
+    Returns:
+        dict: Słownik z danymi obrazu (data, mime_type, detail, width, height,
+              bytes_before, bytes_after)
+    """
+    original = bytes(image_content)
+    detail = VISION_DETAIL.get(mode, "auto")
+
+    try:
+        image = Image.open(io.BytesIO(original))
+        original_format = image.format
+        has_metadata = "exif" in image.info or "icc_profile" in image.info
+        is_animated = getattr(image, "is_animated", False)
+
+        # Limity rozdzielczości zależą od poziomu szczegółowości
+        if detail == "low":
+            limits = (VISION_LOW_DETAIL_SIDE, VISION_LOW_DETAIL_SIDE)
+        else:
+            limits = (VISION_MAX_LONG_SIDE, VISION_MAX_SHORT_SIDE)
+
+        # JPEG może zostać zdekodowany od razu w mniejszej skali
+        if original_format == "JPEG":
+            image.draft("RGB", _target_size(image.width, image.height, *limits))
+
+        # Uwzględnij orientację z EXIF, zanim metadane zostaną usunięte
+        image = ImageOps.exif_transpose(image)
+        target = _target_size(image.width, image.height, *limits)
+        resized = target != image.size
+        if resized:
+            image = image.resize(target, Image.Resampling.LANCZOS)
+
+        # Małe obrazy nie zyskują nic na trybie "high", a kosztują więcej tokenów
+        if detail == "auto":
+            fits_low = max(image.size) <= VISION_LOW_DETAIL_SIDE
+            detail = "low" if fits_low else "high"
+
+        # Ponowne kodowanie bez metadanych
+        buffer = io.BytesIO()
+        if _has_transparency(image):
+            image.convert("RGBA").save(buffer, format="PNG", optimize=True)
+            mime_type = "image/png"
+        else:
+            quality = VISION_JPEG_QUALITY.get(mode, VISION_JPEG_QUALITY["analyze"])
+            image.convert("RGB").save(buffer, format="JPEG", quality=quality, optimize=True)
+            mime_type = "image/jpeg"
+        optimized = buffer.getvalue()
+
+        # Zostaw oryginał, jeśli jest mniejszy, nie wymagał zmiany rozmiaru
+        # i nie zawiera metadanych do usunięcia
+        keep_original = (
+            not resized and not has_metadata
+            and original_format in SUPPORTED_MIME_TYPES
+            and not is_animated
+            and len(original) <= len(optimized)
+        )
+        if keep_original:
+            optimized = original
+            mime_type = SUPPORTED_MIME_TYPES[original_format]
+
+        result = {
+            "data": optimized,
+            "mime_type": mime_type,
+            "detail": detail,
+            "width": image.width,
+            "height": image.height,
+            "bytes_before": len(original),
+            "bytes_after": len(optimized)
+        }
+    except Exception as e:
+        # Jeśli Pillow nie potrafi odczytać obrazu, wysyłamy oryginał z poprawnym typem
+        logger.warning(f"Nie udało się zoptymalizować obrazu: {e}")
+        result = {
+            "data": original,
+            "mime_type": sniff_image_mime_type(original),
+            "detail": "high" if detail == "auto" else detail,
+            "width": None,
+            "height": None,
+            "bytes_before": len(original),
+            "bytes_after": len(original)
+        }
+
+    _optimizer_stats["images"] += 1
+    _optimizer_stats["bytes_before"] += result["bytes_before"]
+    _optimizer_stats["bytes_after"] += result["bytes_after"]
+
+    logger.info(
+        f"Optymalizacja obrazu ({mode}): {result['bytes_before']} B -> {result['bytes_after']} B, "
+        f"{result['mime_type']}, detail={result['detail']}"
+    )
+    return result
+
+async def prepare_image_for_vision(image_content, mode="analyze"):
+    """
+    Asynchroniczna otoczka na optimize_image_for_vision uruchamiająca
+    przetwarzanie w wątku roboczym, aby nie blokować pętli zdarzeń
+
+    Args:
+        image_content (bytes): Zawartość obrazu
+        mode (str): Tryb analizy: "analyze" lub "translate"
+
+    Returns:
+        dict: Wynik optimize_image_for_vision
+    """
+    return await asyncio.to_thread(optimize_image_for_vision, image_content, mode)
+
+def get_image_optimizer_stats():
+    """
+    Zwraca zbiorcze statystyki optymalizacji obrazów
+
+    Returns:
+        dict: Liczba obrazów oraz suma bajtów przed i po optymalizacji
+    """
+    stats = dict(_optimizer_stats)
+    if stats["bytes_before"]:
+        stats["saved_percent"] = round(100 * (1 - stats["bytes_after"] / stats["bytes_before"]), 1)
+    else:
+        stats["saved_percent"] = 0.0
+    return stats
@@ -0,0 +1,196 @@
+"""
+Moduł rejestru statycznych obrazów bota (bannery, ilustracje onboardingu).
+Każdy obraz jest przesyłany do Telegrama raz, a zwrócony file_id jest zapisywany
+w SQLite i używany przy kolejnych wysyłkach i edycjach zamiast adresu URL.
+"""
+import os
+import sqlite3
+import logging
+import datetime
+import pytz
+from telegram import InputMediaPhoto
+from telegram.error import BadRequest
+from database.sqlite_client import DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# Fragmenty opisów błędów BadRequest oznaczających nieważny file_id
+FILE_ID_ERRORS = ("wrong file identifier", "file_id", "wrong remote file")
+
+def is_file_id_error(error):
+    """Sprawdza, czy Telegram odrzucił żądanie z powodu nieważnego file_id"""
+    message = str(error).lower()
+    return any(fragment in message for fragment in FILE_ID_ERRORS)
+
+class MediaRegistry:
+    """
+    Rejestr źródło obrazu (URL lub ścieżka do pliku) -> file_id Telegrama.
+
+    Przy pierwszym użyciu obraz jest wysyłany ze źródła (Telegram pobiera URL
+    lub otrzymuje plik), a file_id z odpowiedzi jest zapamiętywany. Jeśli
+    Telegram odrzuci zapisany file_id, wpis jest usuwany i obraz zostaje
+    wysłany ponownie ze źródła.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._file_ids = None   # źródło -> file_id, wczytywane z bazy przy pierwszym użyciu
+        self._stats = {"cached": 0, "uploaded": 0, "invalidated": 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS media_file_ids (
+            source TEXT PRIMARY KEY,
+            file_id TEXT NOT NULL,
+            file_unique_id TEXT,
+            updated_at TEXT
+        )
+        ''')
+        return conn
+
+    def _load(self):
+        if self._file_ids is not None:
+            return self._file_ids
+        self._file_ids = {}
+        try:
+            conn = self._connect()
+            self._file_ids = dict(conn.execute("SELECT source, file_id FROM media_file_ids").fetchall())
+            conn.close()
+        except Exception as e:
+            logger.error(f"Błąd wczytywania rejestru obrazów: {e}")
+        return self._file_ids
+
+    def get(self, source):
+        """
+        Zwraca zapisany file_id obrazu
+
+        Args:
+            source (str): URL lub ścieżka do pliku
+
+        Returns:
+            str | None: file_id lub None, jeśli obraz nie był jeszcze przesłany
+        """
+        return self._load().get(source)
+
+    def remember(self, source, message):
+        """
+        Zapisuje file_id obrazu z wiadomości zwróconej przez Telegram
+
+        Args:
+            source (str): URL lub ścieżka do pliku
+            message: Wiadomość ze zdjęciem
+        """
+        if not message or not getattr(message, 'photo', None):
+            return
+        photo = message.photo[-1]   # Największy rozmiar
+        self._load()[source] = photo.file_id
+        self._stats["uploaded"] += 1
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO media_file_ids (source, file_id, file_unique_id, updated_at) VALUES (?, ?, ?, ?)",
+                (source, photo.file_id, photo.file_unique_id, datetime.datetime.now(pytz.UTC).isoformat())
+            )
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Błąd zapisu file_id obrazu {source}: {e}")
+
+    def forget(self, source):
+        """Usuwa file_id odrzucony przez Telegram"""
+        self._load().pop(source, None)
+        self._stats["invalidated"] += 1
+        try:
+            conn = self._connect()
+            conn.execute("DELETE FROM media_file_ids WHERE source = ?", (source,))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Błąd usuwania file_id obrazu {source}: {e}")
+
+    def _media(self, source):
+        """Zwraca (wartość do wysłania, czy_to_file_id)"""
+        file_id = self.get(source)
+        if file_id:
+            self._stats["cached"] += 1
+            return file_id, True
+        if os.path.exists(source):
+            return open(source, 'rb'), False
+        return source, False
+
+    async def send_photo(self, bot, chat_id, source, **kwargs):
+        """
+        Wysyła statyczny obraz, używając zapisanego file_id, jeśli istnieje
+
+        Args:
+            bot: Obiekt bota
+            chat_id (int): ID czatu
+            source (str): URL lub ścieżka do pliku
+            **kwargs: Pozostałe argumenty send_photo (caption, reply_markup, parse_mode...)
+
+        Returns:
+            Message: Wysłana wiadomość
+        """
+        photo, cached = self._media(source)
+        try:
+            message = await bot.send_photo(chat_id=chat_id, photo=photo, **kwargs)
+        except BadRequest as e:
+            if not cached or not is_file_id_error(e):
+                raise
+            logger.warning(f"Telegram odrzucił zapisany file_id obrazu {source}: {e}")
+            self.forget(source)
+            return await self.send_photo(bot, chat_id, source, **kwargs)
+        finally:
+            if hasattr(photo, 'close'):
+                photo.close()
+        if not cached:
+            self.remember(source, message)
+        return message
+
+    async def edit_photo(self, message, source, caption=None, reply_markup=None, parse_mode=None):
+        """
+        Zamienia zdjęcie i podpis istniejącej wiadomości (edit_message_media)
+
+        Args:
+            message: Wiadomość bota ze zdjęciem
+            source (str): URL lub ścieżka do pliku nowego obrazu
+            caption (str, optional): Nowy podpis
+            reply_markup (optional): Nowa klawiatura
+            parse_mode (optional): Tryb formatowania podpisu
+
+        Returns:
+            Message: Zaktualizowana wiadomość
+        """
+        media, cached = self._media(source)
+        try:
+            edited = await message.edit_media(
+                media=InputMediaPhoto(media=media, caption=caption, parse_mode=parse_mode),
+                reply_markup=reply_markup
+            )
+        except BadRequest as e:
+            if not cached or not is_file_id_error(e):
+                raise
+            logger.warning(f"Telegram odrzucił zapisany file_id obrazu {source}: {e}")
+            self.forget(source)
+            return await self.edit_photo(message, source, caption, reply_markup, parse_mode)
+        finally:
+            if hasattr(media, 'close'):
+                media.close()
+        if not cached and edited is not True:
+            self.remember(source, edited)
+        return edited
+
+    def get_stats(self):
+        """
+        Zwraca statystyki rejestru
+
+        Returns:
+            dict: Liczba zapisanych obrazów, użyć zapisanego file_id, przesłań i odrzuconych file_id
+        """
+        stats = dict(self._stats)
+        stats["assets"] = len(self._load())
+        return stats
+
+# Współdzielony rejestr obrazów
+media_registry = MediaRegistry()
@@ -0,0 +1,85 @@
+"""
+Moduł edycji wiadomości bota z menu i przyciskami.
+Rodzaj wiadomości (zdjęcie z podpisem lub tekst) jest ustalany przed edycją,
+więc od razu wywoływana jest właściwa metoda Bot API - bez nieudanej próby
+edit_message_caption na wiadomości tekstowej.
+"""
+import logging
+from telegram import CallbackQuery
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+# Rodzaje wiadomości menu
+MESSAGE_KIND_MEDIA = "media"   # zdjęcie (lub inne media) z podpisem - edycja przez edit_message_caption
+MESSAGE_KIND_TEXT = "text"     # zwykła wiadomość tekstowa - edycja przez edit_message_text
+
+_edit_stats = {"caption": 0, "text": 0, "not_modified": 0, "failed": 0}
+
+def get_message_kind(message):
+    """
+    Ustala rodzaj wiadomości na podstawie jej zawartości
+
+    Args:
+        message: Wiadomość Telegrama (może być None)
+
+    Returns:
+        str | None: MESSAGE_KIND_MEDIA, MESSAGE_KIND_TEXT lub None, jeśli brak wiadomości
+    """
+    if message is None:
+        return None
+    if message.photo or message.video or message.animation or message.document or message.audio:
+        return MESSAGE_KIND_MEDIA
+    return MESSAGE_KIND_TEXT
+
+async def edit_message(target, text, reply_markup=None, parse_mode=None, kind=None):
+    """
+    Zmienia treść wiadomości metodą właściwą dla jej rodzaju
+
+    Args:
+        target: Obiekt callback_query lub wiadomość bota
+        text (str): Nowa treść (tekst lub podpis)
+        reply_markup (optional): Klawiatura inline
+        parse_mode (optional): Tryb formatowania
+        kind (str, optional): Zapamiętany rodzaj wiadomości; domyślnie ustalany z wiadomości
+
+    Returns:
+        Message | bool: Zaktualizowana wiadomość (lub wynik Bot API)
+
+    Raises:
+        TelegramError: Gdy edycja się nie powiedzie (poza brakiem zmian w treści)
+    """
+    is_query = isinstance(target, CallbackQuery)
+    message = target.message if is_query else target
+    if kind is None:
+        kind = get_message_kind(message) or MESSAGE_KIND_TEXT
+
+    try:
+        if kind == MESSAGE_KIND_MEDIA:
+            edit = target.edit_message_caption if is_query else target.edit_caption
+            result = await edit(caption=text, reply_markup=reply_markup, parse_mode=parse_mode)
+            _edit_stats["caption"] += 1
+        else:
+            edit = target.edit_message_text if is_query else target.edit_text
+            result = await edit(text=text, reply_markup=reply_markup, parse_mode=parse_mode)
+            _edit_stats["text"] += 1
+        return result
+    except BadRequest as e:
+        if "not modified" in str(e).lower():
+            # Treść i klawiatura są już takie same - nie traktujemy tego jako błędu
+            _edit_stats["not_modified"] += 1
+            return message
+        _edit_stats["failed"] += 1
+        raise
+    except Exception:
+        _edit_stats["failed"] += 1
+        raise
+
+def get_edit_stats():
+    """
+    Zwraca statystyki edycji wiadomości
+
+    Returns:
+        dict: Liczba edycji podpisów i tekstów, edycji bez zmian oraz nieudanych edycji
+    """
+    return dict(_edit_stats)
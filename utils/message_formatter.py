@@ -15,7 +15,8 @@ def format_markdown_v2(text):
         str: Sformatowany tekst
     """
     # Znaki, które muszą być poprzedzone znakiem ucieczki w Markdown V2
-    special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
+    # (ukośnik wsteczny jako pierwszy, aby nie podwajać dodanych znaków ucieczki)
+    special_chars = ['\\', '_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
     
     # Dodaj znak ucieczki przed każdym specjalnym znakiem
     for char in special_chars:
@@ -23,35 +24,357 @@ def format_markdown_v2(text):
     
     return text
 
-def truncate_message(message, max_length=4096):
+# Tablice znaków ucieczki dla Markdown V2 (tekst zwykły oraz wnętrze `code` i ```pre```)
+MARKDOWN_V2_ESCAPE = str.maketrans({char: f'\\{char}' for char in '\\_*[]()~`>#+-=|{}.!'})
+MARKDOWN_V2_CODE_ESCAPE = str.maketrans({'\\': '\\\\', '`': '\\`'})
+
+# Znaki, które mogą rozpoczynać formatowanie w tekście generowanym przez model
+STREAM_SPECIAL_CHARS = re.compile(r'[`*~#\n]')
+CODE_LANGUAGE = re.compile(r'^[\w+#.-]{1,32}$')
+BACKTICK_RUN = re.compile(r'`+')
+HASH_RUN = re.compile(r'#+')
+
+# Znaczniki Markdown V2 dla obsługiwanych encji
+ENTITY_MARKERS = {
+    "bold": "*",
+    "heading": "*",
+    "italic": "_",
+    "strike": "~",
+    "code": "`",
+    "pre": "```"
+}
+
+class StreamingMarkdownRenderer:
+    """
+    Przyrostowy konwerter Markdown generowanego przez model (**bold**, *italic*,
+    ~~strike~~, `code`, bloki ```kodu```, nagłówki #) do Markdown V2 Telegrama.
+
+    Każdy fragment tekstu jest przetwarzany tylko raz. Renderer pamięta otwarte
+    encje, a snapshot() zwraca poprawny tekst z domkniętymi encjami, który
+    można wysłać w edycji pośredniej. Znaki, których znaczenia nie da się
+    jeszcze ustalić (np. pojedyncza gwiazdka na końcu fragmentu), są wstrzymywane
+    do nadejścia kolejnego fragmentu.
+    """
+
+    def __init__(self):
+        self._output = []      # Wyrenderowane kawałki Markdown V2
+        self._stack = []       # Otwarte encje: (rodzaj, indeks znacznika otwarcia w _output)
+        self._held = ""        # Wstrzymany koniec ostatniego fragmentu
+        self._size = 0         # Łączna długość kawałków w _output
+        self._line_start = True
+        self._prev_char = "\n"
+
+    def _emit(self, text):
+        if text:
+            self._output.append(text)
+            self._size += len(text)
+
+    def _emit_plain(self, text):
+        """Dodaje zwykły tekst z odpowiednimi znakami ucieczki"""
+        if not text:
+            return
+        self._emit(text.translate(MARKDOWN_V2_ESCAPE))
+        if self._line_start and text.strip(" "):
+            self._line_start = False
+        self._prev_char = text[-1]
+
+    def _is_open(self, kind):
+        return any(entity[0] == kind for entity in self._stack)
+
+    def _open(self, kind, marker=None):
+        self._stack.append((kind, len(self._output)))
+        self._emit(marker or ENTITY_MARKERS[kind])
+
+    def _close(self, kind):
+        """Zamyka encję (i wszystkie encje otwarte wewnątrz niej)"""
+        while self._stack:
+            entity_kind, position = self._stack.pop()
+            if position == len(self._output) - 1:
+                # Pusta encja - usuwamy znacznik otwarcia zamiast tworzyć pustą encję
+                self._size -= len(self._output.pop())
+            else:
+                self._emit(ENTITY_MARKERS[entity_kind])
+            if entity_kind == kind:
+                break
+
+    def _close_inline(self):
+        """Zamyka wszystkie otwarte encje"""
+        if self._stack:
+            self._close(self._stack[0][0])
+
+    def feed(self, chunk):
+        """
+        Przetwarza kolejny fragment tekstu
+
+        Args:
+            chunk (str): Nowy fragment odpowiedzi modelu
+        """
+        text = self._held + chunk
+        self._held = ""
+        i = 0
+        n = len(text)
+
+        while i < n:
+            top = self._stack[-1][0] if self._stack else None
+
+            # Wnętrze bloku kodu - szukamy tylko zamykającego ```
+            if top == "pre":
+                tick = text.find('`', i)
+                if tick == -1:
+                    self._emit(text[i:].translate(MARKDOWN_V2_CODE_ESCAPE))
+                    break
+                self._emit(text[i:tick].translate(MARKDOWN_V2_CODE_ESCAPE))
+                run = BACKTICK_RUN.match(text, tick).end() - tick
+                if tick + run == n and run < 3:
+                    self._held = text[tick:]
+                    break
+                if run >= 3:
+                    self._close("pre")
+                    self._prev_char = '`'
+                    i = tick + 3
+                else:
+                    self._emit(text[tick:tick + run].translate(MARKDOWN_V2_CODE_ESCAPE))
+                    i = tick + run
+                continue
+
+            # Wnętrze kodu w linii - kończy się na ` lub na końcu linii
+            if top == "code":
+                end = min(pos for pos in (text.find('`', i), text.find('\n', i), n) if pos != -1)
+                self._emit(text[i:end].translate(MARKDOWN_V2_CODE_ESCAPE))
+                if end < n:
+                    self._close("code")
+                    self._prev_char = '`'
+                    i = end + 1 if text[end] == '`' else end
+                    continue
+                break
+
+            match = STREAM_SPECIAL_CHARS.search(text, i)
+            if not match:
+                self._emit_plain(text[i:])
+                break
+            self._emit_plain(text[i:match.start()])
+            i = match.start()
+            char = text[i]
+
+            if char == '\n':
+                if self._is_open("heading"):
+                    self._close("heading")
+                self._emit('\n')
+                self._line_start = True
+                self._prev_char = '\n'
+                i += 1
+
+            elif char == '`':
+                run = BACKTICK_RUN.match(text, i).end() - i
+                if i + run == n and run < 3:
+                    self._held = text[i:]
+                    break
+                if run >= 3:
+                    # Nagłówek bloku kodu musi dotrzeć w całości (do końca linii)
+                    newline = text.find('\n', i + run)
+                    if newline == -1:
+                        self._held = text[i:]
+                        break
+                    language = text[i + run:newline].strip()
+                    if not CODE_LANGUAGE.match(language):
+                        language = ""
+                    self._close_inline()
+                    self._open("pre", f"```{language}\n")
+                    self._line_start = True
+                    i = newline + 1
+                elif run == 1:
+                    self._open("code")
+                    i += 1
+                else:
+                    self._emit_plain(text[i:i + run])
+                    i += run
+
+            elif char == '*':
+                run = 2 if text.startswith('**', i) else 1
+                if i + run >= n:
+                    self._held = text[i:]
+                    break
+                # Gwiazdka wewnątrz słowa lub liczby (2*3, x**2) nie otwiera formatowania
+                intraword = self._prev_char.isalnum() and text[i + run].isalnum()
+                if run == 2:
+                    if self._is_open("heading"):
+                        # Nagłówek jest już pogrubiony
+                        pass
+                    elif self._is_open("bold"):
+                        self._close("bold")
+                    elif intraword:
+                        self._emit_plain('**')
+                    else:
+                        self._open("bold")
+                    i += 2
+                elif self._line_start and text[i + 1] == ' ':
+                    # Punkt listy "* element"
+                    self._emit("•")
+                    self._line_start = False
+                    self._prev_char = "•"
+                    i += 1
+                elif self._is_open("italic") and not self._prev_char.isspace():
+                    self._close("italic")
+                    i += 1
+                elif not self._is_open("italic") and not text[i + 1].isspace() and not intraword:
+                    self._open("italic")
+                    i += 1
+                else:
+                    self._emit_plain('*')
+                    i += 1
+
+            elif char == '~':
+                if i + 1 == n:
+                    self._held = text[i:]
+                    break
+                if text[i + 1] == '~':
+                    if self._is_open("strike"):
+                        self._close("strike")
+                    else:
+                        self._open("strike")
+                    i += 2
+                else:
+                    self._emit_plain('~')
+                    i += 1
+
+            elif char == '#':
+                run = HASH_RUN.match(text, i).end() - i
+                if self._line_start and not self._stack and i + run == n:
+                    self._held = text[i:]
+                    break
+                if self._line_start and not self._stack and text[i + run] == ' ':
+                    self._open("heading")
+                    self._line_start = False
+                    i += run + 1
+                else:
+                    self._emit_plain(text[i:i + run])
+                    i += run
+
+    def length(self):
+        """
+        Zwraca długość tekstu snapshot() (górne oszacowanie) bez jego budowania
+
+        Returns:
+            int: Liczba znaków
+        """
+        return self._size + sum(len(ENTITY_MARKERS[kind]) for kind, _ in self._stack)
+
+    def snapshot(self):
+        """
+        Zwraca bieżący tekst w Markdown V2 z domkniętymi wszystkimi encjami
+
+        Returns:
+            str: Poprawny tekst Markdown V2
+        """
+        end = len(self._output)
+        closers = []
+        for kind, position in reversed(self._stack):
+            if position == end - 1:
+                # Encja bez treści - pomijamy jej znacznik otwarcia
+                end = position
+            else:
+                closers.append(ENTITY_MARKERS[kind])
+        return "".join(self._output[:end]) + "".join(closers)
+
+    def finish(self):
+        """
+        Kończy renderowanie - wstrzymane znaki traktuje dosłownie i domyka encje
+
+        Returns:
+            str: Końcowy tekst w Markdown V2
+        """
+        held, self._held = self._held, ""
+        if held:
+            if self._stack and self._stack[-1][0] in ("pre", "code"):
+                if held.startswith("```") and self._stack[-1][0] == "pre":
+                    self._close("pre")
+                else:
+                    self._emit(held.translate(MARKDOWN_V2_CODE_ESCAPE))
+            elif held == "**" and self._is_open("bold"):
+                self._close("bold")
+            elif held == "~~" and self._is_open("strike"):
+                self._close("strike")
+            elif held == "*" and self._is_open("italic") and not self._prev_char.isspace():
+                self._close("italic")
+            else:
+                self._emit_plain(held)
+        return self.snapshot()
+
+def render_markdown_v2(text):
     """
-    Skraca wiadomość do maksymalnej długości dozwolonej przez Telegram
+    Konwertuje pełny tekst Markdown generowany przez model do Markdown V2
     
     Args:
-        message (str): Wiadomość do skrócenia
-        max_length (int, optional): Maksymalna długość wiadomości. Domyślnie 4096.
+        text (str): Tekst do konwersji
     
     Returns:
-        str: Skrócona wiadomość
+        str: Tekst w formacie Markdown V2
     """
-    if len(message) <= max_length:
-        return message
+    renderer = StreamingMarkdownRenderer()
+    renderer.feed(text)
+    return renderer.finish()
+
+def open_code_fence(text):
+    """
+    Sprawdza, czy tekst kończy się wewnątrz bloku kodu ```
     
-    # Skróć wiadomość i dodaj informację o skróceniu
-    truncated_message = message[:max_length - 50]
+    Args:
+        text (str): Tekst w formacie Markdown
     
-    # Spróbuj zakończyć na końcu zdania lub paragrafu
-    sentence_end = max(
-        truncated_message.rfind('.'), 
-        truncated_message.rfind('!'), 
-        truncated_message.rfind('?'),
-        truncated_message.rfind('\n')
-    )
+    Returns:
+        str | None: Język otwartego bloku kodu ("" bez języka) lub None
+    """
+    language = None
+    for line in text.split('\n'):
+        stripped = line.strip()
+        if stripped.startswith('```'):
+            language = stripped[3:].strip() if language is None else None
+    return language
+
+def _find_split_point(text, budget):
+    """Zwraca pozycję podziału tekstu na bezpiecznej granicy (akapit, linia, zdanie, słowo)"""
+    window = text[:budget]
+    for separator in ('\n\n', '\n', '. ', ' '):
+        position = window.rfind(separator)
+        if position > budget // 2:
+            return position + len(separator)
+    return budget
+
+def split_message(message, max_length=4096, measure=len):
+    """
+    Dzieli wiadomość na części mieszczące się w limicie Telegrama.
+    Podział następuje na granicy akapitu, linii, zdania lub słowa,
+    a przecięte bloki kodu są zamykane i otwierane ponownie w kolejnej części.
     
-    if sentence_end > max_length - 150:
-        truncated_message = truncated_message[:sentence_end + 1]
+    Args:
+        message (str): Wiadomość do podzielenia
+        max_length (int, optional): Maksymalna długość części. Domyślnie 4096.
+        measure (callable, optional): Funkcja mierząca długość części po sformatowaniu
     
-    return truncated_message + "\n\n[Wiadomość została skrócona ze względu na limity Telegram...]"
+    Returns:
+        list: Lista części wiadomości
+    """
+    parts = []
+    rest = message
+    while measure(rest) > max_length:
+        budget = min(len(rest), max_length)
+        while True:
+            cut = _find_split_point(rest, budget)
+            head = rest[:cut].rstrip()
+            language = open_code_fence(head)
+            if language is not None:
+                head += "\n```"
+            if measure(head) <= max_length or budget <= 1:
+                break
+            # Znaki ucieczki wydłużyły część - zmniejszamy budżet
+            budget = max(1, int(budget * 0.9))
+        
+        rest = rest[cut:].lstrip('\n')
+        if language is not None:
+            rest = f"```{language}\n{rest}"
+        parts.append(head)
+    parts.append(rest)
+    return parts
 
 def safe_send_message(message):
     """
@@ -61,27 +384,23 @@ def safe_send_message(message):
         message (str): Wiadomość do wysłania
     
     Returns:
-        tuple: (sformatowana_wiadomość, tryb_parsowania)
+        list: Lista krotek (sformatowana_część, tryb_parsowania) do wysłania kolejno
     """
     # Sprawdź, czy wiadomość zawiera znaczniki Markdown
-    has_markdown = bool(re.search(r'[*_`\[]', message))
+    has_markdown = bool(re.search(r'[*_`~#\[]', message))
     
-    # Jeśli wiadomość zawiera znaczniki Markdown, użyj trybu Markdown
+    # Jeśli wiadomość zawiera znaczniki Markdown, przekonwertuj ją do Markdown V2
     if has_markdown:
-        # Sprawdź, czy wiadomość jest poprawna w Markdown V2
         try:
-            # Sprawdź najczęstsze błędy w formatowaniu Markdown
-            if '**' in message or '__' in message:
-                # Konwertuj na format Markdown używany przez Telegram
-                message = message.replace('**', '*').replace('__', '_')
-            
-            return truncate_message(message), ParseMode.MARKDOWN
+            # Dzielimy tekst źródłowy, aby nie przeciąć znaczników Markdown V2
+            parts = split_message(message, measure=lambda part: len(render_markdown_v2(part)))
+            return [(render_markdown_v2(part), ParseMode.MARKDOWN_V2) for part in parts]
         except Exception:
             # W przypadku błędu formatowania, usuń formatowanie
-            return truncate_message(message), None
+            return [(part, None) for part in split_message(message)]
     
     # Jeśli wiadomość nie zawiera formatowania, wyślij jako zwykły tekst
-    return truncate_message(message), None
+    return [(part, None) for part in split_message(message)]
 
 def format_code_block(code, language=""):
     """
@@ -0,0 +1,52 @@
+"""
+Moduł wczytujący w tle ciężkie zależności, które są importowane leniwie
+"""
+import time
+import asyncio
+import logging
+import importlib
+
+logger = logging.getLogger(__name__)
+
+def _create_openai_client():
+    from utils.openai_client import get_client
+    get_client()
+
+# Zależności ładowane przy pierwszym użyciu: nazwa modułu albo (nazwa, funkcja ładująca)
+PRELOAD_MODULES = (
+    ("openai", _create_openai_client),
+    "utils.pdf_generator",
+    "utils.pdf_translator",
+    "utils.document_analyzer",
+    "pandas",
+)
+
+def _load(entry):
+    if isinstance(entry, tuple):
+        entry[1]()
+    else:
+        importlib.import_module(entry)
+
+async def preload_modules(modules=PRELOAD_MODULES):
+    """
+    Importuje leniwie ładowane zależności w wątku roboczym, po jednej, aby
+    pierwsze użycie wykresów, PDF czy OpenAI nie czekało na import
+
+    Args:
+        modules (tuple, optional): Nazwy modułów lub pary (nazwa, funkcja ładująca)
+
+    Returns:
+        dict: Czas ładowania każdej zależności w milisekundach (None przy błędzie)
+    """
+    timings = {}
+    for entry in modules:
+        name = entry[0] if isinstance(entry, tuple) else entry
+        started_at = time.perf_counter()
+        try:
+            await asyncio.to_thread(_load, entry)
+            timings[name] = round((time.perf_counter() - started_at) * 1000)
+        except Exception as e:
+            logger.warning(f"Nie udało się wczytać {name} w tle: {e}")
+            timings[name] = None
+    logger.info(f"Wczytano zależności w tle: {timings}")
+    return timings
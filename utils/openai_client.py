@@ -1,14 +1,51 @@
-import openai
-from openai import AsyncOpenAI
 import base64
 import os
 import asyncio
-from config import OPENAI_API_KEY, DEFAULT_MODEL, DEFAULT_SYSTEM_PROMPT, DALL_E_MODEL
-print(f"API Key is {'set' if OPENAI_API_KEY else 'NOT SET'}")
-print(f"API Key length: {len(OPENAI_API_KEY) if OPENAI_API_KEY else 0}")
+from config import (
+    OPENAI_API_KEY, DEFAULT_MODEL, DEFAULT_SYSTEM_PROMPT, DALL_E_MODEL,
+    OPENAI_MAX_CONCURRENT_REQUESTS, DOCUMENT_SINGLE_PROMPT_MAX_CHARS, PDF_TEXT_TOKEN_BUDGET,
+    OPENAI_HTTP2, OPENAI_KEEPALIVE_EXPIRY
+)
+from utils.image_optimizer import prepare_image_for_vision
 
-# Inicjalizacja klienta OpenAI
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+# Klient OpenAI tworzony przy pierwszym użyciu - import biblioteki openai trwa kilkaset ms
+_client = None
+
+def get_client():
+    """
+    Zwraca współdzielony klient OpenAI, tworząc go przy pierwszym wywołaniu
+
+    Returns:
+        AsyncOpenAI: Klient OpenAI
+    """
+    global _client
+    if _client is None:
+        import httpx
+        import importlib.util
+        from openai import AsyncOpenAI
+        # Własny klient HTTP: dłuższe utrzymywanie połączeń (domyślnie 5 s), aby połączenie
+        # nawiązane przy rozgrzewce było użyte przez pierwsze zapytania; HTTP/2, jeśli dostępne
+        http_client = httpx.AsyncClient(
+            http2=OPENAI_HTTP2 and importlib.util.find_spec("h2") is not None,
+            timeout=httpx.Timeout(600.0, connect=5.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20,
+                                keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY),
+            follow_redirects=True
+        )
+        _client = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client)
+    return _client
+
+def __getattr__(name):
+    # Zgodność z importami "from utils.openai_client import client"
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Globalny limit równoległych zapytań do OpenAI
+openai_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENT_REQUESTS)
+
+# Pliki tekstowe obsługiwane przez analizę dokumentów
+TEXT_FILE_EXTENSIONS = ['.txt', '.csv', '.md', '.json', '.xml', '.html', '.js', '.py', '.cpp', '.c', '.java', '.log']
 
 async def chat_completion_stream(messages, model=DEFAULT_MODEL):
     """
@@ -28,7 +65,7 @@ async def chat_completion_stream(messages, model=DEFAULT_MODEL):
             import asyncio
             await asyncio.sleep(0.5)
             
-        stream = await client.chat.completions.create(
+        stream = await get_client().chat.completions.create(
             model=model,
             messages=messages,
             stream=True
@@ -55,7 +92,7 @@ async def chat_completion(messages, model=DEFAULT_MODEL):
         str: Wygenerowana odpowiedź
     """
     try:
-        response = await client.chat.completions.create(
+        response = await get_client().chat.completions.create(
             model=model,
             messages=messages
         )
@@ -110,7 +147,7 @@ async def generate_image_dall_e(prompt):
         str: URL wygenerowanego obrazu lub błąd
     """
     try:
-        response = await client.images.generate(
+        response = await get_client().images.generate(
             model=DALL_E_MODEL,
             prompt=prompt,
             n=1,
@@ -123,7 +160,7 @@ async def generate_image_dall_e(prompt):
         return None
 
 
-async def analyze_document(file_content, file_name, mode="analyze", target_language="en"):
+async def analyze_document(file_content, file_name, mode="analyze", target_language="en", progress_callback=None, file_unique_id=None):
     """
     Analizuj lub tłumacz dokument za pomocą OpenAI API
     
@@ -132,6 +169,9 @@ async def analyze_document(file_content, file_name, mode="analyze", target_langu
         file_name (str): Nazwa pliku
         mode (str): Tryb analizy: "analyze" (domyślnie) lub "translate"
         target_language (str): Docelowy język tłumaczenia (dwuliterowy kod)
+        progress_callback (callable, optional): Korutyna wywoływana jako
+            progress_callback(przetworzone, wszystkie) przy analizie dużych plików
+        file_unique_id (str, optional): Identyfikator pliku Telegram (cache tekstu PDF)
         
     Returns:
         str: Analiza dokumentu, tłumaczenie lub informacja o błędzie
@@ -172,21 +212,50 @@ async def analyze_document(file_content, file_name, mode="analyze", target_langu
             }
         ]
         
+        # Dla PDF wyciągamy tekst stron (w puli procesów) i traktujemy go jak dokument tekstowy
+        if file_extension == '.pdf':
+            from utils.pdf_extractor import extract_pdf_pages, pages_to_text
+            pages = await extract_pdf_pages(file_content, file_unique_id)
+            # Budżet tokenów przeliczamy na znaki (około 4 znaki na token)
+            file_text = pages_to_text(pages, PDF_TEXT_TOKEN_BUDGET * 4)
+            
+            if not file_text:
+                messages[1]["content"] += f"\n\nThe PDF has {len(pages)} pages but no extractable text layer (it may be a scanned document)."
+            elif len(file_text) > DOCUMENT_SINGLE_PROMPT_MAX_CHARS:
+                from utils.document_analyzer import analyze_large_document
+                return await analyze_large_document(
+                    file_text, file_name, user_instruction, mode=mode,
+                    target_lang_name=target_lang_name if mode == "translate" else "English",
+                    progress_callback=progress_callback
+                )
+            else:
+                messages[1]["content"] += f"\n\nFile content:\n\n{file_text}"
+        
         # Dla plików tekstowych możemy dodać zawartość bezpośrednio
-        if file_extension in ['.txt', '.csv', '.md', '.json', '.xml', '.html', '.js', '.py', '.cpp', '.c', '.java']:
+        elif file_extension in TEXT_FILE_EXTENSIONS:
             try:
-                # Próbuj odkodować jako UTF-8
-                file_text = file_content.decode('utf-8')
+                # Duże pliki przetwarzamy fragmentami (rozmiar w bajtach ogranicza liczbę znaków z góry)
+                if len(file_content) > DOCUMENT_SINGLE_PROMPT_MAX_CHARS:
+                    from utils.document_analyzer import analyze_large_document
+                    return await analyze_large_document(
+                        file_content, file_name, user_instruction, mode=mode,
+                        target_lang_name=target_lang_name if mode == "translate" else "English",
+                        progress_callback=progress_callback
+                    )
+                
+                # Próbuj odkodować jako UTF-8 (file_content może być też widokiem memoryview)
+                file_text = str(file_content, 'utf-8')
                 messages[1]["content"] += f"\n\nFile content:\n\n{file_text}"
             except UnicodeDecodeError:
                 # Jeśli nie możemy odkodować, traktuj jako plik binarny
                 messages[1]["content"] += "\n\nThe file contains binary data that cannot be displayed as text."
         
-        response = await client.chat.completions.create(
-            model="gpt-4o",  # Używamy GPT-4o dla lepszej jakości
-            messages=messages,
-            max_tokens=1500  # Zwiększamy limit tokenów dla dłuższych tekstów
-        )
+        async with openai_semaphore:
+            response = await get_client().chat.completions.create(
+                model="gpt-4o",  # Używamy GPT-4o dla lepszej jakości
+                messages=messages,
+                max_tokens=1500  # Zwiększamy limit tokenów dla dłuższych tekstów
+            )
         
         return response.choices[0].message.content
     except Exception as e:
@@ -207,8 +276,9 @@ async def analyze_image(image_content, image_name, mode="analyze", target_langua
         str: Analiza obrazu lub tłumaczenie tekstu
     """
     try:
-        # Kodowanie obrazu do Base64
-        base64_image = base64.b64encode(image_content).decode('utf-8')
+        # Zmniejsz i przekoduj obraz w wątku roboczym, a następnie zakoduj do Base64
+        prepared_image = await prepare_image_for_vision(image_content, mode)
+        base64_image = base64.b64encode(prepared_image["data"]).decode('utf-8')
         
         # Przygotuj odpowiednie instrukcje bazując na trybie
         if mode == "translate":
@@ -246,14 +316,15 @@ async def analyze_image(image_content, image_name, mode="analyze", target_langua
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
+                            "url": f"data:{prepared_image['mime_type']};base64,{base64_image}",
+                            "detail": prepared_image["detail"]
                         }
                     }
                 ]
             }
         ]
         
-        response = await client.chat.completions.create(
+        response = await get_client().chat.completions.create(
             model="gpt-4o",  # Używamy GPT-4o zamiast zdeprecjonowanego gpt-4-vision-preview
             messages=messages,
             max_tokens=800  # Zwiększona liczba tokenów dla dłuższych tekstów
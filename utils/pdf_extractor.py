@@ -0,0 +1,126 @@
+"""
+Moduł do ekstrakcji tekstu z dokumentów PDF w puli procesów
+"""
+import os
+import asyncio
+import logging
+import tempfile
+from collections import OrderedDict
+from utils.process_pool import run_in_process
+from config import PDF_PAGES_PER_TASK, PDF_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+# Pamięć podręczna LRU: file_unique_id -> lista tekstów stron
+_pages_cache = OrderedDict()
+
+def _count_pages(pdf_path):
+    """Zwraca liczbę stron dokumentu (uruchamiane w procesie roboczym)"""
+    import PyPDF2
+    with open(pdf_path, 'rb') as pdf_file:
+        return len(PyPDF2.PdfReader(pdf_file).pages)
+
+def _extract_page_range(pdf_path, start, end):
+    """
+    Wyciąga tekst ze stron z zakresu [start, end) (uruchamiane w procesie roboczym)
+
+    Args:
+        pdf_path (str): Ścieżka do pliku PDF
+        start (int): Indeks pierwszej strony
+        end (int): Indeks strony za ostatnią
+
+    Returns:
+        list: Lista tekstów stron (pusty tekst dla stron bez warstwy tekstowej)
+    """
+    import PyPDF2
+    pages = []
+    with open(pdf_path, 'rb') as pdf_file:
+        reader = PyPDF2.PdfReader(pdf_file)
+        for page_number in range(start, end):
+            try:
+                pages.append(reader.pages[page_number].extract_text() or "")
+            except Exception as e:
+                # Uszkodzona strona nie przerywa ekstrakcji całego dokumentu
+                pages.append("")
+                logging.getLogger(__name__).warning(f"Błąd odczytu strony {page_number + 1}: {e}")
+    return pages
+
+def _write_temp_pdf(pdf_content):
+    """Zapisuje zawartość PDF do pliku tymczasowego i zwraca jego ścieżkę"""
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, 'wb') as pdf_file:
+            pdf_file.write(pdf_content)
+    except BaseException:
+        os.remove(pdf_path)
+        raise
+    return pdf_path
+
+async def extract_pdf_pages(pdf_content, file_unique_id=None):
+    """
+    Wyciąga tekst ze wszystkich stron PDF, przetwarzając zakresy stron
+    równolegle w puli procesów
+
+    Args:
+        pdf_content (bytes): Zawartość pliku PDF
+        file_unique_id (str, optional): Identyfikator pliku Telegram używany jako klucz cache
+
+    Returns:
+        list: Lista tekstów kolejnych stron
+    """
+    if file_unique_id and file_unique_id in _pages_cache:
+        _pages_cache.move_to_end(file_unique_id)
+        logger.info(f"Tekst PDF {file_unique_id} pobrany z cache")
+        return _pages_cache[file_unique_id]
+
+    # Procesy robocze czytają plik z dysku - unikamy kopiowania całego PDF do każdego zadania.
+    # Zapis (do 25 MB) odbywa się w wątku, aby nie blokować pętli zdarzeń
+    pdf_path = await asyncio.to_thread(_write_temp_pdf, pdf_content)
+    try:
+        page_count = await run_in_process(_count_pages, pdf_path)
+        ranges = [
+            (start, min(start + PDF_PAGES_PER_TASK, page_count))
+            for start in range(0, page_count, PDF_PAGES_PER_TASK)
+        ]
+        results = await asyncio.gather(*[
+            run_in_process(_extract_page_range, pdf_path, start, end)
+            for start, end in ranges
+        ])
+    finally:
+        os.remove(pdf_path)
+
+    pages = [page for page_range in results for page in page_range]
+    logger.info(f"Wyciągnięto tekst z {len(pages)} stron PDF w {len(ranges)} zadaniach")
+
+    if file_unique_id:
+        _pages_cache[file_unique_id] = pages
+        while len(_pages_cache) > PDF_CACHE_MAX_ENTRIES:
+            _pages_cache.popitem(last=False)
+
+    return pages
+
+def pages_to_text(pages, max_chars):
+    """
+    Łączy teksty stron w jeden dokument z oznaczeniami stron,
+    nie przekraczając budżetu znaków
+
+    Args:
+        pages (list): Lista tekstów stron
+        max_chars (int): Maksymalna liczba znaków wyniku
+
+    Returns:
+        str: Tekst dokumentu (pusty, jeśli PDF nie ma warstwy tekstowej)
+    """
+    parts = []
+    used = 0
+    for page_number, page_text in enumerate(pages, start=1):
+        page_text = page_text.strip()
+        if not page_text:
+            continue
+        part = f"--- Page {page_number} ---\n{page_text}\n\n"
+        if used + len(part) > max_chars:
+            parts.append(f"[Pages {page_number}-{len(pages)} omitted: text budget exceeded]\n")
+            break
+        parts.append(part)
+        used += len(part)
+    return "".join(parts)
@@ -11,21 +11,21 @@ import os
 import datetime
 import re
 
-def generate_conversation_pdf(conversation, user_info, bot_name="AI Bot"):
+# Zarejestrowane fonty (main_font, bold_font) - rejestracja odbywa się tylko raz
+_registered_fonts = None
+
+def register_pdf_fonts():
     """
-    Generuje plik PDF z historią konwersacji
+    Rejestruje fonty z obsługą polskich i cyrylicznych znaków (DejaVu),
+    a w razie ich braku zwraca standardowe fonty Helvetica
     
-    Args:
-        conversation (list): Lista wiadomości z konwersacji
-        user_info (dict): Informacje o użytkowniku
-        bot_name (str): Nazwa bota
-        
     Returns:
-        BytesIO: Bufor zawierający wygenerowany plik PDF
+        tuple: Nazwy fontów (main_font, bold_font)
     """
-    buffer = io.BytesIO()
+    global _registered_fonts
+    if _registered_fonts:
+        return _registered_fonts
     
-    # Próba rejestracji fontów z obsługą polskich znaków
     try:
         # Sprawdź, czy fonty DejaVu są dostępne
         font_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fonts")
@@ -33,7 +33,6 @@ def generate_conversation_pdf(conversation, user_info, bot_name="AI Bot"):
         if not os.path.exists(font_dir):
             os.makedirs(font_dir)
         
-        # Pobierz DejaVu, jeśli nie istnieje
         dejavu_regular = os.path.join(font_dir, "DejaVuSans.ttf")
         dejavu_bold = os.path.join(font_dir, "DejaVuSans-Bold.ttf")
         
@@ -41,15 +40,31 @@ def generate_conversation_pdf(conversation, user_info, bot_name="AI Bot"):
         if os.path.exists(dejavu_regular) and os.path.exists(dejavu_bold):
             pdfmetrics.registerFont(TTFont('DejaVuSans', dejavu_regular))
             pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', dejavu_bold))
-            main_font = 'DejaVuSans'
-            bold_font = 'DejaVuSans-Bold'
+            _registered_fonts = ('DejaVuSans', 'DejaVuSans-Bold')
         else:
-            main_font = 'Helvetica'
-            bold_font = 'Helvetica-Bold'
+            _registered_fonts = ('Helvetica', 'Helvetica-Bold')
     except:
         # Fallback do standardowych fontów
-        main_font = 'Helvetica'
-        bold_font = 'Helvetica-Bold'
+        _registered_fonts = ('Helvetica', 'Helvetica-Bold')
+    
+    return _registered_fonts
+
+def generate_conversation_pdf(conversation, user_info, bot_name="AI Bot"):
+    """
+    Generuje plik PDF z historią konwersacji
+    
+    Args:
+        conversation (list): Lista wiadomości z konwersacji
+        user_info (dict): Informacje o użytkowniku
+        bot_name (str): Nazwa bota
+        
+    Returns:
+        BytesIO: Bufor zawierający wygenerowany plik PDF
+    """
+    buffer = io.BytesIO()
+    
+    # Fonty z obsługą polskich znaków
+    main_font, bold_font = register_pdf_fonts()
     
     # Konfiguracja dokumentu
     doc = SimpleDocTemplate(
@@ -164,4 +179,76 @@ def generate_conversation_pdf(conversation, user_info, bot_name="AI Bot"):
     
     # Zresetuj pozycję w buforze i zwróć go
     buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer
+
+def generate_translated_pdf(pages, title, bot_name="AI Bot"):
+    """
+    Generuje plik PDF z przetłumaczonym dokumentem
+    
+    Args:
+        pages (list): Lista krotek (numer_strony, lista_akapitów) z tłumaczeniem
+        title (str): Tytuł dokumentu (np. nazwa przetłumaczonego pliku)
+        bot_name (str): Nazwa bota
+        
+    Returns:
+        BytesIO: Bufor zawierający wygenerowany plik PDF
+    """
+    buffer = io.BytesIO()
+    main_font, bold_font = register_pdf_fonts()
+    
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=2*cm,
+        leftMargin=2*cm,
+        topMargin=2*cm,
+        bottomMargin=2*cm,
+        title=title
+    )
+    
+    # Style
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=styles['Title'],
+        fontName=bold_font,
+        alignment=1,
+        spaceAfter=12
+    ))
+    styles.add(ParagraphStyle(
+        name='PageHeader',
+        parent=styles['Normal'],
+        fontName=bold_font,
+        fontSize=8,
+        textColor=colors.gray,
+        spaceBefore=6,
+        spaceAfter=6
+    ))
+    styles.add(ParagraphStyle(
+        name='TranslatedParagraph',
+        parent=styles['Normal'],
+        fontName=main_font,
+        spaceAfter=8
+    ))
+    
+    def escape(text):
+        # Escapujemy znaki HTML i zachowujemy pojedyncze złamania linii
+        text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        return text.replace('\n', '<br/>')
+    
+    elements = [Paragraph(escape(title), styles['CustomTitle'])]
+    
+    for page_number, paragraphs in pages:
+        elements.append(Paragraph(f"— {page_number} —", styles['PageHeader']))
+        for paragraph in paragraphs:
+            elements.append(Paragraph(escape(paragraph), styles['TranslatedParagraph']))
+    
+    # Stopka
+    current_time = datetime.datetime.now().strftime("%d-%m-%Y %H:%M")
+    elements.append(Spacer(1, 1*cm))
+    elements.append(Paragraph(f"Wygenerowano przez {bot_name} • {current_time}", styles['Normal']))
+    
+    doc.build(elements)
+    
+    buffer.seek(0)
+    return buffer
@@ -1,36 +1,37 @@
 """
 Moduł do tłumaczenia fragmentów dokumentów PDF
 """
-import io
-import PyPDF2
 import re
+import json
+import asyncio
 import logging
-from utils.openai_client import client
+from utils.openai_client import get_client, openai_semaphore
+from utils.pdf_extractor import extract_pdf_pages
+from config import PDF_TRANSLATION_BATCH_CHARS, PDF_TRANSLATION_MAX_PAGES
 
 logger = logging.getLogger(__name__)
 
-async def extract_first_paragraph(pdf_content):
+async def extract_first_paragraph(pdf_content, file_unique_id=None):
     """
     Ekstrahuje pierwszy akapit z pliku PDF
     
     Args:
         pdf_content (bytes): Zawartość pliku PDF w formie bajtowej
+        file_unique_id (str, optional): Identyfikator pliku Telegram (cache tekstu PDF)
     
     Returns:
         str: Pierwszy akapit tekstu lub informacja o błędzie
     """
     try:
-        # Utwórz obiekt PdfReader z zawartości bajtowej
-        pdf_file = io.BytesIO(pdf_content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        # Parsowanie PDF odbywa się w puli procesów
+        pages = await extract_pdf_pages(pdf_content, file_unique_id)
         
         # Sprawdź, czy PDF ma co najmniej jedną stronę
-        if len(pdf_reader.pages) < 1:
+        if len(pages) < 1:
             return "PDF nie zawiera żadnych stron."
         
         # Pobierz tekst z pierwszej strony
-        first_page = pdf_reader.pages[0]
-        text = first_page.extract_text()
+        text = pages[0]
         
         if not text:
             return "Nie można odczytać tekstu z pierwszej strony PDF."
@@ -54,9 +55,9 @@ async def extract_first_paragraph(pdf_content):
         logger.error(f"Błąd podczas ekstrahowania akapitu z PDF: {e}")
         return f"Wystąpił błąd podczas odczytywania pliku PDF: {str(e)}"
 
-async def translate_paragraph(text, source_lang="pl", target_lang="en"):
+async def request_translation(text, source_lang="pl", target_lang="en"):
     """
-    Tłumaczy tekst z jednego języka na drugi za pomocą OpenAI API
+    Tłumaczy tekst za pomocą OpenAI API, zgłaszając błędy jako wyjątki
     
     Args:
         text (str): Tekst do przetłumaczenia
@@ -64,31 +65,45 @@ async def translate_paragraph(text, source_lang="pl", target_lang="en"):
         target_lang (str): Język docelowy (domyślnie "en")
     
     Returns:
-        str: Przetłumaczony tekst lub informacja o błędzie
+        str: Przetłumaczony tekst
     """
-    try:
-        # Przygotuj prompt dla OpenAI API
-        messages = [
-            {
-                "role": "system",
-                "content": f"Jesteś profesjonalnym tłumaczem. Przetłumacz podany tekst z języka {source_lang} na język {target_lang}. Zachowaj oryginalny format tekstu."
-            },
-            {
-                "role": "user",
-                "content": f"Przetłumacz ten tekst na język {target_lang}:\n\n{text}"
-            }
-        ]
-        
-        # Wyślij zapytanie do API
-        response = await client.chat.completions.create(
+    # Przygotuj prompt dla OpenAI API
+    messages = [
+        {
+            "role": "system",
+            "content": f"Jesteś profesjonalnym tłumaczem. Przetłumacz podany tekst z języka {source_lang} na język {target_lang}. Zachowaj oryginalny format tekstu."
+        },
+        {
+            "role": "user",
+            "content": f"Przetłumacz ten tekst na język {target_lang}:\n\n{text}"
+        }
+    ]
+    
+    # Wyślij zapytanie do API
+    async with openai_semaphore:
+        response = await get_client().chat.completions.create(
             model="gpt-4o",  # Używamy GPT-4o dla lepszej jakości tłumaczenia
             messages=messages,
             max_tokens=1500  # Zwiększamy limit tokenów dla dłuższych tekstów
         )
-        
-        # Zwróć tłumaczenie
-        return response.choices[0].message.content
     
+    # Zwróć tłumaczenie
+    return response.choices[0].message.content
+
+async def translate_paragraph(text, source_lang="pl", target_lang="en"):
+    """
+    Tłumaczy tekst z jednego języka na drugi za pomocą OpenAI API
+    
+    Args:
+        text (str): Tekst do przetłumaczenia
+        source_lang (str): Język źródłowy (domyślnie "pl")
+        target_lang (str): Język docelowy (domyślnie "en")
+    
+    Returns:
+        str: Przetłumaczony tekst lub informacja o błędzie
+    """
+    try:
+        return await request_translation(text, source_lang, target_lang)
     except Exception as e:
         logger.error(f"Błąd podczas tłumaczenia tekstu: {e}")
         return f"Wystąpił błąd podczas tłumaczenia: {str(e)}"
@@ -135,4 +150,174 @@ async def translate_pdf_first_paragraph(pdf_content, source_lang="pl", target_la
         "original_text": original_text,
         "translated_text": translated_text,
         "error": None
-    }
\ No newline at end of file
+    }
+
+def segment_paragraphs(pages):
+    """
+    Dzieli teksty stron PDF na akapity
+    
+    Args:
+        pages (list): Lista tekstów kolejnych stron
+    
+    Returns:
+        list: Lista krotek (numer_strony, akapit)
+    """
+    paragraphs = []
+    for page_number, text in enumerate(pages, start=1):
+        for paragraph in re.split(r'\n\s*\n', text or ""):
+            # Łamania linii wewnątrz akapitu pochodzą z układu strony, nie z treści
+            paragraph = re.sub(r'\s*\n\s*', ' ', paragraph).strip()
+            if paragraph:
+                paragraphs.append((page_number, paragraph))
+    return paragraphs
+
+def make_batches(paragraphs, max_chars):
+    """
+    Grupuje akapity w partie do tłumaczenia w jednym zapytaniu
+    
+    Args:
+        paragraphs (list): Lista krotek (numer_strony, akapit)
+        max_chars (int): Maksymalna liczba znaków w partii
+    
+    Returns:
+        list: Lista partii (list indeksów akapitów)
+    """
+    batches = []
+    current = []
+    current_size = 0
+    for index, (_, paragraph) in enumerate(paragraphs):
+        if current and current_size + len(paragraph) > max_chars:
+            batches.append(current)
+            current = []
+            current_size = 0
+        current.append(index)
+        current_size += len(paragraph)
+    if current:
+        batches.append(current)
+    return batches
+
+async def translate_batch(texts, target_lang="en"):
+    """
+    Tłumaczy partię akapitów w jednym zapytaniu, zachowując ich podział
+    
+    Args:
+        texts (list): Lista akapitów do przetłumaczenia
+        target_lang (str): Język docelowy
+    
+    Returns:
+        list: Lista przetłumaczonych akapitów (tej samej długości co texts);
+              None w miejscu akapitu, którego nie udało się przetłumaczyć
+    """
+    messages = [
+        {
+            "role": "system",
+            "content": f"You are a professional translator. Translate each paragraph to language {target_lang}. "
+                       "Reply with a JSON object {\"translations\": [...]} containing exactly one translated string per input paragraph, in the same order."
+        },
+        {
+            "role": "user",
+            "content": json.dumps({"paragraphs": texts}, ensure_ascii=False)
+        }
+    ]
+    
+    try:
+        async with openai_semaphore:
+            response = await get_client().chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                response_format={"type": "json_object"},
+                max_tokens=4000
+            )
+        translations = json.loads(response.choices[0].message.content).get("translations", [])
+        if len(translations) == len(texts):
+            return [str(translation) for translation in translations]
+        logger.warning(f"Partia tłumaczenia: oczekiwano {len(texts)} akapitów, otrzymano {len(translations)}")
+    except Exception as e:
+        logger.error(f"Błąd podczas tłumaczenia partii akapitów: {e}")
+    
+    # Gdy model nie zachował podziału, tłumaczymy akapity osobno
+    results = await asyncio.gather(*[
+        request_translation(text, "auto", target_lang) for text in texts
+    ], return_exceptions=True)
+    translations = []
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Błąd podczas tłumaczenia akapitu: {result}")
+            translations.append(None)
+        else:
+            translations.append(result)
+    return translations
+
+async def translate_pdf_document(pdf_content, target_lang="en", file_unique_id=None, progress_callback=None):
+    """
+    Tłumaczy cały dokument PDF: wyciąga tekst stron, dzieli go na akapity
+    i tłumaczy partie akapitów równolegle
+    
+    Args:
+        pdf_content (bytes): Zawartość pliku PDF w formie bajtowej
+        target_lang (str): Język docelowy (domyślnie "en")
+        file_unique_id (str, optional): Identyfikator pliku Telegram (cache tekstu PDF)
+        progress_callback (callable, optional): Korutyna wywoływana jako
+            progress_callback(przetłumaczone_partie, wszystkie_partie)
+    
+    Returns:
+        dict: Słownik z kluczami success, pages (lista krotek (numer_strony, akapity)),
+              page_count (przetłumaczone strony), total_pages, paragraph_count,
+              truncated (czy pominięto strony ponad PDF_TRANSLATION_MAX_PAGES) i error.
+              Jeśli choć jednego akapitu nie udało się przetłumaczyć, success jest False
+    """
+    try:
+        pages = await extract_pdf_pages(pdf_content, file_unique_id)
+    except Exception as e:
+        logger.error(f"Błąd podczas odczytywania PDF: {e}")
+        return {"success": False, "error": f"Wystąpił błąd podczas odczytywania pliku PDF: {str(e)}"}
+    
+    truncated = len(pages) > PDF_TRANSLATION_MAX_PAGES
+    paragraphs = segment_paragraphs(pages[:PDF_TRANSLATION_MAX_PAGES])
+    if not paragraphs:
+        return {"success": False, "error": "Nie można odczytać tekstu z pliku PDF."}
+    
+    batches = make_batches(paragraphs, PDF_TRANSLATION_BATCH_CHARS)
+    done = 0
+    
+    async def process(batch):
+        nonlocal done
+        result = await translate_batch([paragraphs[index][1] for index in batch], target_lang)
+        done += 1
+        if progress_callback:
+            try:
+                await progress_callback(done, len(batches))
+            except Exception as e:
+                logger.warning(f"Błąd przy aktualizacji postępu: {e}")
+        return result
+    
+    # Wszystkie partie startują jednocześnie - limit zapytań zapewnia openai_semaphore
+    results = await asyncio.gather(*[process(batch) for batch in batches])
+    logger.info(f"Przetłumaczono {len(paragraphs)} akapitów w {len(batches)} partiach")
+    
+    # Niepełne tłumaczenie nie trafia do użytkownika (ani nie jest rozliczane)
+    failed = sum(translation is None for translations in results for translation in translations)
+    if failed:
+        return {
+            "success": False,
+            "error": f"Nie udało się przetłumaczyć {failed} z {len(paragraphs)} akapitów. Spróbuj ponownie później."
+        }
+    
+    # Składamy tłumaczenie z powrotem w strony
+    translated_pages = []
+    for batch, translations in zip(batches, results):
+        for index, translation in zip(batch, translations):
+            page_number = paragraphs[index][0]
+            if not translated_pages or translated_pages[-1][0] != page_number:
+                translated_pages.append((page_number, []))
+            translated_pages[-1][1].append(translation)
+    
+    return {
+        "success": True,
+        "pages": translated_pages,
+        "page_count": min(len(pages), PDF_TRANSLATION_MAX_PAGES),
+        "total_pages": len(pages),
+        "paragraph_count": len(paragraphs),
+        "truncated": truncated,
+        "error": None
+    }
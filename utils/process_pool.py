@@ -0,0 +1,52 @@
+"""
+Moduł zarządzający współdzieloną pulą procesów dla zadań obciążających CPU
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from config import PROCESS_POOL_WORKERS
+
+logger = logging.getLogger(__name__)
+
+_process_pool = None
+
+def get_process_pool():
+    """
+    Zwraca współdzieloną pulę procesów, tworząc ją przy pierwszym użyciu
+
+    Returns:
+        ProcessPoolExecutor: Pula procesów
+    """
+    global _process_pool
+    if _process_pool is None:
+        # "spawn" zamiast "fork" - proces bota ma działające wątki i pętlę zdarzeń
+        _process_pool = ProcessPoolExecutor(
+            max_workers=PROCESS_POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        logger.info(f"Utworzono pulę procesów ({PROCESS_POOL_WORKERS} procesów)")
+    return _process_pool
+
+async def run_in_process(func, *args):
+    """
+    Uruchamia funkcję w puli procesów bez blokowania pętli zdarzeń.
+    Funkcja i jej argumenty muszą dać się zserializować (pickle).
+
+    Args:
+        func (callable): Funkcja zdefiniowana na poziomie modułu
+        *args: Argumenty funkcji
+
+    Returns:
+        Wynik funkcji
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), func, *args)
+
+def shutdown_process_pool():
+    """Zamyka pulę procesów (wywoływane przy zatrzymaniu bota)"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+        logger.info("Zamknięto pulę procesów")
@@ -0,0 +1,154 @@
+"""
+Moduł pamięci podręcznej gotowych klawiatur i tekstów menu dla każdego języka
+"""
+import json
+import time
+import hashlib
+import logging
+import functools
+import config
+from utils import translations as translations_module
+from config import RENDER_CACHE_CHECK_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+def config_fingerprint():
+    """
+    Zwraca skrót konfiguracji, od której zależą menu
+
+    Returns:
+        str: Skrót CHAT_MODES, CREDIT_COSTS, AVAILABLE_MODELS, AVAILABLE_LANGUAGES i tłumaczeń
+    """
+    sources = [
+        config.CHAT_MODES, config.CREDIT_COSTS, config.AVAILABLE_MODELS,
+        config.AVAILABLE_LANGUAGES, translations_module.translations,
+        translations_module.catalog.revision
+    ]
+    blob = json.dumps(sources, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(blob.encode('utf-8')).hexdigest()[:12]
+
+class RenderCache:
+    """
+    Pamięć podręczna wyników renderowania: (język, nazwa, wersja konfiguracji) -> wartość.
+
+    Funkcje budujące (klawiatury InlineKeyboardMarkup, stałe teksty, szablony
+    SplitTemplate) rejestruje się pod nazwą; wynik jest budowany raz dla języka
+    i zwracany przy kolejnych wywołaniach. Wersja konfiguracji jest sprawdzana
+    co check_interval sekund - zmiana trybów czatu, kosztów, modeli, języków
+    lub tłumaczeń unieważnia wszystkie wpisy.
+    """
+
+    def __init__(self, check_interval=RENDER_CACHE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._builders = {}   # nazwa -> funkcja (language) -> wartość
+        self._entries = {}    # (język, nazwa, wersja) -> wartość
+        self._version = None
+        self._checked_at = 0.0
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def register(self, name, builder):
+        """
+        Rejestruje funkcję budującą
+
+        Args:
+            name (str): Nazwa wpisu (np. "main_menu")
+            builder: Funkcja przyjmująca kod języka i zwracająca wynik renderowania
+        """
+        if name in self._builders:
+            raise ValueError(f"Wpis '{name}' jest już zarejestrowany")
+        self._builders[name] = builder
+
+    @property
+    def version(self):
+        """Bieżąca wersja konfiguracji (sprawdzana najwyżej co check_interval sekund)"""
+        now = time.monotonic()
+        if self._version is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            version = config_fingerprint()
+            if self._version is not None and version != self._version:
+                logger.info(f"Zmiana konfiguracji menu ({self._version} -> {version}) - czyszczenie pamięci podręcznej")
+                self._entries.clear()
+                self._stats["invalidations"] += 1
+            self._version = version
+        return self._version
+
+    def invalidate(self):
+        """Wymusza sprawdzenie wersji konfiguracji przy następnym odczycie (np. po zmianie tłumaczeń)"""
+        self._checked_at = 0.0
+
+    def get(self, name, language):
+        """
+        Zwraca wynik renderowania dla języka, budując go przy pierwszym użyciu
+
+        Args:
+            name (str): Nazwa wpisu
+            language (str): Kod języka
+
+        Returns:
+            Wynik funkcji budującej (klawiatura, tekst lub szablon)
+        """
+        if not translations_module.catalog.has_language(language):
+            # get_text i tak używa wtedy polskiego
+            language = "pl"
+        key = (language, name, self.version)
+        value = self._entries.get(key)
+        if value is None:
+            self._stats["misses"] += 1
+            value = self._builders[name](language)
+            self._entries[key] = value
+        else:
+            self._stats["hits"] += 1
+        return value
+
+    def precompute(self, languages=None):
+        """
+        Buduje wszystkie zarejestrowane wpisy (przy starcie bota)
+
+        Args:
+            languages (iterable, optional): Kody języków (domyślnie AVAILABLE_LANGUAGES)
+
+        Returns:
+            int: Liczba zbudowanych wpisów
+        """
+        built = 0
+        for language in languages or config.AVAILABLE_LANGUAGES:
+            for name in self._builders:
+                try:
+                    self.get(name, language)
+                    built += 1
+                except Exception as e:
+                    logger.error(f"Błąd budowania '{name}' dla języka {language}: {e}")
+        return built
+
+    def get_stats(self):
+        """
+        Zwraca statystyki pamięci podręcznej
+
+        Returns:
+            dict: Liczba wpisów, zarejestrowanych funkcji, trafień, chybień i unieważnień oraz wersja konfiguracji
+        """
+        stats = dict(self._stats)
+        stats["entries"] = len(self._entries)
+        stats["builders"] = len(self._builders)
+        stats["version"] = self._version
+        return stats
+
+# Współdzielona pamięć podręczna menu
+render_cache = RenderCache()
+
+def cached_render(name):
+    """
+    Dekorator rejestrujący funkcję budującą (language) -> wynik w render_cache.
+    Wywołanie udekorowanej funkcji zwraca wynik z pamięci podręcznej.
+
+    Args:
+        name (str): Nazwa wpisu
+    """
+    def decorator(builder):
+        render_cache.register(name, builder)
+
+        @functools.wraps(builder)
+        def wrapper(language):
+            return render_cache.get(name, language)
+        return wrapper
+    return decorator
@@ -0,0 +1,378 @@
+"""
+Moduł przechowujący sesje użytkowników (ustawienia i stan menu) w ograniczonym rejestrze
+"""
+import sys
+import time
+import pickle
+import sqlite3
+import asyncio
+import logging
+from itertools import islice
+from collections import OrderedDict
+from database.sqlite_client import DB_PATH
+from config import SESSION_REGISTRY_MAX_ENTRIES, SESSION_IDLE_TIMEOUT, PERSISTENCE_UPDATE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class UserSession:
+    """
+    Sesja użytkownika. Zmiana któregokolwiek z pól SESSION_FIELDS oznacza
+    sesję jako zmienioną - zostanie zapisana w najbliższej partii zapisów.
+    """
+
+    SESSION_FIELDS = (
+        "language", "current_mode", "current_model", "menu_state", "menu_message_id",
+        "menu_message_kind", "onboarding_state", "current_theme_id", "current_theme_name", "name"
+    )
+
+    __slots__ = SESSION_FIELDS + ("user_id", "last_used", "dirty")
+
+    def __init__(self, user_id, **fields):
+        object.__setattr__(self, "user_id", user_id)
+        object.__setattr__(self, "last_used", time.monotonic())
+        for field in self.SESSION_FIELDS:
+            object.__setattr__(self, field, fields.get(field))
+        object.__setattr__(self, "dirty", False)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in UserSession.SESSION_FIELDS:
+            object.__setattr__(self, "dirty", True)
+
+    def reset(self, keep=("language", "current_model", "current_mode")):
+        """
+        Czyści stan sesji z wyjątkiem wybranych ustawień
+
+        Args:
+            keep (tuple): Pola, które mają zostać zachowane
+        """
+        for field in self.SESSION_FIELDS:
+            if field not in keep:
+                setattr(self, field, None)
+
+    def to_row(self):
+        return (self.user_id,) + tuple(getattr(self, field) for field in self.SESSION_FIELDS)
+
+    def size_bytes(self):
+        """Przybliżony rozmiar sesji w pamięci (obiekt i wartości pól)"""
+        size = sys.getsizeof(self)
+        for field in self.SESSION_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                size += sys.getsizeof(value)
+        return size
+
+class SessionRegistry:
+    """
+    Rejestr sesji użytkowników: ograniczona liczba sesji w pamięci (LRU),
+    usuwanie sesji bezczynnych dłużej niż idle_timeout i zapis zmienionych
+    sesji partiami do tabeli user_sessions. Usunięta z pamięci sesja jest
+    wczytywana z bazy przy kolejnym użyciu.
+
+    Zapytania wykonywane przez okresowy zapis i get_async() działają w osobnym
+    wątku, aby nie blokować pętli zdarzeń. Zmienione sesje usunięte z pamięci
+    czekają na zapis w _pending i są z niego przywracane przy ponownym użyciu.
+    """
+
+    def __init__(self, max_entries=SESSION_REGISTRY_MAX_ENTRIES, idle_timeout=SESSION_IDLE_TIMEOUT,
+                 flush_interval=PERSISTENCE_UPDATE_INTERVAL, db_path=DB_PATH):
+        self.max_entries = max_entries
+        self.idle_timeout = idle_timeout
+        self.flush_interval = flush_interval
+        self.db_path = db_path
+        self._sessions = OrderedDict()   # user_id -> UserSession
+        self._pending = {}               # user_id -> zmieniona sesja usunięta z pamięci, czekająca na zapis
+        self._table_ready = False
+        self._flusher = None
+        self._stats = {"created": 0, "loaded": 0, "migrated": 0, "evicted": 0, "written": 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        if not self._table_ready:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS user_sessions (
+                user_id INTEGER PRIMARY KEY,
+                language TEXT,
+                current_mode TEXT,
+                current_model TEXT,
+                menu_state TEXT,
+                menu_message_id INTEGER,
+                menu_message_kind TEXT,
+                onboarding_state INTEGER,
+                current_theme_id INTEGER,
+                current_theme_name TEXT,
+                name TEXT
+            )
+            ''')
+            # Kolumny dodane po utworzeniu tabeli w starszych wersjach bota
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(user_sessions)")}
+            for field in UserSession.SESSION_FIELDS:
+                if field not in columns:
+                    conn.execute(f"ALTER TABLE user_sessions ADD COLUMN {field}")
+            conn.commit()
+            self._table_ready = True
+        return conn
+
+    def get(self, user_id):
+        """
+        Zwraca sesję użytkownika, wczytując ją z bazy lub tworząc nową
+
+        Args:
+            user_id (int): ID użytkownika
+
+        Returns:
+            UserSession: Sesja użytkownika
+        """
+        session = self._cached(user_id)
+        if session is not None:
+            return session
+        return self._insert(user_id, self._load(user_id))
+
+    async def get_async(self, user_id):
+        """
+        Zwraca sesję użytkownika, wczytując ją z bazy w osobnym wątku
+
+        Args:
+            user_id (int): ID użytkownika
+
+        Returns:
+            UserSession: Sesja użytkownika
+        """
+        session = self._cached(user_id)
+        if session is not None:
+            return session
+        loaded = await asyncio.to_thread(self._load, user_id)
+        # W czasie wczytywania sesja mogła trafić do pamięci przez get()
+        session = self._cached(user_id)
+        if session is not None:
+            return session
+        return self._insert(user_id, loaded)
+
+    def _cached(self, user_id):
+        """Zwraca sesję z pamięci (lub czekającą na zapis) albo None"""
+        session = self._sessions.get(user_id)
+        if session is None:
+            session = self._pending.pop(user_id, None)
+            if session is None:
+                return None
+            self._sessions[user_id] = session
+        self._sessions.move_to_end(user_id)
+        object.__setattr__(session, "last_used", time.monotonic())
+        return session
+
+    def _insert(self, user_id, session):
+        """Dodaje wczytaną (lub nową, gdy session jest None) sesję do rejestru"""
+        if session is None:
+            session = UserSession(user_id)
+            self._stats["created"] += 1
+
+        self._sessions[user_id] = session
+        if len(self._sessions) > self.max_entries:
+            # Usuwamy naraz 10% najdawniej używanych sesji, aby zapisywać je jedną partią
+            self._evict(list(islice(self._sessions, max(1, self.max_entries // 10))))
+        self._ensure_flusher()
+        return session
+
+    def _load(self, user_id):
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                f"SELECT {', '.join(UserSession.SESSION_FIELDS)} FROM user_sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Błąd wczytywania sesji użytkownika {user_id}: {e}")
+            return None
+        if row is None:
+            return None
+        self._stats["loaded"] += 1
+        return UserSession(user_id, **dict(zip(UserSession.SESSION_FIELDS, row)))
+
+    def _write_rows(self, rows):
+        """
+        Zapisuje wiersze sesji jednym zapytaniem (bez dostępu do stanu rejestru,
+        więc może działać w osobnym wątku)
+
+        Returns:
+            bool: True, jeśli zapis się powiódł
+        """
+        placeholders = ", ".join("?" * (len(UserSession.SESSION_FIELDS) + 1))
+        try:
+            conn = self._connect()
+            conn.executemany(
+                f"INSERT OR REPLACE INTO user_sessions (user_id, {', '.join(UserSession.SESSION_FIELDS)}) "
+                f"VALUES ({placeholders})",
+                rows
+            )
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Błąd zapisu sesji użytkowników: {e}")
+            return False
+        return True
+
+    def _take_dirty(self):
+        """
+        Pobiera do zapisu zmienione sesje (z pamięci i czekające w _pending)
+        i czyści ich znacznik zmian - zmiany wprowadzone w trakcie zapisu
+        oznaczą sesję ponownie
+
+        Returns:
+            tuple: (lista sesji, lista wierszy do zapisu)
+        """
+        sessions = [session for session in self._sessions.values() if session.dirty]
+        sessions.extend(self._pending.values())
+        self._pending.clear()
+        for session in sessions:
+            object.__setattr__(session, "dirty", False)
+        return sessions, [session.to_row() for session in sessions]
+
+    def _finish_write(self, sessions, written):
+        """Po nieudanym zapisie przywraca znacznik zmian, aby ponowić zapis w kolejnej partii"""
+        if written:
+            self._stats["written"] += len(sessions)
+            return
+        for session in sessions:
+            object.__setattr__(session, "dirty", True)
+            if session.user_id not in self._sessions:
+                self._pending.setdefault(session.user_id, session)
+
+    def migrate_legacy_sessions(self):
+        """
+        Jednorazowo przenosi sesje zapisane przez dawną persystencję chat_data
+        (tabela chat_sessions, słowniki chat_data['user_data'][user_id]) do
+        tabeli user_sessions, a następnie usuwa tabelę chat_sessions.
+        Sesje istniejące już w user_sessions nie są nadpisywane.
+
+        Returns:
+            int: Liczba przeniesionych sesji
+        """
+        try:
+            conn = self._connect()
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chat_sessions'"
+            ).fetchone()
+            if not exists:
+                conn.close()
+                return 0
+            sessions = {}
+            for (blob,) in conn.execute("SELECT data FROM chat_sessions"):
+                try:
+                    user_data = pickle.loads(blob).get('user_data')
+                except Exception as e:
+                    logger.warning(f"Pominięto nieczytelną sesję czatu: {e}")
+                    continue
+                if isinstance(user_data, dict):
+                    for user_id, fields in user_data.items():
+                        if isinstance(fields, dict) and fields:
+                            sessions[user_id] = UserSession(
+                                user_id, **{k: v for k, v in fields.items() if k in UserSession.SESSION_FIELDS}
+                            )
+            placeholders = ", ".join("?" * (len(UserSession.SESSION_FIELDS) + 1))
+            migrated = conn.executemany(
+                f"INSERT OR IGNORE INTO user_sessions (user_id, {', '.join(UserSession.SESSION_FIELDS)}) "
+                f"VALUES ({placeholders})",
+                [session.to_row() for session in sessions.values()]
+            ).rowcount
+            conn.execute("DROP TABLE chat_sessions")
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Błąd przenoszenia sesji z chat_sessions: {e}")
+            if 'conn' in locals():
+                conn.close()
+            return 0
+        self._stats["migrated"] += migrated
+        logger.info(f"Przeniesiono {migrated} sesji z chat_sessions do user_sessions")
+        return migrated
+
+    def _evict(self, user_ids):
+        """Usuwa sesje z pamięci; zmienione czekają w _pending na najbliższy zapis"""
+        evicted = [self._sessions.pop(user_id) for user_id in user_ids if user_id in self._sessions]
+        for session in evicted:
+            if session.dirty:
+                self._pending[session.user_id] = session
+        self._stats["evicted"] += len(evicted)
+
+    def evict_idle(self):
+        """Usuwa z pamięci sesje bezczynne dłużej niż idle_timeout"""
+        deadline = time.monotonic() - self.idle_timeout
+        idle = []
+        # Sesje są uporządkowane od najdawniej używanej
+        for user_id, session in self._sessions.items():
+            if session.last_used >= deadline:
+                break
+            idle.append(user_id)
+        self._evict(idle)
+
+    def flush(self):
+        """Zapisuje wszystkie zmienione sesje w bieżącym wątku (np. przy zamykaniu bota)"""
+        sessions, rows = self._take_dirty()
+        if rows:
+            self._finish_write(sessions, self._write_rows(rows))
+
+    async def flush_async(self):
+        """Zapisuje wszystkie zmienione sesje w osobnym wątku"""
+        sessions, rows = self._take_dirty()
+        if rows:
+            self._finish_write(sessions, await asyncio.to_thread(self._write_rows, rows))
+
+    def _ensure_flusher(self):
+        """Uruchamia okresowy zapis sesji, jeśli działa pętla zdarzeń"""
+        if self._flusher is not None and not self._flusher.done():
+            return
+        try:
+            self._flusher = asyncio.get_running_loop().create_task(self._run_flusher())
+        except RuntimeError:
+            # Brak pętli zdarzeń (np. skrypty) - sesje zapisze flush()
+            pass
+
+    async def _run_flusher(self):
+        while self._sessions or self._pending:
+            await asyncio.sleep(self.flush_interval)
+            self.evict_idle()
+            await self.flush_async()
+
+    def get_stats(self):
+        """
+        Zwraca statystyki rejestru
+
+        Returns:
+            dict: Liczba sesji w pamięci, ich łączny i średni rozmiar (bajty) oraz liczniki operacji
+        """
+        stats = dict(self._stats)
+        total = sum(session.size_bytes() for session in self._sessions.values())
+        stats["in_memory"] = len(self._sessions)
+        stats["dirty"] = sum(1 for session in self._sessions.values() if session.dirty) + len(self._pending)
+        stats["memory_bytes"] = total + sys.getsizeof(self._sessions)
+        stats["avg_session_bytes"] = round(total / len(self._sessions)) if self._sessions else 0
+        return stats
+
+# Współdzielony rejestr sesji
+session_registry = SessionRegistry()
+
+def get_session(context, user_id):
+    """
+    Zwraca sesję użytkownika
+
+    Args:
+        context: Kontekst bota (może być None; sesje nie zależą od czatu)
+        user_id (int): ID użytkownika
+
+    Returns:
+        UserSession: Sesja użytkownika
+    """
+    return session_registry.get(user_id)
+
+async def get_session_async(context, user_id):
+    """
+    Zwraca sesję użytkownika, wczytując ją z bazy poza pętlą zdarzeń
+
+    Args:
+        context: Kontekst bota (może być None; sesje nie zależą od czatu)
+        user_id (int): ID użytkownika
+
+    Returns:
+        UserSession: Sesja użytkownika
+    """
+    return await session_registry.get_async(user_id)
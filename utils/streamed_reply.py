@@ -0,0 +1,167 @@
+"""
+Moduł obsługujący strumieniowane odpowiedzi dłuższe niż limit jednej wiadomości Telegram
+"""
+import io
+import logging
+from telegram.constants import ParseMode
+from telegram.error import BadRequest
+from utils.edit_scheduler import edit_scheduler
+from utils.message_formatter import StreamingMarkdownRenderer, render_markdown_v2, split_message
+from config import STREAM_MESSAGE_MAX_CHARS, STREAM_DOCUMENT_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# Migający kursor na końcu wiadomości w trakcie generowania
+CURSOR = "▌"
+
+def _rendered_length(text):
+    """Długość tekstu po konwersji do Markdown V2"""
+    return len(render_markdown_v2(text))
+
+class StreamedReply:
+    """
+    Strumieniowana odpowiedź bota, która po przekroczeniu limitu długości
+    wiadomości kontynuuje się w kolejnych wiadomościach. Podział następuje
+    na bezpiecznej granicy, a przecięte bloki kodu są domykane i otwierane
+    ponownie w następnej wiadomości.
+    """
+
+    def __init__(self, first_message, max_length=STREAM_MESSAGE_MAX_CHARS):
+        self.messages = [first_message]
+        self.max_length = max_length
+        self._source = ""        # Tekst źródłowy bieżącej wiadomości
+        self._full_text = []     # Pełna odpowiedź (do załącznika)
+        self._renderer = StreamingMarkdownRenderer()
+
+    @property
+    def current_message(self):
+        return self.messages[-1]
+
+    async def feed(self, chunk):
+        """
+        Dodaje kolejny fragment odpowiedzi i publikuje edycję bieżącej wiadomości
+
+        Args:
+            chunk (str): Nowy fragment odpowiedzi modelu
+        """
+        self._full_text.append(chunk)
+        self._source += chunk
+        self._renderer.feed(chunk)
+
+        if self._renderer.length() + len(CURSOR) > self.max_length:
+            await self._roll_over()
+
+        # Tekst wiadomości jest budowany dopiero przy wysyłce edycji (najwyżej raz na odstęp
+        # planisty), więc koszt jednego fragmentu nie zależy od długości wiadomości
+        edit_scheduler.publish(self.current_message, self._render_current, ParseMode.MARKDOWN_V2)
+
+    def _render_current(self):
+        """Zwraca bieżący tekst wiadomości z kursorem"""
+        return self._renderer.snapshot() + CURSOR
+
+    async def _roll_over(self):
+        """Zamyka bieżącą wiadomość i przenosi resztę tekstu do nowej wiadomości"""
+        parts = split_message(self._source, self.max_length - len(CURSOR), measure=_rendered_length)
+
+        for part in parts[:-1]:
+            await edit_scheduler.finalize(
+                self.current_message, render_markdown_v2(part), ParseMode.MARKDOWN_V2, fallback_text=part
+            )
+            continuation = await self.current_message.chat.send_message(CURSOR)
+            self.messages.append(continuation)
+
+        # Reszta tekstu trafia do nowej wiadomości
+        self._source = parts[-1]
+        self._renderer = StreamingMarkdownRenderer()
+        self._renderer.feed(self._source)
+        logger.info(f"Odpowiedź przeniesiona do wiadomości nr {len(self.messages)}")
+
+    async def finish(self):
+        """
+        Wysyła końcową wersję ostatniej wiadomości, a dla bardzo długich
+        odpowiedzi dołącza pełną treść jako plik .md
+
+        Returns:
+            bool: True, jeśli końcowa edycja się powiodła
+        """
+        final_text = self._renderer.finish()
+
+        if not self._source.strip() and len(self.messages) > 1:
+            # Pusta wiadomość kontynuacji (odpowiedź skończyła się na granicy podziału)
+            message = self.messages.pop()
+            await edit_scheduler.discard(message)
+            try:
+                await message.delete()
+            except Exception as e:
+                logger.warning(f"Nie udało się usunąć pustej wiadomości: {e}")
+            landed = True
+        else:
+            landed = await edit_scheduler.finalize(
+                self.current_message, final_text, ParseMode.MARKDOWN_V2, fallback_text=self._source
+            )
+
+        full_text = "".join(self._full_text)
+        if STREAM_DOCUMENT_THRESHOLD and len(full_text) > STREAM_DOCUMENT_THRESHOLD:
+            try:
+                await self.current_message.chat.send_document(
+                    document=io.BytesIO(full_text.encode('utf-8')),
+                    filename="response.md"
+                )
+            except Exception as e:
+                logger.error(f"Nie udało się wysłać odpowiedzi jako pliku: {e}")
+
+        return landed
+
+    async def fail(self, text):
+        """
+        Zastępuje bieżącą wiadomość komunikatem o błędzie
+
+        Args:
+            text (str): Treść komunikatu
+        """
+        await edit_scheduler.finalize(self.current_message, text)
+
+async def _send_part(message, part, edit):
+    """Wysyła część w Markdown V2, a gdy Telegram odrzuci formatowanie - jako zwykły tekst"""
+    send = message.edit_text if edit else message.chat.send_message
+    try:
+        return await send(render_markdown_v2(part), parse_mode=ParseMode.MARKDOWN_V2)
+    except BadRequest as e:
+        logger.warning(f"Telegram odrzucił formatowanie części odpowiedzi: {e}")
+        return await send(part)
+
+async def send_long_reply(message, text, max_length=STREAM_MESSAGE_MAX_CHARS, document_name="response.md"):
+    """
+    Wysyła gotowy (nie strumieniowany) tekst dowolnej długości. Pierwsza część
+    zastępuje treść wiadomości statusowej, kolejne trafiają do nowych wiadomości.
+    Tekst dłuższy niż STREAM_DOCUMENT_THRESHOLD jest wysyłany jako plik .md,
+    a wiadomość statusowa pokazuje tylko jego początek.
+
+    Args:
+        message: Wiadomość statusowa bota (zostanie zastąpiona)
+        text (str): Tekst w Markdown
+        max_length (int, optional): Limit długości jednej wiadomości
+        document_name (str, optional): Nazwa pliku dla bardzo długiego tekstu
+
+    Returns:
+        list: Wysłane wiadomości
+
+    Raises:
+        TelegramError: Gdy którejkolwiek części nie udało się dostarczyć
+    """
+    parts = split_message(text, max_length, measure=_rendered_length)
+    as_document = STREAM_DOCUMENT_THRESHOLD and len(text) > STREAM_DOCUMENT_THRESHOLD
+    if as_document:
+        parts = parts[:1]
+
+    sent = []
+    for index, part in enumerate(parts):
+        result = await _send_part(message, part, edit=index == 0)
+        sent.append(result if result is not True else message)
+
+    if as_document:
+        sent.append(await message.chat.send_document(
+            document=io.BytesIO(text.encode('utf-8')),
+            filename=document_name
+        ))
+    return sent
@@ -0,0 +1,74 @@
+"""
+Moduł szablonów tekstu rozbitych wcześniej na stałe fragmenty i pola
+"""
+from string import Formatter
+
+def _format_value(value, conversion, format_spec):
+    if conversion == "r":
+        value = repr(value)
+    elif conversion == "s":
+        value = str(value)
+    elif conversion == "a":
+        value = ascii(value)
+    return format(value, format_spec)
+
+class SplitTemplate:
+    """
+    Szablon w formacie str.format rozbity raz na stałe fragmenty i pola.
+
+    Pola podane przy tworzeniu (static) są wstawiane od razu, więc przy
+    renderowaniu wypełniane są tylko pola dynamiczne (np. liczba kredytów),
+    bez ponownego parsowania szablonu. Wstawione wartości nie są parsowane,
+    więc mogą zawierać nawiasy klamrowe. Obsługiwane są proste nazwy pól
+    (bez odwołań do atrybutów i indeksów).
+    """
+
+    __slots__ = ("_literals", "_fields")
+
+    def __init__(self, template, **static):
+        literals = []
+        fields = []
+        current = []
+        for literal, field, format_spec, conversion in Formatter().parse(template):
+            current.append(literal)
+            if field is None:
+                continue
+            if field in static:
+                current.append(_format_value(static[field], conversion, format_spec))
+                continue
+            literals.append("".join(current))
+            current = []
+            fields.append((field, conversion, format_spec))
+        literals.append("".join(current))
+        self._literals = tuple(literals)
+        self._fields = tuple(fields)
+
+    @property
+    def fields(self):
+        """Nazwy pól dynamicznych szablonu"""
+        return tuple(field for field, _, _ in self._fields)
+
+    def render(self, **values):
+        """
+        Wypełnia pola dynamiczne szablonu
+
+        Args:
+            **values: Wartości pól dynamicznych
+
+        Returns:
+            str: Gotowy tekst
+
+        Raises:
+            KeyError: Gdy brakuje wartości któregoś pola
+        """
+        if not self._fields:
+            return self._literals[0]
+        parts = [self._literals[0]]
+        for (field, conversion, format_spec), literal in zip(self._fields, self._literals[1:]):
+            value = values[field]
+            if conversion or format_spec:
+                parts.append(_format_value(value, conversion, format_spec))
+            else:
+                parts.append(str(value))
+            parts.append(literal)
+        return "".join(parts)
@@ -0,0 +1,235 @@
+"""
+Moduł skompilowanego katalogu tłumaczeń używanego przez utils.translations.get_text
+"""
+import sys
+import logging
+from functools import partial
+from string import Formatter
+from utils.text_template import SplitTemplate
+
+logger = logging.getLogger(__name__)
+
+def _placeholders(text):
+    """Zwraca zbiór nazw pól szablonu lub None, jeśli tekst nie jest poprawnym szablonem"""
+    try:
+        return frozenset(field for _, field, _, _ in Formatter().parse(text) if field is not None)
+    except ValueError:
+        return None
+
+def _fields(entry):
+    """Zwraca zbiór pól skompilowanego tekstu (None dla tekstu, który nie jest poprawnym szablonem)"""
+    if isinstance(entry, CompiledText):
+        return frozenset(entry.fields)
+    return None if "{" in entry or "}" in entry else frozenset()
+
+class CompiledText:
+    """
+    Tekst z polami lub nawiasami klamrowymi przygotowany do szybkiego formatowania.
+    Szablon jest rozbijany raz na stałe fragmenty i pola (SplitTemplate).
+    Teksty bez nawiasów są przechowywane w katalogu jako zwykłe str.
+    """
+
+    __slots__ = ("text", "fields", "_template", "_on_missing")
+
+    def __init__(self, text, fields, on_missing=None):
+        self.text = text
+        self.fields = tuple(fields)
+        self._template = SplitTemplate(text)
+        # Wywoływane z nazwą pola, dla którego brakuje wartości
+        self._on_missing = on_missing
+
+    def render(self, kwargs):
+        """
+        Formatuje tekst
+
+        Args:
+            kwargs (dict): Wartości pól
+
+        Returns:
+            str: Sformatowany tekst lub tekst źródłowy, gdy brakuje wartości któregoś pola
+        """
+        try:
+            return self._template.render(**kwargs)
+        except KeyError as e:
+            if self._on_missing is not None:
+                self._on_missing(e.args[0])
+            return self.text
+
+class TranslationCatalog:
+    """
+    Katalog tłumaczeń kompilowany leniwie dla każdego języka.
+
+    Pakiet językowy (słownik klucz -> tekst albo funkcja zwracająca taki
+    słownik) jest wczytywany i kompilowany przy pierwszym użyciu języka:
+    klucze są internowane, a szablony analizowane raz (CompiledText), więc
+    get_text formatuje tylko teksty, które mają pola. Podczas
+    kompilacji pola każdego tekstu są porównywane z językiem wzorcowym;
+    brakujące klucze i niezgodne pola są zgłaszane w logu jeden raz.
+    """
+
+    def __init__(self, reference="pl", fallback="pl"):
+        self.reference = reference
+        self.fallback = fallback
+        self._sources = {}    # język -> słownik lub funkcja wczytująca
+        self.compiled = {}    # język -> {klucz: str lub CompiledText}
+        self._reported = set()
+        self.revision = 0
+
+    def register_language_pack(self, language, source):
+        """
+        Rejestruje pakiet językowy
+
+        Args:
+            language (str): Kod języka
+            source (dict | callable): Słownik klucz -> tekst albo funkcja bez
+                argumentów zwracająca taki słownik (wywoływana przy pierwszym użyciu języka)
+        """
+        self._sources[language] = source
+        self.compiled.pop(language, None)
+        self._drop_aliases()
+        self.revision += 1
+
+    def has_language(self, language):
+        return language in self._sources
+
+    @property
+    def languages(self):
+        return tuple(self._sources)
+
+    def reload(self, language=None):
+        """
+        Odrzuca skompilowane teksty (np. po zmianie słownika tłumaczeń w trakcie działania)
+
+        Args:
+            language (str, optional): Kod języka (domyślnie wszystkie języki)
+        """
+        if language is None:
+            self.compiled.clear()
+        else:
+            self.compiled.pop(language, None)
+            self._drop_aliases()
+        self.revision += 1
+
+    def _drop_aliases(self):
+        """Usuwa wpisy nieobsługiwanych języków wskazujące na teksty języka domyślnego"""
+        for language in [language for language in self.compiled if language not in self._sources]:
+            del self.compiled[language]
+
+    def _report(self, language, key, message):
+        if (language, key) in self._reported:
+            return
+        self._reported.add((language, key))
+        logger.warning(message)
+
+    def _missing_field(self, language, key, field):
+        """Zgłasza (raz dla klucza) brak wartości pola przy formatowaniu tekstu"""
+        self._report(language, key, f"Brak wartości pola '{field}' tłumaczenia '{key}' ({language})")
+
+    def _compile(self, language):
+        source = self._sources[language]
+        texts = source() if callable(source) else source
+
+        compiled = {}
+        for key, text in texts.items():
+            if "{" in text or "}" in text:
+                fields = _placeholders(text)
+                if fields is None:
+                    # Tekst nie jest poprawnym szablonem - zwracany jest bez formatowania
+                    self._report(language, key, f"Tłumaczenie '{key}' ({language}) nie jest poprawnym szablonem")
+                else:
+                    text = CompiledText(text, fields, partial(self._missing_field, language, key))
+            compiled[sys.intern(key)] = text
+
+        self.compiled[language] = compiled
+        if language != self.reference and self.reference in self._sources:
+            self._check_against_reference(language, compiled)
+        return compiled
+
+    def _check_against_reference(self, language, compiled):
+        reference = self._get_compiled(self.reference)
+        missing = [key for key in reference if key not in compiled]
+        for key in missing:
+            self._reported.add((language, key))
+        if missing:
+            more = f" (i {len(missing) - 20} innych)" if len(missing) > 20 else ""
+            logger.warning(f"Brak {len(missing)} tłumaczeń dla języka {language}: {', '.join(missing[:20])}{more}")
+        for key, entry in compiled.items():
+            if key not in reference:
+                continue
+            expected = _fields(reference[key])
+            found = _fields(entry)
+            if expected is not None and found is not None and expected != found:
+                self._report(
+                    language, key,
+                    f"Tłumaczenie '{key}' ({language}) ma pola {sorted(found)}, "
+                    f"a wzorcowe ({self.reference}) {sorted(expected)}"
+                )
+
+    def _get_compiled(self, language):
+        compiled = self.compiled.get(language)
+        if compiled is None:
+            compiled = self._compile(language)
+        return compiled
+
+    def validate(self):
+        """
+        Kompiluje wszystkie pakiety i porównuje je z językiem wzorcowym
+
+        Returns:
+            dict: Dla każdego języka listy brakujących kluczy ("missing")
+                i kluczy o niezgodnych polach ("placeholders")
+        """
+        reference = self._get_compiled(self.reference)
+        report = {}
+        for language in self._sources:
+            compiled = self._get_compiled(language)
+            missing = [key for key in reference if key not in compiled]
+            placeholders = [
+                key for key, entry in compiled.items()
+                if key in reference and _fields(entry) != _fields(reference[key])
+            ]
+            report[language] = {"missing": missing, "placeholders": placeholders}
+        return report
+
+    def get_language(self, language):
+        """
+        Zwraca skompilowane teksty języka (kompilując je przy pierwszym użyciu)
+
+        Args:
+            language (str): Kod języka - nieobsługiwany zastępowany jest językiem domyślnym
+
+        Returns:
+            dict: Klucz -> str lub CompiledText
+        """
+        if language not in self._sources:
+            # Nieobsługiwany język wskazuje na teksty języka domyślnego
+            self.compiled[language] = self.get_language(self.fallback)
+            return self.compiled[language]
+        compiled = self.compiled.get(language)
+        if compiled is None:
+            compiled = self._compile(language)
+        return compiled
+
+    def missing(self, key, language, kwargs):
+        """
+        Obsługuje brak klucza: zgłasza go raz i zwraca tekst domyślny
+
+        Args:
+            key (str): Klucz tekstu
+            language (str): Kod języka
+            kwargs (dict): Argumenty get_text; "default" to tekst zwracany zamiast klucza
+
+        Returns:
+            str: Tekst domyślny lub klucz
+        """
+        if (language, key) not in self._reported:
+            self._reported.add((language, key))
+            logger.info(f"Brak tłumaczenia '{key}' dla języka {language}")
+        text = kwargs.get('default', key)
+        if len(kwargs) > ('default' in kwargs):
+            # Rzadki przypadek: tekst domyślny z polami do wypełnienia
+            try:
+                return text.format(**kwargs)
+            except (KeyError, IndexError, ValueError):
+                return text
+        return text
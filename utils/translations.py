@@ -1,5 +1,6 @@
 # translations.py
 # Moduł obsługujący tłumaczenia dla bota Telegram
+from utils.translation_catalog import TranslationCatalog
 
 # Słownik z tłumaczeniami dla każdego obsługiwanego języka
 translations = {
@@ -61,6 +62,8 @@ translations = {
         # Do funkcji file i photo
         "file_too_large": "Plik jest zbyt duży. Maksymalny rozmiar to 25MB.",
         "analyzing_file": "Analizuję plik, proszę czekać...",
+        "analyzing_file_progress": "Analizuję plik: przetworzono {done} z {total} fragmentów...",
+        "translating_file_progress": "Tłumaczę plik: przetłumaczono {done} z {total} fragmentów...",
         "analyzing_photo": "Analizuję zdjęcie, proszę czekać...",
         "file_analysis": "Analiza pliku",
         "photo_analysis": "Analiza zdjęcia",
@@ -143,6 +146,8 @@ translations = {
         "history_delete_button": "🗑️ Usuń historię",
         "history_deleted": "*Historia została wyczyszczona*\n\nRozpocznęto nową konwersację.",
         "generating_response": "⏳ Generowanie odpowiedzi...",
+        "response_interrupted": "⏹ Odpowiedź przerwana przez nową wiadomość.",
+        "button_expired": "Ten przycisk wygasł. Prześlij plik ponownie.",
         
         # Do modeli i trybów
         "model_not_available": "Wybrany model nie jest dostępny.",
@@ -199,13 +204,15 @@ translations = {
 
         # Dla PDF polskiego
         "not_pdf_file": "Plik nie jest w formacie PDF. Proszę przesłać plik PDF.",
-        "translating_pdf": "Tłumaczę pierwszy akapit z pliku PDF, proszę czekać...",
-        "pdf_translation_result": "Wynik tłumaczenia pierwszego akapitu",
+        "translating_pdf": "Tłumaczę dokument PDF, proszę czekać...",
+        "translating_pdf_progress": "Tłumaczę dokument PDF: przetłumaczono {done} z {total} części...",
+        "pdf_translation_result": "Przetłumaczony dokument PDF: {pages} stron, {paragraphs} akapitów",
+        "pdf_translation_truncated": "Przetłumaczono tylko pierwsze {max_pages} z {total_pages} stron dokumentu.",
         "original_text": "Oryginalny tekst",
         "translated_text": "Przetłumaczony tekst",
         "pdf_translation_error": "Błąd podczas tłumaczenia pliku PDF",
         "translate_pdf_command": "Aby przetłumaczyć pierwszy akapit z pliku PDF, prześlij plik PDF z komentarzem /translate",
-        "pdf_translate_button": "🔄 Przetłumacz pierwszy akapit",
+        "pdf_translate_button": "🔄 Przetłumacz dokument",
         "translating_document": "Tłumaczę dokument, proszę czekać...",
         "subscription_expired_short": "Niewystarczająca liczba kredytów",
         "translate_first_paragraph": "Przetłumacz pierwszy akapit",
@@ -332,6 +339,8 @@ translations = {
         # Do funkcji file i photo
         "file_too_large": "The file is too large. Maximum size is 25MB.",
         "analyzing_file": "Analyzing file, please wait...",
+        "analyzing_file_progress": "Analyzing file: processed {done} of {total} parts...",
+        "translating_file_progress": "Translating file: translated {done} of {total} parts...",
         "analyzing_photo": "Analyzing photo, please wait...",
         "file_analysis": "File analysis",
         "photo_analysis": "Photo analysis",
@@ -414,6 +423,8 @@ translations = {
         "history_delete_button": "🗑️ Delete History",
         "history_deleted": "*History has been cleared*\n\nA new conversation has been started.",
         "generating_response": "⏳ Generating response...",
+        "response_interrupted": "⏹ Response interrupted by a new message.",
+        "button_expired": "This button has expired. Please send the file again.",
         
         # Do modeli i trybów
         "model_not_available": "The selected model is not available.",
@@ -470,13 +481,15 @@ translations = {
 
         # Dla PDF angielskiego
         "not_pdf_file": "The file is not in PDF format. Please upload a PDF file.",
-        "translating_pdf": "Translating the first paragraph from the PDF file, please wait...",
-        "pdf_translation_result": "Translation result of the first paragraph",
+        "translating_pdf": "Translating the PDF document, please wait...",
+        "translating_pdf_progress": "Translating the PDF document: translated {done} of {total} parts...",
+        "pdf_translation_result": "Translated PDF document: {pages} pages, {paragraphs} paragraphs",
+        "pdf_translation_truncated": "Only the first {max_pages} of {total_pages} pages of the document were translated.",
         "original_text": "Original text",
         "translated_text": "Translated text",
         "pdf_translation_error": "Error while translating the PDF file",
         "translate_pdf_command": "To translate the first paragraph from a PDF file, upload a PDF file with the /translate comment",
-        "pdf_translate_button": "🔄 Translate first paragraph",
+        "pdf_translate_button": "🔄 Translate document",
         "translating_document": "Translating document, please wait...",
         "subscription_expired_short": "Insufficient credits",
         "translate_first_paragraph": "Translate first paragraph",
@@ -604,6 +617,8 @@ translations = {
         # Do funkcji file i photo
         "file_too_large": "Файл слишком большой. Максимальный размер 25MB.",
         "analyzing_file": "Анализирую файл, пожалуйста, подождите...",
+        "analyzing_file_progress": "Анализирую файл: обработано {done} из {total} частей...",
+        "translating_file_progress": "Перевожу файл: переведено {done} из {total} частей...",
         "analyzing_photo": "Анализирую фото, пожалуйста, подождите...",
         "file_analysis": "Анализ файла",
         "photo_analysis": "Анализ фото",
@@ -686,6 +701,8 @@ translations = {
         "history_delete_button": "🗑️ Удалить историю",
         "history_deleted": "*История была очищена*\n\nНачат новый разговор.",
         "generating_response": "⏳ Генерация ответа...",
+        "response_interrupted": "⏹ Ответ прерван новым сообщением.",
+        "button_expired": "Срок действия этой кнопки истёк. Отправьте файл ещё раз.",
         
         # Do modeli i trybów
         "model_not_available": "Выбранная модель недоступна.",
@@ -742,13 +759,15 @@ translations = {
 
         # PDF rosyjski
         "not_pdf_file": "Файл не в формате PDF. Пожалуйста, загрузите файл PDF.",
-        "translating_pdf": "Перевожу первый абзац из файла PDF, пожалуйста, подождите...",
-        "pdf_translation_result": "Результат перевода первого абзаца",
+        "translating_pdf": "Перевожу документ PDF, пожалуйста, подождите...",
+        "translating_pdf_progress": "Перевожу документ PDF: переведено {done} из {total} частей...",
+        "pdf_translation_result": "Переведенный документ PDF: {pages} страниц, {paragraphs} абзацев",
+        "pdf_translation_truncated": "Переведены только первые {max_pages} из {total_pages} страниц документа.",
         "original_text": "Оригинальный текст",
         "translated_text": "Переведенный текст",
         "pdf_translation_error": "Ошибка при переводе файла PDF",
         "translate_pdf_command": "Чтобы перевести первый абзац из файла PDF, загрузите файл PDF с комментарием /translate",
-        "pdf_translate_button": "🔄 Перевести первый абзац",
+        "pdf_translate_button": "🔄 Перевести документ",
         "translating_document": "Перевожу документ, пожалуйста, подождите...",
         "subscription_expired_short": "Недостаточно кредитов",
         "translate_first_paragraph": "Перевести первый абзац",
@@ -817,6 +836,13 @@ translations = {
     }
 }
 
+# Skompilowany katalog - pakiety językowe są kompilowane przy pierwszym użyciu języka.
+# Kolejne języki można dodać przez catalog.register_language_pack (np. z pliku JSON).
+catalog = TranslationCatalog(reference="pl", fallback="pl")
+for _language, _texts in translations.items():
+    catalog.register_language_pack(_language, _texts)
+_compiled = catalog.compiled
+
 def get_text(key, language="pl", **kwargs):
     """
     Pobiera przetłumaczony tekst dla określonego klucza i języka.
@@ -824,24 +850,23 @@ def get_text(key, language="pl", **kwargs):
     Args:
         key (str): Klucz tekstu do przetłumaczenia
         language (str): Kod języka (pl, en, ru)
-        **kwargs: Argumenty do formatowania tekstu
+        **kwargs: Argumenty do formatowania tekstu; default - tekst zwracany,
+            gdy brak klucza (sam default nie powoduje formatowania)
         
     Returns:
         str: Przetłumaczony tekst
     """
-    # Domyślny język, jeśli podany język nie jest obsługiwany
-    if language not in translations:
-        language = "pl"
+    texts = _compiled.get(language)
+    if texts is None:
+        texts = catalog.get_language(language)
     
-    # Pobierz tekst lub zwróć klucz jako fallback
-    text = translations[language].get(key, kwargs.get('default', key))
+    text = texts.get(key)
+    if text is None:
+        return catalog.missing(key, language, kwargs)
     
-    # Formatuj tekst z podanymi argumentami
+    # Teksty bez pól są zwykłymi str - nie wymagają formatowania
+    if text.__class__ is str:
+        return text
     if kwargs:
-        try:
-            return text.format(**kwargs)
-        except KeyError:
-            # Jeśli formatowanie nie powiedzie się, zwróć nieformatowany tekst
-            return text
-    
-    return text
\ No newline at end of file
+        return text.render(kwargs)
+    return text.text
@@ -0,0 +1,236 @@
+"""
+Moduł przetwarzający aktualizacje równolegle z zachowaniem kolejności dla każdego użytkownika
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from telegram.ext import BaseUpdateProcessor, filters
+from utils.session_registry import session_registry
+from config import MAX_CONCURRENT_UPDATES, MESSAGE_DEBOUNCE_SECONDS, MESSAGE_BURST_MAX_WAIT
+
+logger = logging.getLogger(__name__)
+
+# Limit semafora biblioteki - faktyczny limit egzekwujemy sami, po zajęciu blokady użytkownika
+UNBOUNDED_UPDATES = 2 ** 16
+
+# Liczba ostatnich pomiarów czasu oczekiwania używana do percentyli
+WAIT_SAMPLES = 1000
+
+# Wiadomości czatu (obsługiwane przez message_handler), które mogą być łączone w serie
+CHAT_TEXT_FILTER = filters.TEXT & ~filters.COMMAND
+
+def is_chat_text(update):
+    """Sprawdza, czy aktualizacja jest nową wiadomością tekstową dla czatu z AI"""
+    return bool(getattr(update, 'message', None)) and bool(CHAT_TEXT_FILTER.check_update(update))
+
+def get_update_key(update):
+    """
+    Zwraca klucz kolejkowania aktualizacji (ID użytkownika, a w razie jego braku ID czatu)
+
+    Args:
+        update: Aktualizacja Telegram
+
+    Returns:
+        int | None: Klucz lub None, jeśli aktualizacji nie da się przypisać
+    """
+    user = getattr(update, 'effective_user', None)
+    if user:
+        return user.id
+    chat = getattr(update, 'effective_chat', None)
+    if chat:
+        return chat.id
+    return None
+
+class UserOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Przetwarza aktualizacje różnych użytkowników równolegle, a aktualizacje
+    jednego użytkownika po kolei (w kolejności ich otrzymania).
+
+    Najpierw zajmowana jest blokada użytkownika, a dopiero potem miejsce
+    w globalnym limicie - dzięki temu oczekujące aktualizacje jednego
+    użytkownika nie blokują miejsc innym użytkownikom.
+
+    Wiadomości tekstowe wysłane szybko po sobie tworzą serię: pierwsza z nich
+    jest obsługiwana przez message_handler, który pobiera całą serię metodą
+    collect_burst(), a kolejne są do niej dołączane bez osobnej obsługi.
+    Nowa wiadomość przerywa też trwające generowanie odpowiedzi użytkownika.
+    """
+
+    def __init__(self, max_concurrent_updates=MAX_CONCURRENT_UPDATES):
+        super().__init__(UNBOUNDED_UPDATES)
+        self.concurrency_limit = max_concurrent_updates
+        self._global_semaphore = asyncio.Semaphore(max_concurrent_updates)
+        self._user_locks = {}   # klucz -> [blokada, liczba_aktualizacji_korzystających]
+        self._active = 0
+        self._stats = {
+            "processed": 0,
+            "failed": 0,
+            "max_active": 0,
+            "user_wait_total": 0.0,
+            "global_wait_total": 0.0,
+            "max_wait": 0.0
+        }
+        self._recent_waits = deque(maxlen=WAIT_SAMPLES)
+        self._bursts = {}           # klucz -> {"owner": aktualizacja, "texts": [...], "updated": czas}
+        self._active_streams = {}   # klucz -> zadanie generujące odpowiedź
+        self._stats["absorbed"] = 0
+        self._stats["superseded"] = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _acquire_entry(self, key):
+        entry = self._user_locks.get(key)
+        if entry is None:
+            entry = self._user_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        return entry
+
+    def _release_entry(self, key, entry):
+        entry[1] -= 1
+        # Usuwamy blokadę, gdy nikt już na nią nie czeka
+        if entry[1] == 0:
+            self._user_locks.pop(key, None)
+
+    async def do_process_update(self, update, coroutine):
+        """Przetwarza aktualizację po zajęciu blokady użytkownika i miejsca w limicie globalnym"""
+        key = get_update_key(update)
+        queued_at = time.monotonic()
+
+        if key is not None and is_chat_text(update):
+            burst = self._bursts.get(key)
+            if burst is not None:
+                # Dołączamy wiadomość do otwartej serii - obsłuży ją pierwsza wiadomość serii
+                burst["texts"].append(update.message.text)
+                burst["updated"] = queued_at
+                self._stats["absorbed"] += 1
+                coroutine.close()
+                return
+
+            self._bursts[key] = {"owner": update, "texts": [update.message.text], "updated": queued_at}
+            self.cancel_stream(key)
+
+        entry = self._acquire_entry(key) if key is not None else None
+        try:
+            if entry:
+                await entry[0].acquire()
+            user_acquired_at = time.monotonic()
+            try:
+                async with self._global_semaphore:
+                    started_at = time.monotonic()
+                    self._record_wait(user_acquired_at - queued_at, started_at - user_acquired_at)
+
+                    self._active += 1
+                    self._stats["max_active"] = max(self._stats["max_active"], self._active)
+                    try:
+                        user = getattr(update, 'effective_user', None)
+                        if user:
+                            # Wczytujemy sesję poza pętlą zdarzeń, aby synchroniczne
+                            # get_session() w handlerach korzystało już z pamięci
+                            await session_registry.get_async(user.id)
+                        await coroutine
+                        self._stats["processed"] += 1
+                    except Exception:
+                        # Błędy handlerów obsługuje Application - tu tylko liczymy
+                        self._stats["failed"] += 1
+                        raise
+                    finally:
+                        self._active -= 1
+            finally:
+                if entry:
+                    entry[0].release()
+        finally:
+            if entry:
+                self._release_entry(key, entry)
+            burst = self._bursts.get(key)
+            if burst is not None and burst["owner"] is update:
+                # Seria nie została pobrana przez handler (np. zakończył się wcześniej)
+                self._bursts.pop(key, None)
+                if len(burst["texts"]) > 1:
+                    logger.warning(f"Pominięto {len(burst['texts']) - 1} wiadomości z nieobsłużonej serii")
+
+    async def collect_burst(self, key, update):
+        """
+        Czeka, aż użytkownik przestanie wysyłać kolejne wiadomości, i zwraca całą serię
+
+        Args:
+            key: Klucz użytkownika (ID użytkownika)
+            update: Aktualizacja obsługiwana przez handler
+
+        Returns:
+            list: Teksty wiadomości serii w kolejności wysłania
+        """
+        burst = self._bursts.get(key)
+        if burst is None or burst["owner"] is not update:
+            return [update.message.text]
+
+        started_at = time.monotonic()
+        while True:
+            quiet_for = time.monotonic() - burst["updated"]
+            remaining = MESSAGE_DEBOUNCE_SECONDS - quiet_for
+            if remaining <= 0 or time.monotonic() - started_at >= MESSAGE_BURST_MAX_WAIT:
+                break
+            await asyncio.sleep(remaining)
+
+        self._bursts.pop(key, None)
+        return burst["texts"]
+
+    def register_stream(self, key, task):
+        """Rejestruje zadanie generujące odpowiedź, aby nowa wiadomość mogła je przerwać"""
+        self._active_streams[key] = task
+
+    def unregister_stream(self, key, task):
+        """Wyrejestrowuje zakończone zadanie generujące odpowiedź"""
+        if self._active_streams.get(key) is task:
+            del self._active_streams[key]
+
+    def cancel_stream(self, key):
+        """
+        Przerywa trwające generowanie odpowiedzi użytkownika
+
+        Returns:
+            bool: True, jeśli jakieś generowanie zostało przerwane
+        """
+        task = self._active_streams.pop(key, None)
+        if task is not None and not task.done():
+            task.cancel()
+            self._stats["superseded"] += 1
+            return True
+        return False
+
+    def _record_wait(self, user_wait, global_wait):
+        """Zapisuje czas oczekiwania aktualizacji w kolejce"""
+        total_wait = user_wait + global_wait
+        self._stats["user_wait_total"] += user_wait
+        self._stats["global_wait_total"] += global_wait
+        self._stats["max_wait"] = max(self._stats["max_wait"], total_wait)
+        self._recent_waits.append(total_wait)
+        if total_wait > 5:
+            logger.warning(f"Aktualizacja czekała w kolejce {total_wait:.1f}s (użytkownik: {user_wait:.1f}s)")
+
+    def get_stats(self):
+        """
+        Zwraca statystyki przetwarzania aktualizacji
+
+        Returns:
+            dict: Liczniki, liczba aktywnych aktualizacji i czasy oczekiwania w kolejce (sekundy)
+        """
+        stats = dict(self._stats)
+        handled = stats["processed"] + stats["failed"]
+        stats["active"] = self._active
+        stats["queued_users"] = len(self._user_locks)
+        stats["open_bursts"] = len(self._bursts)
+        stats["active_streams"] = len(self._active_streams)
+        stats["avg_user_wait"] = round(stats["user_wait_total"] / handled, 3) if handled else 0.0
+        stats["avg_global_wait"] = round(stats["global_wait_total"] / handled, 3) if handled else 0.0
+        if self._recent_waits:
+            waits = sorted(self._recent_waits)
+            stats["p50_wait"] = round(waits[len(waits) // 2], 3)
+            stats["p95_wait"] = round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3)
+        else:
+            stats["p50_wait"] = stats["p95_wait"] = 0.0
+        return stats
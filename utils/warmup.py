@@ -0,0 +1,130 @@
+"""
+Moduł rozgrzewki po starcie bota: wczytuje pamięci podręczne i nawiązuje połączenia,
+aby pierwsi użytkownicy po restarcie nie ponosili kosztu zimnego startu
+"""
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+from config import WARMUP_STEPS, WARMUP_OPENAI_TIMEOUT, OPENAI_API_KEY, PROCESS_POOL_WORKERS
+from database.sqlite_client import DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# Tabele odczytywane przy obsłudze niemal każdej aktualizacji
+HOT_TABLES = ("users", "conversations", "messages", "user_sessions", "callback_payloads")
+
+# Wyniki ostatniej rozgrzewki: krok -> czas w ms (None przy błędzie)
+warm_up_report = {}
+
+def _touch_database(db_path=DB_PATH):
+    """Wczytuje do pamięci podręcznej systemu strony tabel i indeksów używanych najczęściej"""
+    conn = sqlite3.connect(db_path)
+    try:
+        schema = conn.execute(
+            "SELECT type, name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')"
+        ).fetchall()
+        tables = {name for kind, name, _ in schema if kind == "table"}
+        for table in HOT_TABLES:
+            if table in tables:
+                conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()
+        for kind, name, table in schema:
+            if kind == "index" and table in HOT_TABLES:
+                try:
+                    conn.execute(f'SELECT COUNT(*) FROM "{table}" INDEXED BY "{name}"').fetchone()
+                except sqlite3.Error:
+                    # Np. indeks częściowy, którego nie da się wymusić
+                    pass
+    finally:
+        conn.close()
+
+async def warm_up_database():
+    await asyncio.to_thread(_touch_database)
+
+async def warm_up_menus():
+    from utils.render_cache import render_cache
+    render_cache.precompute()
+
+async def warm_up_media():
+    # Wczytuje zapisane file_id statycznych obrazów
+    from utils.media_registry import media_registry
+    media_registry.get_stats()
+
+async def warm_up_pdf_fonts():
+    from utils.pdf_generator import register_pdf_fonts
+    await asyncio.to_thread(register_pdf_fonts)
+
+def render_test_chart():
+    """Rysuje mały wykres - pierwszy rysunek wczytuje fonty i buduje pamięć podręczną matplotlib"""
+    from utils.credit_analytics import new_figure, figure_to_png
+    figure = new_figure((2, 2))
+    axes = figure.subplots()
+    axes.plot([0, 1], [0, 1])
+    axes.set_title("warm-up")
+    figure_to_png(figure)
+
+async def warm_up_charts():
+    # Wykresy są rysowane w procesach roboczych - rozgrzewamy matplotlib w każdym z nich
+    from utils.process_pool import run_in_process
+    await asyncio.gather(*(run_in_process(render_test_chart) for _ in range(PROCESS_POOL_WORKERS)))
+
+async def warm_up_process_pool():
+    # Pula tworzy procesy przy pierwszych zadaniach - uruchamiamy je od razu wszystkie
+    from utils.process_pool import run_in_process
+    await asyncio.gather(*(run_in_process(os.getpid) for _ in range(PROCESS_POOL_WORKERS)))
+
+async def warm_up_openai():
+    if not OPENAI_API_KEY:
+        logger.info("Brak klucza API OpenAI - pomijam nawiązywanie połączenia")
+        return
+    from utils.openai_client import get_client
+    # Import openai i budowa klienta trwają kilkaset ms - wykonujemy je poza pętlą zdarzeń
+    client = await asyncio.to_thread(get_client)
+    # Lekkie zapytanie nawiązuje połączenie TLS, które pozostaje w puli klienta
+    await client.with_options(timeout=WARMUP_OPENAI_TIMEOUT, max_retries=0).models.list()
+
+async def warm_up_modules():
+    from utils.module_preloader import preload_modules
+    await preload_modules()
+
+WARMUP_STEP_FUNCTIONS = {
+    "menus": warm_up_menus,
+    "database": warm_up_database,
+    "media": warm_up_media,
+    "pdf_fonts": warm_up_pdf_fonts,
+    "charts": warm_up_charts,
+    "process_pool": warm_up_process_pool,
+    "openai": warm_up_openai,
+    "modules": warm_up_modules,
+}
+
+async def run_warm_up(steps=None):
+    """
+    Wykonuje kolejno kroki rozgrzewki i mierzy ich czas. Błąd kroku jest
+    logowany i nie przerywa pozostałych.
+
+    Args:
+        steps (list, optional): Nazwy kroków (domyślnie WARMUP_STEPS z konfiguracji)
+
+    Returns:
+        dict: Czas każdego kroku w milisekundach (None, jeśli krok się nie powiódł)
+    """
+    steps = WARMUP_STEPS if steps is None else steps
+    started_at = time.perf_counter()
+    for step in steps:
+        function = WARMUP_STEP_FUNCTIONS.get(step)
+        if function is None:
+            logger.warning(f"Nieznany krok rozgrzewki: {step}")
+            continue
+        step_started_at = time.perf_counter()
+        try:
+            await function()
+            warm_up_report[step] = round((time.perf_counter() - step_started_at) * 1000)
+        except Exception as e:
+            logger.warning(f"Krok rozgrzewki {step} nie powiódł się: {e}")
+            warm_up_report[step] = None
+    if steps:
+        total = round((time.perf_counter() - started_at) * 1000)
+        logger.info(f"Rozgrzewka zakończona w {total} ms: {warm_up_report}")
+    return dict(warm_up_report)
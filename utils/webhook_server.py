@@ -0,0 +1,70 @@
+"""
+Moduł uruchamiający bota w trybie webhook. Serwer HTTP zapewnia
+python-telegram-bot (Application.run_webhook, wymaga python-telegram-bot[webhooks])
+"""
+import hashlib
+import logging
+from telegram import Update
+from config import (
+    TELEGRAM_TOKEN, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH,
+    WEBHOOK_SECRET_TOKEN, WEBHOOK_MAX_CONNECTIONS, WEBHOOK_DELETE_ON_SHUTDOWN
+)
+
+logger = logging.getLogger(__name__)
+
+def get_webhook_secret():
+    """
+    Zwraca sekret webhooka z konfiguracji lub wyprowadza go z tokena bota
+
+    Returns:
+        str: Sekret przesyłany przez Telegram w nagłówku X-Telegram-Bot-Api-Secret-Token
+    """
+    if WEBHOOK_SECRET_TOKEN:
+        return WEBHOOK_SECRET_TOKEN
+    return hashlib.sha256(f"webhook:{TELEGRAM_TOKEN}".encode()).hexdigest()
+
+def run_webhook(application):
+    """
+    Uruchamia aplikację w trybie webhook: serwer HTTP odbiera aktualizacje na
+    ścieżce WEBHOOK_PATH (z weryfikacją sekretu), webhook jest rejestrowany
+    w Telegramie, a bot działa do sygnału zatrzymania (SIGINT/SIGTERM)
+
+    Args:
+        application: Aplikacja python-telegram-bot
+
+    Returns:
+        bool: False, jeśli nie ustawiono WEBHOOK_URL i bot nie został uruchomiony
+    """
+    if not WEBHOOK_URL:
+        logger.error("Tryb webhook wymaga ustawienia WEBHOOK_URL (publicznego adresu HTTPS bota)")
+        return False
+
+    url_path = WEBHOOK_PATH.strip("/")
+    webhook_url = f"{WEBHOOK_URL.rstrip('/')}/{url_path}"
+    logger.info(f"Serwer webhook nasłuchuje na {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{url_path}, webhook: {webhook_url}")
+    application.run_webhook(
+        listen=WEBHOOK_LISTEN,
+        port=WEBHOOK_PORT,
+        url_path=url_path,
+        webhook_url=webhook_url,
+        secret_token=get_webhook_secret(),
+        allowed_updates=Update.ALL_TYPES,
+        max_connections=WEBHOOK_MAX_CONNECTIONS
+    )
+    return True
+
+async def delete_webhook(application):
+    """
+    Usuwa webhook z Telegrama po zatrzymaniu odbierania aktualizacji
+    (o ile nie wyłączono tego przez WEBHOOK_DELETE_ON_SHUTDOWN)
+
+    Args:
+        application: Aplikacja python-telegram-bot
+    """
+    if not WEBHOOK_DELETE_ON_SHUTDOWN:
+        return
+    try:
+        await application.bot.delete_webhook()
+        logger.info("Usunięto webhook")
+    except Exception as e:
+        logger.error(f"Błąd przy usuwaniu webhooka: {e}")
@@ -0,0 +1,77 @@
+import sys
+import json
+import time
+import argparse
+import urllib.request
+import urllib.error
+from dotenv import load_dotenv
+
+# Ładowanie zmiennych środowiskowych
+load_dotenv()
+
+def load_updates(path):
+    """
+    Wczytuje zapisane aktualizacje z pliku JSON (pojedyncza aktualizacja lub lista)
+    albo JSONL (jedna aktualizacja w linii)
+    """
+    with open(path, encoding='utf-8') as f:
+        content = f.read().strip()
+    
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        # Format JSONL
+        return [json.loads(line) for line in content.splitlines() if line.strip()]
+    return data if isinstance(data, list) else [data]
+
+def replay_updates(paths, url, secret, delay=0.0):
+    """
+    Wysyła zapisane aktualizacje na endpoint webhooka bota, tak jak robi to Telegram.
+    Przydatne do lokalnego testowania trybu webhook - aktualizacje trafiają
+    bezpośrednio do lokalnego serwera bota (BOT_TRANSPORT=webhook).
+    """
+    sent = 0
+    for path in paths:
+        for update in load_updates(path):
+            request = urllib.request.Request(
+                url,
+                data=json.dumps(update).encode('utf-8'),
+                headers={
+                    "Content-Type": "application/json",
+                    "X-Telegram-Bot-Api-Secret-Token": secret
+                },
+                method="POST"
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    print(f"Aktualizacja {update.get('update_id')}: {response.status}")
+                    sent += 1
+            except urllib.error.HTTPError as e:
+                print(f"Aktualizacja {update.get('update_id')}: błąd {e.code}")
+            except urllib.error.URLError as e:
+                print(f"Nie można połączyć się z {url}: {e.reason}")
+                return sent
+            
+            if delay:
+                time.sleep(delay)
+    
+    print(f"Wysłano {sent} aktualizacji")
+    return sent
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Odtwarza zapisane aktualizacje Telegrama na lokalnym webhooku bota")
+    parser.add_argument("files", nargs="+", help="Pliki JSON/JSONL z aktualizacjami")
+    parser.add_argument("--url", default=None, help="Adres webhooka (domyślnie http://127.0.0.1:WEBHOOK_PORT/WEBHOOK_PATH)")
+    parser.add_argument("--secret", default=None, help="Sekret webhooka (domyślnie taki jak w bocie)")
+    parser.add_argument("--delay", type=float, default=0.0, help="Odstęp między aktualizacjami w sekundach")
+    args = parser.parse_args()
+    
+    from config import WEBHOOK_PORT, WEBHOOK_PATH
+    url = args.url or f"http://127.0.0.1:{WEBHOOK_PORT}/{WEBHOOK_PATH.strip('/')}"
+    
+    secret = args.secret
+    if secret is None:
+        from utils.webhook_server import get_webhook_secret
+        secret = get_webhook_secret()
+    
+    sys.exit(0 if replay_updates(args.files, url, secret, args.delay) else 1)